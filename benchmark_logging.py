@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import tempfile
+
+import logging_setup
+
+# 基准测试结果追加保存的位置
+RESULT_FILE = os.path.join('logs', 'benchmark_logging.jsonl')
+
+# 原来每个模块导入时在根日志器上各加一个文件处理器和一个控制台处理器
+LEGACY_LOG_FILES = ('jq_data.log', 'extract_signals.log', 'trade_executor.log', 'trade_window.log',
+                    'ths_client.log', 'main_controller.log')
+
+
+def setup_legacy(log_dir, stream):
+    """按原来的方式配置日志：主控制器导入全部模块后根日志器上有6个文件处理器和6个控制台处理器"""
+    root = logging.getLogger()
+    formatter = logging.Formatter(logging_setup.LOG_FORMAT)
+    handlers = []
+    for filename in LEGACY_LOG_FILES:
+        handlers.append(logging.FileHandler(os.path.join(log_dir, filename), encoding='utf-8'))
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setLevel(logging.INFO)
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    def teardown():
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+    return teardown
+
+
+def setup_queue(log_dir, stream):
+    """使用logging_setup：记录日志的线程只入队，后台线程写文件和控制台"""
+    logging_setup.setup_logging(log_dir=log_dir, stream=stream, process='')
+    return logging_setup.shutdown_logging
+
+
+def measure(count):
+    """在当前线程记录count条下单路径上典型的日志，返回每次调用的耗时（秒）"""
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        logging.info(f"买入 {i % 1000:06d} 价格: 10.{i % 100:02d} 数量: {100 * (i % 10 + 1)} 委托已提交")
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def run_benchmark(mode, count):
+    """
+    测量一种日志配置下每次日志调用在记录线程上的开销
+
+    参数:
+        mode: 'legacy'（原来的多处理器同步写入）或 'queue'（队列和后台线程）
+        count: 日志调用次数
+    返回:
+        包含每次调用耗时分位数（微秒）和写完全部记录用时的字典
+    """
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, 'w', encoding='utf-8') as stream:
+        teardown = (setup_legacy if mode == 'legacy' else setup_queue)(log_dir, stream)
+        measure(min(count, 1000))  # 预热：打开文件、创建后台线程
+        start = time.perf_counter()
+        durations = measure(count)
+        elapsed = time.perf_counter() - start
+        teardown()
+        flushed = time.perf_counter() - start
+        lines = sum(1 for name in os.listdir(log_dir)
+                    for _ in open(os.path.join(log_dir, name), encoding='utf-8'))
+
+    durations.sort()
+    def percentile(p):
+        return round(durations[min(len(durations) - 1, int(len(durations) * p))] * 1e6, 2)
+    return {
+        'mode': mode,
+        'count': count,
+        'mean_us': round(elapsed / count * 1e6, 2),
+        'p50_us': percentile(0.5),
+        'p99_us': percentile(0.99),
+        'max_us': round(durations[-1] * 1e6, 2),
+        'flushed_s': round(flushed, 3),
+        'file_lines': lines
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志调用开销基准测试：原来的同步多处理器配置与队列配置对比")
+    parser.add_argument('--count', type=int, default=20000, help="日志调用次数")
+    parser.add_argument('--record', action='store_true', help=f"将结果追加到 {RESULT_FILE}")
+    args = parser.parse_args()
+
+    results = []
+    for mode in ('legacy', 'queue'):
+        r = run_benchmark(mode, args.count)
+        print(f"{mode:>6}: 每次调用平均{r['mean_us']:.2f}微秒 p50={r['p50_us']:.2f} p99={r['p99_us']:.2f} "
+              f"max={r['max_us']:.2f}, 全部写完用时{r['flushed_s']:.3f}秒, 文件共{r['file_lines']}行")
+        results.append(r)
+
+    if args.record:
+        os.makedirs(os.path.dirname(RESULT_FILE), exist_ok=True)
+        record = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'results': results
+        }
+        with open(RESULT_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {RESULT_FILE}")
+
+
+if __name__ == '__main__':
+    main()
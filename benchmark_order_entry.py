@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import datetime
+import tempfile
+
+from signal_model import Signal, SIDE_BUY, SIDE_SELL
+from simulated_broker import SimulatedTHSBroker, SimulatedLatencies
+from execution_ledger import ExecutionLedger
+from latency_metrics import LatencyRecorder, EXECUTION, END_TO_END
+from timing_profile import TimingProfile
+
+# 基准测试结果追加保存的位置，便于跟踪下单吞吐量的变化
+RESULT_FILE = os.path.join('logs', 'benchmark_order_entry.jsonl')
+
+
+def generate_burst(size, start_time, seed=0):
+    """生成一批交易信号，卖出和买入各约一半，交易时间为start_time"""
+    rng = random.Random(seed)
+    trade_time = datetime.datetime.fromtimestamp(int(start_time))
+    signals = []
+    for i in range(size):
+        side = SIDE_SELL if rng.random() < 0.5 else SIDE_BUY
+        signals.append(Signal(str(1740000000 + i), trade_time, side, f"{rng.randrange(1, 700000):06d}",
+                              round(rng.uniform(2, 100), 2), rng.randrange(1, 20) * 100, i))
+    return signals
+
+
+def verify_orders(signals, orders, default_quote):
+    """核对模拟券商接受的委托与信号是否一致，返回 (一致的笔数, 不一致的描述列表)"""
+    remaining = list(orders)
+    matched = 0
+    problems = []
+    for signal in signals:
+        expected_price = signal.price if signal.is_buy else default_quote
+        for order in remaining:
+            if (order.side, order.security, order.amount) == (signal.side, signal.security, signal.amount) \
+                    and abs(order.price - expected_price) < 0.005:
+                remaining.remove(order)
+                matched += 1
+                break
+        else:
+            problems.append(f"{signal.entrust_id} {signal.side_label} {signal.security} 未正确下单")
+    problems.extend(f"多余的委托: {order}" for order in remaining)
+    return matched, problems
+
+
+def run_benchmark(burst_size, latency_scale=1.0, seed=0, batch=True):
+    """
+    用模拟下单界面运行一批信号通过完整的交易执行器
+
+    参数:
+        batch: 为True时使用批量执行（先卖后买，保持窗口和委托单模式），否则逐笔执行
+
+    返回:
+        包含吞吐量、单笔订单延迟分位数和核对结果的字典
+    """
+    from trade_executor import TradeExecutor
+
+    broker = SimulatedTHSBroker(latencies=SimulatedLatencies().scaled(latency_scale))
+    signals = generate_burst(burst_size, broker.now(), seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ledger = ExecutionLedger(os.path.join(tmp_dir, 'ledger.jsonl'))
+        recorder = LatencyRecorder(metrics_file=os.path.join(tmp_dir, 'latency.json'), traces_file=None,
+                                   clock=broker.now)
+        # 使用默认时序配置，结果不受本机校准结果影响
+        executor = TradeExecutor(ledger=ledger, latency=recorder, broker=broker,
+                                 timing=TimingProfile('benchmark'))
+        for signal in signals:
+            recorder.start_trace(signal)
+
+        start = broker.now()
+        wall_start = time.perf_counter()
+        if batch:
+            executor.execute_batch(signals)
+        else:
+            executor.execute_all_trades(signals)
+        wall_seconds = time.perf_counter() - wall_start
+        elapsed = broker.now() - start
+        ledger.close()
+
+    summary = recorder.summary()
+    execution = {}
+    burst_latency = {}
+    for window_stats in summary.values():
+        execution = window_stats.get(EXECUTION, execution)
+        burst_latency = window_stats.get(END_TO_END, burst_latency)
+    matched, problems = verify_orders(signals, broker.orders, broker.default_quote)
+    return {
+        'orders': burst_size,
+        'matched': matched,
+        'problems': problems,
+        'seconds': round(elapsed, 3),
+        'orders_per_second': round(matched / elapsed, 3) if elapsed else 0.0,
+        'order_latency': {k: execution.get(k, 0.0) for k in ('p50', 'p95', 'p99', 'max')},
+        'burst_latency': {k: burst_latency.get(k, 0.0) for k in ('p50', 'p95', 'p99', 'max')},
+        'keystrokes': broker.keystrokes,
+        'dropped_keys': broker.dropped_keys,
+        'batch': batch,
+        'activations': executor.batch_stats['activations'],
+        'mode_switches': executor.batch_stats['mode_switches'],
+        'executor_cpu_seconds': round(wall_seconds, 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易执行器下单吞吐量基准测试（模拟同花顺下单界面，虚拟时钟）")
+    parser.add_argument('--bursts', type=int, nargs='+', default=[1, 5, 20], help="每批信号数量")
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help="模拟界面响应时间的倍数，大于1模拟较慢的机器")
+    parser.add_argument('--no-batch', action='store_true', help="逐笔执行，不使用批量执行")
+    parser.add_argument('--record', action='store_true', help=f"将结果追加到 {RESULT_FILE}")
+    args = parser.parse_args()
+
+    # 执行器逐笔记录的日志在基准测试中只会干扰输出
+    logging.disable(logging.WARNING)
+
+    results = []
+    for size in args.bursts:
+        r = run_benchmark(size, args.latency_scale, batch=not args.no_batch)
+        lat = r['order_latency']
+        print(f"{size:>4}笔: 用时{r['seconds']:.2f}秒(虚拟), {r['orders_per_second']:.3f}笔/秒, "
+              f"单笔p50={lat['p50']:.2f}秒 p95={lat['p95']:.2f}秒 max={lat['max']:.2f}秒, "
+              f"最后一笔等待{r['burst_latency']['max']:.2f}秒, 正确{r['matched']}/{size}, "
+              f"窗口激活{r['activations']}次, 委托单切换{r['mode_switches']}次, "
+              f"丢失按键{r['dropped_keys']}, 执行器CPU{r['executor_cpu_seconds']:.3f}秒")
+        for problem in r['problems'][:5]:
+            print(f"    {problem}")
+        results.append(r)
+
+    if args.record:
+        os.makedirs(os.path.dirname(RESULT_FILE), exist_ok=True)
+        record = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'latency_scale': args.latency_scale,
+            'results': results
+        }
+        with open(RESULT_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {RESULT_FILE}")
+
+
+if __name__ == '__main__':
+    main()
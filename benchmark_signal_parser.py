@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+
+from signal_parser import SignalParser
+
+# 基准测试结果追加保存的位置，便于跟踪解析吞吐量的变化
+RESULT_FILE = os.path.join('logs', 'benchmark_signal_parser.jsonl')
+
+_BUY_LINE = ("{ts} - INFO  - 订单已委托：StockOrder(entrust_id={eid} security={code}.XSHE mode=OrderValue: "
+             "_value=100000.0 style=MarketOrderStyle: _limit_price={price} side=long action=open margin=False "
+             "entrust_time={ts} cancel_time=None finish_time=None comment= error=开仓数量必须是 100 的整数倍，调整为 {amount})")
+_SELL_LINE = ("{ts} - INFO  - order StockOrder(entrust_id={eid} security={code}.XSHE mode=OrderTargetValue: "
+              "_value=0.0 style=MarketOrderStyle: _limit_price=0.0 side=long action=close margin=False "
+              "entrust_time={ts} cancel_time=None finish_time=None comment= error=) "
+              "trade price: {price}, amount:{amount}, commission: 54.45")
+_INFO_LINES = [
+    "{ts} - INFO  - ———————————————————————————————————",
+    "{ts} - INFO  - 一进二：{code}.XSHE",
+    "{ts} - INFO  - 今日选股：{code}.XSHE",
+    "{ts} - INFO  - 首板低开：",
+]
+
+
+def generate_log(line_count, order_ratio=0.05, days=5, seed=0):
+    """生成合成的聚宽日志，返回 (日志行列表, 最后一天的日期)"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 2, 24, 9, 26)
+    lines_per_day = max(1, line_count // days)
+    lines = []
+    for i in range(line_count):
+        day = min(i // lines_per_day, days - 1)
+        ts = (start + datetime.timedelta(days=day, seconds=(i % lines_per_day) // 10)).strftime('%Y-%m-%d %H:%M:%S')
+        code = f"{rng.randrange(1, 700000):06d}"
+        r = rng.random()
+        if r < order_ratio / 2:
+            line = _BUY_LINE.format(ts=ts, eid=1740000000 + i, code=code,
+                                    price=round(rng.uniform(2, 100), 2), amount=rng.randrange(1, 100) * 100)
+        elif r < order_ratio:
+            line = _SELL_LINE.format(ts=ts, eid=1740000000 + i, code=code,
+                                     price=round(rng.uniform(2, 100), 2), amount=rng.randrange(1, 100) * 100)
+        else:
+            line = rng.choice(_INFO_LINES).format(ts=ts, code=code)
+        lines.append(line)
+    return lines, (start + datetime.timedelta(days=days - 1)).date()
+
+
+def run_benchmark(line_count, repeat=3):
+    """对指定行数的合成日志运行解析基准测试，返回最好一次的结果"""
+    lines, last_day = generate_log(line_count)
+    best = None
+    for _ in range(repeat):
+        for date in (None, last_day):
+            parser = SignalParser()
+            start = time.perf_counter()
+            signals = parser.parse_lines(lines, date=date)
+            elapsed = time.perf_counter() - start
+            key = 'all_days' if date is None else 'one_day'
+            if best is None:
+                best = {}
+            if key not in best or elapsed < best[key]['seconds']:
+                best[key] = {
+                    'seconds': round(elapsed, 4),
+                    'lines_per_second': round(line_count / elapsed),
+                    'signals': len(signals),
+                    'rejected': parser.stats.rejected
+                }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易信号解析器吞吐量基准测试（单线程）")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="合成日志行数")
+    parser.add_argument('--repeat', type=int, default=3, help="每种规模重复次数，取最好结果")
+    parser.add_argument('--record', action='store_true', help=f"将结果追加到 {RESULT_FILE}")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        result = run_benchmark(size, args.repeat)
+        for key, label in (('all_days', '全部日期'), ('one_day', '只解析当天')):
+            r = result[key]
+            print(f"{size:>10,}行 {label}: {r['seconds']:.3f}秒, {r['lines_per_second']:,}行/秒, "
+                  f"信号{r['signals']}个, 拒绝{r['rejected']}行")
+        results.append({'lines': size, **result})
+
+    if args.record:
+        os.makedirs(os.path.dirname(RESULT_FILE), exist_ok=True)
+        record = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'results': results
+        }
+        with open(RESULT_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {RESULT_FILE}")
+
+
+if __name__ == '__main__':
+    main()
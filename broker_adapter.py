@@ -0,0 +1,190 @@
+import time
+import logging
+
+from window_registry import get_window_registry, is_trading_window_title, ROLE_TRADING
+from popup_detector import load_popup_detector, popup_region, POPUP_NONE, POPUP_UNKNOWN
+from screen_state import load_screen_recognizer, ticket_region
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerAdapter:
+    """
+    下单界面操作接口
+
+    交易执行器只通过这里的方法操作下单界面：按键、组合键、输入文字、管理交易窗口，
+    以及等待和计时。真实环境使用GuiBrokerAdapter驱动同花顺，离线测试和基准测试
+    使用simulated_broker.SimulatedTHSBroker。
+
+    is_开头的界面探测方法供wait_engine按条件等待，返回True/False；当前环境无法
+    探测的条件返回None，执行器会退回固定等待时间。
+    """
+    def is_trading_window_open(self):
+        """交易窗口是否已打开"""
+        raise NotImplementedError
+
+    def open_trading_window(self):
+        """打开交易窗口，返回是否已发起打开操作"""
+        raise NotImplementedError
+
+    def activate_trading_window(self):
+        """将交易窗口置于前台，返回是否成功"""
+        raise NotImplementedError
+
+    def press(self, key):
+        """按下并释放一个键"""
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        """按下组合键"""
+        raise NotImplementedError
+
+    def typewrite(self, text, interval=0.0):
+        """在当前焦点输入文字，interval为每个字符之后的间隔（秒）"""
+        raise NotImplementedError
+
+    def sleep(self, seconds):
+        """等待指定时间"""
+        time.sleep(seconds)
+
+    def is_trading_window_foreground(self):
+        """交易窗口是否在前台"""
+        return None
+
+    def is_ticket_ready(self, mode):
+        """委托单是否已切换到mode（'buy'/'sell'）并可以输入"""
+        return None
+
+    def is_input_ready(self):
+        """委托单当前是否接受输入"""
+        return None
+
+    def is_quote_loaded(self, code):
+        """证券代码code是否已被接受并加载了行情"""
+        return None
+
+    def is_popup_present(self):
+        """提交后的弹窗是否存在"""
+        return None
+
+    def read_popup(self):
+        """识别当前弹窗，返回popup_detector中的POPUP_*结果；无法识别弹窗内容时返回None"""
+        return None
+
+    def read_screen_state(self):
+        """识别交易窗口当前的界面状态，返回screen_state中的SCREEN_*结果；无法识别时返回None"""
+        return None
+
+    def now(self):
+        """单调时钟（秒），与sleep使用同一时间基准"""
+        return time.monotonic()
+
+
+class GuiBrokerAdapter(BrokerAdapter):
+    """
+    通过pyautogui操作本机同花顺下单界面（仅Windows桌面可用，pyautogui在创建时才导入）
+
+    参数:
+        windows: 窗口注册表，None表示使用共享注册表
+        popups: 弹窗识别器，None表示从默认模板目录加载（没有模板时不识别弹窗）
+        screens: 界面状态识别器，None表示加载默认指纹文件（没有指纹时不识别委托单状态）
+    """
+    def __init__(self, windows=None, popups=None, screens=None):
+        import pyautogui
+        self._gui = pyautogui
+        self.windows = windows or get_window_registry()
+        self.popups = popups or load_popup_detector()
+        self.screens = screens or load_screen_recognizer()
+
+    def get_trading_window(self):
+        """获取交易窗口对象，未找到返回None"""
+        return self.windows.get(ROLE_TRADING)
+
+    def is_trading_window_open(self):
+        return self.get_trading_window() is not None
+
+    def open_trading_window(self):
+        from open_ths_client import main as open_ths_main
+        return open_ths_main()
+
+    def activate_trading_window(self):
+        try:
+            window = self.get_trading_window()
+            if window is not None:
+                window.activate()
+                logger.info(f"已激活交易窗口: {window.title}")
+
+                # 点击窗口中心以确保激活
+                self._gui.click(window.left + window.width // 2,
+                                window.top + window.height // 2)
+            else:
+                logger.warning("未找到交易窗口，尝试使用Alt+Tab切换")
+                self._gui.keyDown('alt')
+                self._gui.press('tab')
+                self._gui.keyUp('alt')
+            return True
+        except Exception as e:
+            logger.error(f"激活交易窗口时出错: {e}")
+            self.windows.invalidate()
+            return False
+
+    def is_trading_window_foreground(self):
+        try:
+            window = self._gui.getActiveWindow()
+        except Exception:
+            return None
+        return window is not None and is_trading_window_title(window.title)
+
+    def is_ticket_ready(self, mode):
+        state = self.read_screen_state()
+        return None if state is None else state == mode
+
+    def is_popup_present(self):
+        outcome = self.read_popup()
+        return None if outcome is None else outcome not in (POPUP_NONE, POPUP_UNKNOWN)
+
+    def _capture(self, region_of):
+        """截取交易窗口中的一个区域，返回灰度NumPy数组；失败时返回None"""
+        window = self.get_trading_window()
+        if window is None:
+            return None
+        try:
+            import numpy as np
+            region = region_of(window.left, window.top, window.width, window.height)
+            return np.asarray(self._gui.screenshot(region=region).convert('L'))
+        except Exception as e:
+            logger.error(f"截取交易窗口区域时出错: {e}")
+            return None
+
+    def read_popup(self):
+        """截取交易窗口中部区域，用弹窗模板识别；时间预算用完仍未匹配时返回POPUP_UNKNOWN"""
+        if self.popups is None:
+            return None
+        image = self._capture(popup_region)
+        if image is None:
+            return None
+        result = self.popups.classify(image)
+        if result.outcome != POPUP_NONE:
+            logger.debug(f"识别到弹窗: {result.outcome} 相关系数{result.score:.3f} "
+                        f"用时{result.elapsed * 1000:.1f}毫秒")
+        elif not result.complete:
+            return POPUP_UNKNOWN
+        return result.outcome
+
+    def read_screen_state(self):
+        """截取委托单标题区域，与缓存的界面指纹比较"""
+        if self.screens is None:
+            return None
+        image = self._capture(ticket_region)
+        if image is None:
+            return None
+        return self.screens.recognize(image).state
+
+    def press(self, key):
+        self._gui.press(key)
+
+    def hotkey(self, *keys):
+        self._gui.hotkey(*keys)
+
+    def typewrite(self, text, interval=0.0):
+        self._gui.typewrite(text, interval=interval)
@@ -1,26 +1,20 @@
 import os
+import sys
 import json
+import time
 import base64
 import getpass
+import threading
 from cryptography.fernet import Fernet
 import logging
+from logging_setup import setup_logging
 
-# 配置日志记录
-log_file = 'logs/config_manager.log'
-os.makedirs('logs', exist_ok=True)
-
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
+# 配置日志：记录由后台线程写入 logs/<进程名>/config_manager.log
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+setup_logging()
+
+# 解密后的凭据在内存中保留的最长时间（秒），覆盖一个交易日
+CREDENTIAL_TTL = 8 * 3600
 
 class ConfigManager:
     def __init__(self):
@@ -119,17 +113,118 @@ class ConfigManager:
             print(f"\n错误：初始化凭据失败 - {e}")
             return False
 
+class CredentialProvider:
+    """
+    进程内共享的凭据提供者
+
+    第一次使用时读取密钥和配置文件并解密，解密结果在内存中保留ttl秒；配置文件或
+    密钥文件的修改时间变化时重新解密。缓存有效时只检查两个文件的修改时间，
+    不读取文件，也不做解密，登录等关键路径上取凭据几乎没有开销。
+
+    参数:
+        ttl: 解密结果保留的最长时间（秒）
+        clock: 单调时钟，便于测试
+    """
+    def __init__(self, ttl=CREDENTIAL_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._manager = None
+        self._credentials = None
+        self._loaded_at = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.hits = 0  # 直接使用缓存的次数
+        self.loads = 0  # 读取文件并解密的次数
+
+    def _file_stamp(self, manager):
+        """配置文件和密钥文件的修改时间，文件不存在时为None"""
+        stamps = []
+        for path in (manager.config_file, manager.key_file):
+            try:
+                stamps.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def get(self):
+        """返回 (用户名, 密码)，没有保存凭据或解密失败时返回 (None, None)，不提示输入"""
+        with self._lock:
+            if self._manager is None:
+                self._manager = ConfigManager()
+            stamp = self._file_stamp(self._manager)
+            if self._credentials is not None and stamp == self._stamp \
+                    and self.clock() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._credentials
+            
+            # 密钥文件变化时重新加载密钥
+            if self._stamp is not None and stamp[1] != self._stamp[1]:
+                self._manager = ConfigManager()
+                stamp = self._file_stamp(self._manager)
+            self._credentials = None
+            username, password = self._manager.load_credentials()
+            self.loads += 1
+            if username is None or password is None:
+                return None, None
+            self._credentials = (username, password)
+            self._loaded_at = self.clock()
+            self._stamp = stamp
+            return self._credentials
+
+    def prime(self):
+        """提前解密凭据放入缓存（如启动时在后台进行），返回是否有可用的凭据；不提示输入"""
+        if all(self.get()):
+            return True
+        logger.error("未找到可用的聚宽凭据，请运行 python config_manager.py 配置账号")
+        return False
+
+    def invalidate(self):
+        """丢弃缓存的凭据"""
+        with self._lock:
+            self._credentials = None
+
+    def stats(self):
+        """返回缓存命中和解密次数"""
+        with self._lock:
+            return {'hits': self.hits, 'loads': self.loads, 'cached': self._credentials is not None}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_credential_provider():
+    """获取进程内共享的凭据提供者"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = CredentialProvider()
+        return _provider
+
+def _can_prompt():
+    """当前能否提示用户输入：只有主线程且标准输入是终端时才能"""
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    return sys.stdin is not None and sys.stdin.isatty()
+
 def get_credentials():
-    """获取凭据的便捷函数"""
-    config_manager = ConfigManager()
-    username, password = config_manager.load_credentials()
+    """
+    获取凭据的便捷函数，使用进程内缓存的解密结果
+
+    没有保存凭据时只在主线程且有终端时提示输入；后台线程（如后台重新登录）或无人值守运行时
+    记录错误并立即返回 (None, None)，不会阻塞在等待输入上。
+    """
+    provider = get_credential_provider()
+    username, password = provider.get()
     
     # 如果没有找到凭据，进行初始化
     if username is None or password is None:
-        if not config_manager.initialize_credentials():
+        if not _can_prompt():
+            logger.error("未找到可用的聚宽凭据，当前无法提示输入，请运行 python config_manager.py 配置账号")
+            return None, None
+        if not ConfigManager().initialize_credentials():
             logger.error("初始化凭据失败")
             return None, None
-        username, password = config_manager.load_credentials()
+        provider.invalidate()
+        username, password = provider.get()
     
     return username, password
 
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 订单执行状态
+STATE_PENDING = 'pending'  # 已进入执行流程
+STATE_TYPED = 'typed'  # 委托单已填写，尚未提交
+STATE_SUBMITTED = 'submitted'  # 即将或已经按下提交键
+STATE_CONFIRMED = 'confirmed'  # 提交后的弹窗已处理
+STATE_NO_POPUP = 'no_popup'  # 已提交，但提交后没有出现弹窗，委托可能未生效，需人工核对
+STATE_FAILED = 'failed'  # 执行失败，可以重试
+STATE_EXPIRED = 'expired'  # 超过有效期限，未下单
+STATE_REJECTED = 'rejected'  # 已提交，被券商拒绝（资金不足、超出涨跌停等），不自动重试
+
+# 这些状态的订单不能再次提交
+DONE_STATES = (STATE_SUBMITTED, STATE_CONFIRMED, STATE_NO_POPUP)
+# 这些状态的订单不再执行
+CLOSED_STATES = DONE_STATES + (STATE_EXPIRED, STATE_REJECTED)
+
+LEDGER_FILE = os.path.join('data', 'execution_ledger.jsonl')
+
+
+def signal_key(signal):
+    """获取交易信号在台账中的唯一标识（聚宽委托编号）"""
+    return signal.entrust_id
+
+
+class ExecutionLedger:
+    """
+    仅追加的订单执行台账
+
+    每次状态变化追加一行JSON到台账文件，内存中维护 委托编号 -> 最新状态 的索引。
+    提交状态在按下提交键之前同步落盘，宁可在崩溃时漏单也不重复下单；
+    其他状态的写入按时间间隔批量同步，最后一条记录由后台定时器在间隔到期时同步，
+    不会等到下一次写入或关闭台账。其他进程追加的记录在查询前增量读取。
+
+    参数:
+        path: 台账文件路径
+        sync_interval: 非关键状态批量同步到磁盘的最长间隔（秒）
+    """
+    def __init__(self, path=LEDGER_FILE, sync_interval=0.5):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._index = {}
+        self._lock = threading.Lock()
+        self._read_offset = 0
+        self._last_sync = time.monotonic()
+        self._dirty = False
+        self._sync_timer = None
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._terminate_torn_record()
+        self.refresh()
+        self._report_resume_state()
+
+    def _terminate_torn_record(self):
+        """上次崩溃时写了半行的，补上换行，避免与新记录连在一起"""
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b'\n'
+        if torn:
+            logger.warning("台账文件末尾有不完整的记录，已忽略")
+            self._file.write('\n')
+            self._file.flush()
+
+    def refresh(self):
+        """读取台账文件中新追加的记录（包括其他进程写入的记录）"""
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(self._read_offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            # 只处理完整的行，写入中的半行留到下次读取
+            end = data.rfind(b'\n') + 1
+            for raw_line in data[:end].splitlines():
+                try:
+                    record = json.loads(raw_line.decode('utf-8'))
+                    self._index[record['k']] = record['s']
+                except Exception:
+                    logger.warning(f"忽略损坏的台账记录: {raw_line[:100]!r}")
+            self._read_offset += end
+
+    def _report_resume_state(self):
+        """启动时报告上次未完成的订单"""
+        unconfirmed = [k for k, s in self._index.items() if s in (STATE_SUBMITTED, STATE_NO_POPUP)]
+        unfinished = [k for k, s in self._index.items() if s in (STATE_PENDING, STATE_TYPED)]
+        if unconfirmed:
+            logger.warning(f"以下订单已提交但未确认，不会重复提交，请人工核对: {', '.join(unconfirmed)}")
+        if unfinished:
+            logger.info(f"以下订单上次未提交完成，将重新执行: {', '.join(unfinished)}")
+
+    def state(self, key):
+        """返回订单的最新状态，未记录时返回None"""
+        return self._index.get(key)
+
+    def is_done(self, key):
+        """检查订单是否已经提交过"""
+        return self._index.get(key) in DONE_STATES
+
+    def should_execute(self, key):
+        """检查订单是否需要执行（未提交过且未过期）"""
+        self.refresh()
+        return self._index.get(key) not in CLOSED_STATES
+
+    def mark(self, key, state, **info):
+        """记录订单状态变化"""
+        record = {'k': key, 's': state, 't': round(time.time(), 3)}
+        record.update(info)
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._dirty = True
+            self._index[key] = state
+            if state == STATE_SUBMITTED or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_locked()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.sync_interval, self._sync_when_due)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def _sync_when_due(self):
+        """定时器到期时同步尚未落盘的记录"""
+        with self._lock:
+            self._sync_timer = None
+            if not self._file.closed:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        if self._dirty:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """将已写入的记录同步到磁盘"""
+        with self._lock:
+            self._sync_locked()
+
+    def close(self):
+        """同步并关闭台账文件"""
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._sync_locked()
+            self._file.close()
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_execution_ledger():
+    """获取进程内共享的订单执行台账"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = ExecutionLedger()
+        return _ledger
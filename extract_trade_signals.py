@@ -2,24 +2,13 @@ import json
 import datetime
 import logging
 import os
-from collections import defaultdict
+import hashlib
+from collections import defaultdict, deque
+from signal_parser import SignalParser
+from logging_setup import setup_logging
 
-# 配置日志
-log_file = 'logs/extract_signals.log'
-os.makedirs('logs', exist_ok=True)
-
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# 配置日志：记录由后台线程写入 logs/<进程名>/extract_signals.log
+setup_logging()
 
 def load_log_data(file_path):
     """加载日志数据"""
@@ -40,98 +29,99 @@ def extract_trade_signals(log_data):
     # 获取当前日期
     today = datetime.datetime.now().date()
     
-    log_entries = log_data['data']['logArr']
-    trade_signals = []
-    
-    for log in log_entries:
-        try:
-            # 解析日期和时间
-            date_str = log.split(" - ")[0].strip()
-            date_time = datetime.datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            
-            # 跳过非当天的交易信号
-            if date_time.date() != today:
-                continue
-                
-            # 检查是否包含委托买入信号
-            if "订单已委托" in log and "action=open" in log:
-                # 提取股票代码 - 只保留6位数字
-                security_start = log.find("security=") + len("security=")
-                security_end = log.find(".", security_start)
-                security_full = log[security_start:security_end]
-                security = ''.join(c for c in security_full if c.isdigit())[:6]
-                
-                # 提取价格
-                price_start = log.find("_limit_price=") + len("_limit_price=")
-                price_end = log.find(" ", price_start)
-                price_str = log[price_start:price_end].strip()
-                price = float(price_str)
-                
-                # 提取数量 - 从"调整为"后面提取
-                amount_start = log.find("调整为") + len("调整为")
-                amount_end = log.find(")", amount_start)
-                amount_str = log[amount_start:amount_end].strip()
-                amount = int(''.join(c for c in amount_str if c.isdigit()))
-                
-                # 记录交易信号
-                trade_signal = {
-                    "交易时间": date_time,
-                    "交易类型": "买入",
-                    "股票代码": security,
-                    "价格": price,
-                    "数量": amount
-                }
-                
-                trade_signals.append(trade_signal)
-                print(f"提取到买入信号: {trade_signal}")
-            
-            # 检查是否包含卖出信号
-            elif "action=close" in log and "trade price:" in log:
-                # 提取股票代码 - 只保留6位数字
-                security_start = log.find("security=") + len("security=")
-                security_end = log.find(".", security_start)
-                security_full = log[security_start:security_end]
-                security = ''.join(c for c in security_full if c.isdigit())[:6]
-                
-                # 提取价格 - 从trade price后面提取
-                price_start = log.find("trade price:") + len("trade price:")
-                price_end = log.find(",", price_start)
-                price_str = log[price_start:price_end].strip()
-                price = float(price_str)
-                
-                # 提取数量 - 从amount后面提取
-                amount_start = log.find("amount:") + len("amount:")
-                amount_end = log.find(",", amount_start)
-                amount_str = log[amount_start:amount_end].strip()
-                amount = int(''.join(c for c in amount_str if c.isdigit()))
-                
-                # 记录交易信号
-                trade_signal = {
-                    "交易时间": date_time,
-                    "交易类型": "卖出",
-                    "股票代码": security,
-                    "价格": price,
-                    "数量": amount
-                }
-                
-                trade_signals.append(trade_signal)
-                print(f"提取到卖出信号: {trade_signal}")
-                
-        except Exception as e:
-            print(f"解析交易信号时出错: {e}, 日志内容: {log[:100]}...")
-            continue
+    parser = SignalParser()
+    trade_signals = parser.parse_lines(log_data['data']['logArr'], date=today)
+    if parser.stats.rejected:
+        logging.warning(f"有{parser.stats.rejected}行订单日志无法解析: {list(parser.stats.reject_samples)}")
     
     # 按时间顺序排序
-    trade_signals.sort(key=lambda x: x["交易时间"])
+    trade_signals.sort(key=lambda x: x.trade_time)
     
     return trade_signals
 
+class IncrementalSignalExtractor:
+    """
+    增量交易信号提取器
+    
+    在内存中记录已处理的日志行数，以及第一行和最近若干行的滚动摘要。
+    每次只解析新增的日志行并返回新的交易信号；摘要不一致时说明日志被截断
+    或策略已重启，此时从头重新同步。
+    """
+    # 滚动摘要覆盖的最近日志行数
+    DIGEST_WINDOW = 8
+    
+    def __init__(self):
+        self.processed_count = 0  # 已处理的日志行数
+        self.signals = []  # 当天已提取的全部交易信号
+        self._first_digest = None
+        self._recent_digests = deque(maxlen=self.DIGEST_WINDOW)
+        self._date = None
+        self.parser = SignalParser()
+    
+    @staticmethod
+    def _line_digest(line):
+        return hashlib.blake2b(line.encode('utf-8'), digest_size=8).digest()
+    
+    def _is_continuation(self, log_entries):
+        """检查日志是否是已处理日志的延续"""
+        if self.processed_count == 0:
+            return True
+        if len(log_entries) < self.processed_count:
+            return False
+        if self._line_digest(log_entries[0]) != self._first_digest:
+            return False
+        start = self.processed_count - len(self._recent_digests)
+        return all(self._line_digest(log_entries[start + i]) == digest
+                   for i, digest in enumerate(self._recent_digests))
+    
+    def reset(self):
+        """清除已处理状态，下一次从头解析"""
+        self.processed_count = 0
+        self.signals = []
+        self._first_digest = None
+        self._recent_digests.clear()
+    
+    def process(self, log_entries):
+        """
+        处理日志行列表，只解析上次之后新增的行
+        
+        返回:
+            新提取的当天交易信号列表
+        """
+        today = datetime.datetime.now().date()
+        if self._date != today:
+            self.signals = []
+            self._date = today
+        
+        if not self._is_continuation(log_entries):
+            logging.warning("日志已被截断或策略已重启，重新同步交易信号")
+            self.reset()
+        
+        # 日志列表可能被获取线程继续追加，只处理到当前长度为止
+        end = len(log_entries)
+        rejected_before = self.parser.stats.rejected
+        new_signals = self.parser.parse_lines(log_entries[self.processed_count:end],
+                                              start_offset=self.processed_count, date=today)
+        if self.parser.stats.rejected > rejected_before:
+            logging.warning(f"有{self.parser.stats.rejected - rejected_before}行订单日志无法解析: "
+                            f"{list(self.parser.stats.reject_samples)}")
+        
+        for log in log_entries[max(self.processed_count, end - self.DIGEST_WINDOW):end]:
+            self._recent_digests.append(self._line_digest(log))
+        if end and self._first_digest is None:
+            self._first_digest = self._line_digest(log_entries[0])
+        self.processed_count = end
+        
+        new_signals.sort(key=lambda x: x.trade_time)
+        self.signals.extend(new_signals)
+        return new_signals
+
 def group_trade_signals_by_date(trade_signals):
     """按日期对交易信号进行分组"""
     grouped_signals = defaultdict(list)
     
     for signal in trade_signals:
-        date_key = signal["交易时间"].date()
+        date_key = signal.trade_time.date()
         grouped_signals[date_key].append(signal)
     
     return grouped_signals
@@ -148,7 +138,7 @@ def print_trade_signals(trade_signals):
     print("-" * 80)
     
     for signal in trade_signals:
-        print(f"{signal['交易时间'].strftime('%Y-%m-%d %H:%M:%S'):<20} {signal['交易类型']:<10} {signal['股票代码']:<15} {signal['价格']:<10.2f} {signal['数量']:<10}")
+        print(f"{signal.trade_time.strftime('%Y-%m-%d %H:%M:%S'):<20} {signal.side_label:<10} {signal.security:<15} {signal.price:<10.2f} {signal.amount:<10}")
 
 def print_grouped_signals(grouped_signals):
     """打印分组后的交易信号"""
@@ -163,7 +153,7 @@ def print_grouped_signals(grouped_signals):
         print("-" * 80)
         
         for signal in signals:
-            print(f"{signal['交易时间'].strftime('%Y-%m-%d %H:%M:%S'):<20} {signal['交易类型']:<10} {signal['股票代码']:<15} {signal['价格']:<10.2f} {signal['数量']:<10}")
+            print(f"{signal.trade_time.strftime('%Y-%m-%d %H:%M:%S'):<20} {signal.side_label:<10} {signal.security:<15} {signal.price:<10.2f} {signal.amount:<10}")
 
 def main():
     # 日志数据文件路径
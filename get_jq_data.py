@@ -1,73 +1,70 @@
-import requests
 import json
 import time
 import datetime
 import schedule
 import os
 import logging
-import re
-from extract_trade_signals import extract_trade_signals
-from trade_executor import TradeExecutor
-from config_manager import get_credentials
+from extract_trade_signals import IncrementalSignalExtractor
+from signal_model import SIGNALS_FILE, append_signals
+from latency_metrics import HOP_HTTP_RECEIVED, HOP_PARSED
+from jq_http import get_jq_client
+from jq_session import get_jq_session
+from poll_scheduler import AdaptivePollScheduler
+from logging_setup import setup_logging
 
-# 配置日志记录
-log_file = 'logs/jq_data.log'
-os.makedirs('logs', exist_ok=True)
+# 配置日志：记录由后台线程写入 logs/<进程名>/jq_data.log
+setup_logging()
 
-# 移除所有已存在的处理器
-logger = logging.getLogger()
-for handler in logger.handlers[:]:
-    logger.removeHandler(handler)
+# 聚宽策略日志接口
+JQ_LOG_URL = "https://www.joinquant.com/algorithm/live/log"
+JQ_BACKTEST_ID = "c0d70622b43858da661ffa8261209e0b"
 
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# data.offset的两种含义：本次logArr第一行的行号，或最后一行之后的行号
+OFFSET_START = 'start'
+OFFSET_END = 'end'
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# 本地日志数据和增量获取游标文件
+LOG_DATA_FILE = os.path.join('data', 'jq_log_data.json')
+FETCH_CURSOR_FILE = os.path.join('data', 'jq_fetch_cursor.json')
 
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# 增量交易信号提取器，在进程内保持已处理的日志位置
+_signal_extractor = IncrementalSignalExtractor()
 
-def check_for_new_data(new_data):
-    """检查是否有新数据"""
-    try:
-        with open('data/jq_log_data.json', 'r', encoding='utf-8') as f:
-            old_data = json.load(f)
-        return new_data['data']['logArr'] != old_data['data']['logArr']
-    except FileNotFoundError:
-        return True
-    except json.JSONDecodeError:
-        return True
-    except Exception as e:
-        logging.error(f"检查新数据时出错: {e}")
-        return False
-
-def process_new_data():
-    """处理新数据，提取交易信号并执行交易"""
+def process_new_data(log_data=None, received_at=None):
+    """
+    处理新数据，只提取新增日志行中的交易信号
+    
+    新信号追加保存到交易信号文件，其他进程通过监视该文件获取。
+    
+    参数:
+        received_at: 收到包含这些日志行的HTTP响应的时间，连同解析完成的时间写入信号文件，
+            供另一进程中的执行器计算端到端延迟
+    返回:
+        新交易信号列表
+    """
     try:
-        # 加载最新的日志数据
-        with open('data/jq_log_data.json', 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
+        if log_data is None:
+            log_data = get_local_log_data()
+        if not log_data:
+            logging.error("没有可处理的日志数据")
+            return []
         
-        # 提取交易信号（已修改为只提取当天的交易信号）
-        trade_signals = extract_trade_signals(log_data)
+        # 只解析上次处理之后新增的日志行（只提取当天的交易信号）
+        new_signals = _signal_extractor.process(log_data['data']['logArr'])
         
-        if trade_signals:
-            # 保存提取的交易信号
-            with open('data/trade_signals.json', 'w', encoding='utf-8') as f:
-                json.dump(trade_signals, f, ensure_ascii=False, indent=2)
-            logging.info(f"已提取{len(trade_signals)}个交易信号并保存")
-            
-            # 执行交易
-            executor = TradeExecutor()
-            executor.execute_all_trades(trade_signals)
+        if new_signals:
+            # 追加保存新的交易信号
+            hops = None
+            if received_at is not None:
+                hops = {HOP_HTTP_RECEIVED: received_at, HOP_PARSED: time.time()}
+            append_signals(SIGNALS_FILE, new_signals, hops)
+            logging.info(f"已提取{len(new_signals)}个新交易信号并保存")
         else:
             logging.info("未发现新的交易信号")
+        return new_signals
     except Exception as e:
         logging.error(f"处理新数据时出错: {e}")
+        return []
 
 
 def is_trading_time():
@@ -88,305 +85,252 @@ def is_trading_time():
     return ((current_time >= morning_start and current_time <= morning_end) or
             (current_time >= afternoon_start and current_time <= afternoon_end))
 
-def is_special_time_point():
-    """检查当前是否为需要特殊处理的时间点"""
-    now = datetime.datetime.now()
-    current_time = now.strftime('%H:%M')
-    special_times = ['09:01', '09:26', '11:25', '14:50']
-    return current_time in special_times
-
 def update_cookies():
-    """自动更新cookies"""
-    try:
-        logging.info("尝试自动更新cookies...")
-        
-        # 设置请求头
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        
-        # 创建会话并设置重定向处理
-        session = requests.Session()
-        session.max_redirects = 5
-        
-        # 访问聚宽登录页面获取初始cookies和CSRF令牌
-        login_url = "https://www.joinquant.com/user/login/index?type=login"
-        response = session.get(login_url, headers=headers)
-        
-        if response.status_code != 200:
-            logging.error(f"访问登录页面失败，状态码: {response.status_code}")
-            return None, None
-            
-        # 尝试从页面内容中提取token
-        window_token = None
-        try:
-            # 查找页面中的token
-            token_match = re.search(r'window\.tokenData={name:"token",value:"([^"]+)"', response.text)
-            if token_match:
-                window_token = token_match.group(1)
-                logging.info(f"成功从页面提取token")
-            else:
-                logging.error("未能从页面提取token")
-                return None, None
-        except Exception as e:
-            logging.warning(f"从页面提取token时出错: {e}")
-            return None, None
-        
-        # 从配置文件获取加密的用户名和密码
-        username, password = get_credentials()
-        if not username or not password:
-            logging.error("无法获取登录凭据，请确保已正确配置账号信息")
-            return None, None
-            
-        # 执行登录操作
-        login_data = {
-            'username': username,
-            'password': password,
-            'remember_me': 'true',
-            'return_url': '/',
-            'type': 'login'
-        }
-        
-        # 不再需要CSRF令牌，直接使用window_token
-        # 聚宽网站现在使用window_token进行身份验证
-        
-        # 更新请求头
-        headers['Referer'] = login_url
-        headers['Origin'] = 'https://www.joinquant.com'
-        headers['Content-Type'] = 'application/x-www-form-urlencoded'
-        headers['X-Requested-With'] = 'XMLHttpRequest'
-        
-        # 发送登录请求
-        login_api = "https://www.joinquant.com/user/login/index"
-        login_data['token'] = window_token  # 添加从页面获取的token
-        login_response = session.post(login_api, data=login_data, headers=headers, allow_redirects=True)
-        
-        if login_response.status_code != 200:
-            logging.error(f"登录请求失败，状态码: {response.status_code}")
-            return None, None
-            
-        # 检查登录响应是否包含成功信息
-        try:
-            login_result = login_response.json()
-            if login_result.get('code') != 200:
-                logging.error(f"登录失败: {login_result.get('msg', '未知错误')}")
-                logging.error(f"详细错误信息: {json.dumps(login_result, ensure_ascii=False, indent=2)}")
-                logging.debug(f"登录请求详情 - URL: {login_api}, 用户名: {username}, 响应内容: {login_response.text}")
-                return None, None
-            logging.info("登录API返回成功状态")
-        except Exception as e:
-            logging.warning(f"解析登录响应时出错: {e}，继续尝试获取cookies")
-            logging.debug(f"登录响应内容: {login_response.text}")
-        
-        # 获取cookies
-        cookies_dict = session.cookies.get_dict()
-        
-        if not cookies_dict:
-            logging.error("无法获取新的cookies")
-            return None, None
-        
-        # 检查是否包含_xsrf字段
-        if '_xsrf' not in cookies_dict:
-            logging.warning("获取的新cookies中缺少_xsrf字段，尝试访问多个页面获取完整cookies")
-            
-            # 尝试访问多个页面，以获取完整的cookies
-            try:
-                # 访问用户主页
-                home_url = "https://www.joinquant.com/user/home/index"
-                session.get(home_url, headers=headers)
-                
-                # 访问算法页面
-                algo_url = "https://www.joinquant.com/algorithm"
-                session.get(algo_url, headers=headers)
-                
-                # 访问社区页面
-                community_url = "https://www.joinquant.com/community"
-                session.get(community_url, headers=headers)
-                
-                # 更新cookies
-                cookies_dict = session.cookies.get_dict()
-                logging.info("已尝试通过访问多个页面获取完整cookies")
-            except Exception as e:
-                logging.error(f"尝试获取完整cookies时出错: {e}")
-        
-        # 再次检查_xsrf字段
-        if '_xsrf' in cookies_dict:
-            xsrf = cookies_dict['_xsrf']
-            parts = xsrf.split('|')
-            if len(parts) < 4:
-                logging.warning(f"_xsrf格式不正确: {xsrf}，可能无法正确判断过期时间")
-            else:
-                try:
-                    timestamp = int(parts[3])
-                    expiry_date = datetime.datetime.fromtimestamp(timestamp)
-                    current_date = datetime.datetime.now()
-                    days_to_expiry = (expiry_date - current_date).days
-                    logging.info(f"获取的新cookies将在{days_to_expiry}天后过期")
-                except Exception as e:
-                    logging.warning(f"解析_xsrf中的过期时间出错: {e}")
-        else:
-            logging.warning("获取的新cookies中仍然缺少_xsrf字段，可能会影响过期时间检测")
-            
-        # 将cookies保存到文件
-        cookies_path = os.path.join('data', 'cookies.txt')
-        cookies_str = '; '.join([f"{name}={value}" for name, value in cookies_dict.items()])
-        
-        with open(cookies_path, 'w', encoding='utf-8') as f:
-            f.write(cookies_str)
-            
-        logging.info("已获取新的cookies并保存到文件")
-        return cookies_dict, headers
-    except Exception as e:
-        logging.error(f"更新cookies时出错: {e}")
+    """立即重新登录聚宽并保存cookies，返回 (cookies, 请求头)"""
+    session = get_jq_session()
+    if not session.refresh(force=True):
         return None, None
+    return session.get()
 
 def load_cookies():
-    """从cookies.txt文件加载cookies"""
+    """
+    获取内存中的聚宽会话cookies
+
+    会话由jq_session在后台刷新，这里不读取文件也不登录；没有可用的会话时返回 (None, None)。
+    """
+    return get_jq_session().get()
+
+_local_log_data = None
+
+def get_local_log_data():
+    """获取内存中的本地日志数据，首次调用时从文件加载"""
+    global _local_log_data
+    if _local_log_data is None:
+        _local_log_data = load_local_log_data()
+    return _local_log_data
+
+def load_local_log_data():
+    """从文件加载本地保存的聚宽日志数据"""
     try:
-        cookies_path = os.path.join('data', 'cookies.txt')
-        if not os.path.exists(cookies_path):
-            logging.error(f"Cookies文件不存在: {cookies_path}")
-            # 尝试自动更新cookies
-            return update_cookies()
-            
-        with open(cookies_path, 'rb') as f:
-            cookies_bytes = f.read()
-            # 尝试不同的编码方式解码
-            encodings = ['utf-8', 'utf-16', 'utf-16le', 'gbk', 'gb2312', 'ascii']
-            cookies_str = None
-            for encoding in encodings:
-                try:
-                    cookies_str = cookies_bytes.decode(encoding).strip()
-                    logging.info(f"成功使用{encoding}编码解析cookies文件")
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if cookies_str is None:
-                logging.error("无法使用任何已知编码解析cookies文件")
-                return update_cookies()
-        
-        # 解析cookies字符串为字典
-        cookies_dict = {}
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # 分割cookies字符串并解析为字典
-        for item in cookies_str.split(';'):
-            if '=' in item:
-                name, value = item.strip().split('=', 1)
-                cookies_dict[name] = value
-        
-        # 检查token是否存在，用于判断cookies是否有效
-        if 'token' not in cookies_dict:
-            logging.error("Cookies中没有找到token")
-            # 尝试自动更新cookies
-            return update_cookies()
-            
-        # 检查_xsrf字段，它通常包含过期时间信息
-        if '_xsrf' not in cookies_dict:
-            logging.warning("Cookies中缺少过期时间信息，尝试更新cookies")
-            return update_cookies()
-            
-        xsrf = cookies_dict['_xsrf']
-        # 尝试从_xsrf中提取时间戳
+        with open(LOG_DATA_FILE, 'r', encoding='utf-8') as f:
+            log_data = json.load(f)
+        if not _is_valid_log_response(log_data):
+            logging.warning("本地日志数据格式不正确，将执行全量同步")
+            return None
+        return log_data
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        logging.warning("本地日志数据不是有效的JSON格式，将执行全量同步")
+        return None
+
+def save_local_log_data(log_data):
+    """保存聚宽日志数据到本地，并更新内存中的副本"""
+    global _local_log_data
+    _local_log_data = log_data
+    with open(LOG_DATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(log_data, f, indent=4, ensure_ascii=False)
+
+def _is_valid_log_response(data):
+    """检查日志接口返回的数据结构是否完整"""
+    return (isinstance(data, dict)
+            and isinstance(data.get('data'), dict)
+            and isinstance(data['data'].get('logArr'), list)
+            and 'offset' in data['data'])
+
+class LogFetchCursor:
+    """
+    聚宽日志增量获取游标
+    
+    目前服务端返回的data.offset是本次logArr第一行的行号（全量请求offset=-1返回offset 0），
+    下一次请求的offset为 data.offset + len(logArr)。每次全量同步时按返回的offset判断其含义：
+    全量日志非空且offset等于行数时，说明服务端报告的是结束位置，之后直接使用该值作为下一次的offset。
+    游标与本地日志行数一起保存，两者不一致、策略ID变化或跨日时都会触发全量同步。
+    """
+    def __init__(self, backtest_id, cursor_file=FETCH_CURSOR_FILE):
+        self.backtest_id = backtest_id
+        self.cursor_file = cursor_file
+        self.offset = None  # 下一次请求的offset，None表示需要全量同步
+        self.line_count = 0  # 游标对应的本地日志行数
+        self.date = None  # 游标建立的日期
+        self.offset_mode = OFFSET_START  # 服务端data.offset的含义
+        self._load()
+    
+    def _load(self):
+        """从文件加载游标"""
         try:
-            # _xsrf格式通常为: 2|ffc493a1|18404ccad881b1822f58a5db6c063ba1|1740763534
-            parts = xsrf.split('|')
-            if len(parts) >= 4:
-                timestamp = int(parts[3])
-                expiry_date = datetime.datetime.fromtimestamp(timestamp)
-                current_date = datetime.datetime.now()
-                
-                # 如果过期时间在当前时间之前，则cookies已过期
-                if expiry_date < current_date:
-                    logging.warning(f"Cookies已过期! 过期时间: {expiry_date}")
-                    # 尝试自动更新cookies
-                    return update_cookies()
-                
-                # 如果过期时间在7天内，发出警告
-                days_to_expiry = (expiry_date - current_date).days
-                if days_to_expiry < 7:
-                    logging.warning(f"Cookies即将在{days_to_expiry}天后过期，请及时更新")
-                    # 如果过期时间在1天内，尝试自动更新
-                    if days_to_expiry <= 1:
-                        logging.warning("Cookies即将在1天内过期，尝试自动更新")
-                        return update_cookies()
-            else:
-                logging.warning("_xsrf格式不正确，尝试更新cookies")
-                return update_cookies()
+            with open(self.cursor_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('backtest_id') != self.backtest_id:
+                logging.info("策略ID已变化，忽略已保存的日志游标")
+                return
+            self.offset = state.get('offset')
+            self.line_count = state.get('line_count', 0)
+            self.date = state.get('date')
+            self.offset_mode = state.get('offset_mode', OFFSET_START)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            logging.error(f"解析cookies过期时间出错: {e}")
-            return update_cookies()
-        
-        logging.info("成功加载cookies")
-        return cookies_dict, headers
-    except Exception as e:
-        logging.error(f"加载cookies时出错: {e}")
-        return None, None
+            logging.warning(f"加载日志游标时出错: {e}，将执行全量同步")
+            self.offset = None
+    
+    def save(self):
+        """保存游标到文件"""
+        try:
+            state = {
+                'backtest_id': self.backtest_id,
+                'offset': self.offset,
+                'line_count': self.line_count,
+                'date': self.date,
+                'offset_mode': self.offset_mode
+            }
+            with open(self.cursor_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+        except Exception as e:
+            logging.error(f"保存日志游标时出错: {e}")
+    
+    def is_usable(self, local_line_count):
+        """检查游标是否可用于增量获取"""
+        today = datetime.date.today().isoformat()
+        return (self.offset is not None
+                and self.date == today
+                and self.line_count == local_line_count)
+    
+    def detect_offset_mode(self, offset, line_count):
+        """根据全量同步的返回判断data.offset的含义"""
+        mode = OFFSET_END if line_count > 0 and int(offset) == line_count else OFFSET_START
+        if mode != self.offset_mode:
+            logging.warning(f"日志接口的offset含义为{mode}（全量{line_count}行，offset={offset}）")
+            self.offset_mode = mode
+    
+    def matches(self, offset, line_count):
+        """增量响应是否从游标位置开始"""
+        start = int(offset) - line_count if self.offset_mode == OFFSET_END else int(offset)
+        return start == self.offset
+    
+    def advance(self, offset, line_count, total_line_count):
+        """根据服务端返回的offset和本次行数推进游标"""
+        self.offset = int(offset) if self.offset_mode == OFFSET_END else int(offset) + line_count
+        self.line_count = total_line_count
+        self.date = datetime.date.today().isoformat()
+        self.save()
+    
+    def reset(self):
+        """清除游标，下一次获取执行全量同步"""
+        self.offset = None
+        self.line_count = 0
+        self.date = None
+        self.save()
 
-def fetch_jq_data():
-    """获取聚宽数据"""
-    if not is_trading_time():
-        logging.info("当前不是交易时间")
-        return False
+_fetch_cursor = None
+
+def get_fetch_cursor():
+    """获取全局日志游标"""
+    global _fetch_cursor
+    if _fetch_cursor is None:
+        _fetch_cursor = LogFetchCursor(JQ_BACKTEST_ID)
+    return _fetch_cursor
+
+def request_log_data(cookies, headers, offset):
+    """请求聚宽日志接口，offset为-1时返回完整日志"""
+    params = {
+        "backtestId": JQ_BACKTEST_ID,
+        "offset": str(offset),
+        "ajax": "1"
+    }
+    response = get_jq_client().get(JQ_LOG_URL, params=params, cookies=cookies, headers=headers)
+    logging.info(f"状态码: {response.status_code}, offset: {offset}, {response.timing.summary()}")
+    return response.json()
+
+def sync_log_data(cookies, headers):
+    """
+    同步聚宽日志到本地
+    
+    优先使用游标增量获取新日志行并追加到本地日志，游标被拒绝或策略重启时
+    回退为全量同步。
+    
+    返回:
+        新增的日志行列表
+    """
+    cursor = get_fetch_cursor()
+    local_data = get_local_log_data()
+    local_lines = local_data['data']['logArr'] if local_data else []
+    
+    if local_data is not None and cursor.is_usable(len(local_lines)):
+        data = request_log_data(cookies, headers, cursor.offset)
+        if _is_valid_log_response(data) and cursor.matches(data['data']['offset'], len(data['data']['logArr'])):
+            new_lines = data['data']['logArr']
+            if new_lines:
+                local_lines.extend(new_lines)
+                local_data['data']['state'] = data['data'].get('state', local_data['data'].get('state'))
+                save_local_log_data(local_data)
+                logging.info(f"增量获取到{len(new_lines)}行新日志，已追加到 jq_log_data.json 文件")
+            cursor.advance(data['data']['offset'], len(new_lines), len(local_lines))
+            return new_lines
+        logging.warning("日志游标被服务端拒绝或策略已重启，执行全量同步")
+        cursor.reset()
     
-    # 检查是否为特殊时间点，如果是则延迟30秒
-    if is_special_time_point():
-        logging.info("当前为关键时间点，延迟30秒后检查数据...")
-        time.sleep(30)
+    data = request_log_data(cookies, headers, -1)
+    if not _is_valid_log_response(data):
+        logging.error("日志接口返回的数据格式不正确")
+        return []
+    
+    full_lines = data['data']['logArr']
+    if full_lines[:len(local_lines)] == local_lines:
+        new_lines = full_lines[len(local_lines):]
+    else:
+        logging.info("本地日志与服务端不一致，以服务端日志为准")
+        new_lines = full_lines
+    
+    save_local_log_data(data)
+    logging.info("全量同步完成，数据已保存到 jq_log_data.json 文件")
+    cursor.detect_offset_mode(data['data']['offset'], len(full_lines))
+    cursor.advance(data['data']['offset'], len(full_lines), len(full_lines))
+    return new_lines
+
+def fetch_new_log_lines(force=False):
+    """
+    获取聚宽日志的新增行并同步到本地，不做交易信号提取
+    
+    参数:
+        force: 为True时非交易时间也获取（开盘前预热）
+    返回:
+        新增的日志行列表，非交易时间、没有新数据或出错时返回空列表
+    """
+    if not force and not is_trading_time():
+        logging.info("当前不是交易时间")
+        return []
     
     try:
         # 加载cookies
         cookies, headers = load_cookies()
         if not cookies or not headers:
-            logging.error("无法加载cookies，请检查cookies.txt文件或手动更新cookies")
-            return False
+            logging.error("没有可用的聚宽会话，后台正在重新登录；持续失败时请检查聚宽账号凭据（python config_manager.py）")
+            return []
     except Exception as e:
         logging.error(f"加载cookies时出错: {e}")
-        return False
-    
-    url = "https://www.joinquant.com/algorithm/live/log"
-    params = {
-        "backtestId": "c0d70622b43858da661ffa8261209e0b",
-        "offset": "-1",
-        "ajax": "1"
-    }
+        return []
 
     try:
-        response = requests.get(url, params=params, cookies=cookies, headers=headers)
-        logging.info(f"状态码: {response.status_code}")
-        
-        # 尝试解析JSON响应
-        try:
-            data = response.json()
-            
-            # 检查是否有新数据
-            has_new_data = check_for_new_data(data)
-            
-            # 将数据保存到文件
-            with open("data/jq_log_data.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            logging.info("数据已更新并保存到 jq_log_data.json 文件")
-            
-            # 如果有新数据，触发交易信号提取和执行
-            if has_new_data:
-                logging.info("检测到新数据，触发交易信号提取和执行")
-                process_new_data()
-                return True
-            
-            return False
-        except json.JSONDecodeError:
-            logging.error("响应不是有效的JSON格式")
-            return False
+        return sync_log_data(cookies, headers)
+    except json.JSONDecodeError:
+        logging.error("响应不是有效的JSON格式")
+        return []
     except Exception as e:
         logging.error(f"发生错误: {e}")
-        return False
+        return []
+
+def fetch_jq_data(force=False):
+    """获取聚宽数据，有新数据时提取交易信号"""
+    new_lines = fetch_new_log_lines(force)
+    
+    # 如果有新数据，触发交易信号提取
+    if new_lines:
+        logging.info("检测到新数据，触发交易信号提取")
+        process_new_data(get_local_log_data())
+        return True
+    
+    return False
 
 def check_cookies_status():
     """检查cookies状态并输出信息"""
@@ -421,15 +365,18 @@ def check_cookies_status():
         logging.info("Cookies状态：缺少过期时间信息")
 
 def main():
-    # 设置定时任务，每5分钟执行一次数据获取
-    schedule.every(5).minutes.do(fetch_jq_data)
+    # 数据获取由自适应轮询调度器驱动：下单时间点附近高频轮询，其余时段低频轮询
+    poll_scheduler = AdaptivePollScheduler(fetch_jq_data)
     # 设置定时任务，每10分钟检查一次cookies状态
     schedule.every(10).minutes.do(check_cookies_status)
     
     logging.info("开始运行数据获取程序...")
+    # 聚宽会话在后台刷新，获取数据时不会等待登录
+    get_jq_session().start_refresher()
     # 立即执行一次数据获取和cookies状态检查
-    fetch_jq_data()
+    poll_scheduler.poll_once()
     check_cookies_status()
+    poll_scheduler.start()
     
     # 持续运行定时任务
     while True:
@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 所有聚宽请求共用的默认请求头
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Connection': 'keep-alive'
+}
+
+# 连接超时和读取超时（秒）
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# 当前线程中最近一次建立连接的耗时，由带计时的连接类写入
+_connect_timing = threading.local()
+
+
+class _TimedConnectionMixin:
+    """记录新建连接耗时（DNS解析+TCP连接）"""
+    def _new_conn(self):
+        start = time.perf_counter()
+        conn = super()._new_conn()
+        _connect_timing.connect = time.perf_counter() - start
+        return conn
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """在新建连接耗时之外额外记录TLS握手耗时"""
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        total = time.perf_counter() - start
+        _connect_timing.tls = max(0.0, total - getattr(_connect_timing, 'connect', 0.0))
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用带计时连接类的连接池适配器"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+class RequestTiming:
+    """
+    单次请求的耗时明细（秒）
+
+    connect为DNS解析与TCP连接的合计耗时，复用连接时connect和tls均为0。
+    """
+    __slots__ = ('method', 'url', 'status', 'reused', 'connect', 'tls', 'ttfb', 'body', 'total', 'size')
+
+    def __init__(self, method, url, status, reused, connect, tls, ttfb, body, total, size):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.reused = reused
+        self.connect = connect
+        self.tls = tls
+        self.ttfb = ttfb
+        self.body = body
+        self.total = total
+        self.size = size
+
+    def summary(self):
+        """返回便于记录日志的耗时摘要"""
+        conn = "复用连接" if self.reused else f"建连{self.connect * 1000:.0f}ms TLS{self.tls * 1000:.0f}ms"
+        return (f"{conn} 首字节{self.ttfb * 1000:.0f}ms 响应体{self.body * 1000:.0f}ms "
+                f"总计{self.total * 1000:.0f}ms {self.size}字节")
+
+
+class JQHttpClient:
+    """
+    聚宽HTTP客户端
+
+    在整个进程内共用一个带连接池的requests.Session，保持长连接，
+    请求默认带压缩请求头和连接/读取超时，并记录每次请求的耗时明细。
+
+    参数:
+        pool_maxsize: 每个主机保持的最大连接数
+        connect_timeout: 连接超时（秒）
+        read_timeout: 读取超时（秒）
+    """
+    def __init__(self, pool_maxsize=4, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.max_redirects = 5
+        adapter = TimedHTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.last_timing = None
+        self.timings = deque(maxlen=200)  # 最近请求的耗时明细
+
+    def request(self, method, url, **kwargs):
+        """发送请求并记录耗时明细"""
+        kwargs.setdefault('timeout', self.timeout)
+        _connect_timing.connect = 0.0
+        _connect_timing.tls = 0.0
+
+        start = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        total = time.perf_counter() - start
+
+        connect = _connect_timing.connect
+        tls = _connect_timing.tls
+        headers_elapsed = response.elapsed.total_seconds()
+        timing = RequestTiming(
+            method=method,
+            url=url,
+            status=response.status_code,
+            reused=connect == 0.0,
+            connect=connect,
+            tls=tls,
+            ttfb=max(0.0, headers_elapsed - connect - tls),
+            body=max(0.0, total - headers_elapsed),
+            total=total,
+            size=len(response.content)
+        )
+        response.timing = timing
+        self.last_timing = timing
+        self.timings.append(timing)
+        logger.debug(f"{method} {url} {response.status_code}: {timing.summary()}")
+        return response
+
+    def get(self, url, **kwargs):
+        """发送GET请求"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """发送POST请求"""
+        return self.request('POST', url, **kwargs)
+
+    @property
+    def cookies(self):
+        """会话中的cookies"""
+        return self.session.cookies
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_jq_client():
+    """获取进程内共享的聚宽HTTP客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = JQHttpClient()
+        return _client
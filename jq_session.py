@@ -0,0 +1,423 @@
+import os
+import re
+import json
+import time
+import logging
+import datetime
+import threading
+
+from config_manager import get_credentials
+from jq_http import JQHttpClient
+
+logger = logging.getLogger(__name__)
+
+COOKIES_FILE = os.path.join('data', 'cookies.txt')
+# cookies文件可能由浏览器导出，依次尝试这些编码
+COOKIE_FILE_ENCODINGS = ('utf-8', 'utf-16', 'utf-16le', 'gbk', 'gb2312', 'ascii')
+
+# 请求日志接口时使用的请求头
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 距离过期不足这么长时间时在后台重新登录
+REFRESH_MARGIN = datetime.timedelta(days=1)
+# 距离过期不足这么长时间时记录警告
+WARN_MARGIN = datetime.timedelta(days=7)
+# 开盘前的检查时间：在此之后、开盘之前确保会话有效
+PRE_OPEN_CHECK = datetime.time(9, 0)
+# 交易时段：会话仍能用到收盘时，时段内不因临近过期而登录
+TRADING_START = datetime.time(9, 30)
+MARKET_CLOSE = datetime.time(15, 0)
+# 后台检查的最长间隔和两次登录之间的最短间隔（秒）
+CHECK_INTERVAL = 600
+RETRY_INTERVAL = 60
+# 连续登录失败时重试间隔逐次加倍，最长不超过该值（秒）
+MAX_RETRY_INTERVAL = 600
+
+LOGIN_URL = "https://www.joinquant.com/user/login/index?type=login"
+LOGIN_API = "https://www.joinquant.com/user/login/index"
+
+
+def parse_cookie_string(text):
+    """将 name=value; name2=value2 形式的字符串解析为字典"""
+    cookies = {}
+    for item in text.split(';'):
+        if '=' in item:
+            name, value = item.strip().split('=', 1)
+            cookies[name] = value
+    return cookies
+
+
+def read_cookie_file(path=COOKIES_FILE):
+    """读取cookies文件，返回cookies字典；文件不存在或无法解码时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        logger.error(f"Cookies文件不存在: {path}")
+        return None
+    for encoding in COOKIE_FILE_ENCODINGS:
+        try:
+            return parse_cookie_string(data.decode(encoding).strip())
+        except UnicodeDecodeError:
+            continue
+    logger.error("无法使用任何已知编码解析cookies文件")
+    return None
+
+
+def cookie_expiry(cookies):
+    """
+    从_xsrf中提取cookies的过期时间
+
+    _xsrf格式通常为: 2|ffc493a1|18404ccad881b1822f58a5db6c063ba1|1740763534
+
+    返回:
+        过期时间（datetime），无法判断时返回None
+    """
+    parts = (cookies or {}).get('_xsrf', '').split('|')
+    if len(parts) < 4:
+        return None
+    try:
+        return datetime.datetime.fromtimestamp(int(parts[3]))
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def login():
+    """
+    用保存的账号登录聚宽，返回新的cookies字典，失败返回None
+
+    先访问登录页面获取token，再提交账号密码；登录后缺少_xsrf时访问几个页面补全cookies。
+    登录使用单独的短期会话，不修改获取数据共用的长连接客户端，登录完成后关闭。
+    """
+    session = JQHttpClient(pool_maxsize=1)
+    try:
+        logger.info("尝试自动更新cookies...")
+
+        # 设置请求头
+        headers = {
+            'User-Agent': REQUEST_HEADERS['User-Agent'],
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1'
+        }
+
+        # 访问聚宽登录页面获取初始cookies和token
+        response = session.get(LOGIN_URL, headers=headers)
+        if response.status_code != 200:
+            logger.error(f"访问登录页面失败，状态码: {response.status_code}")
+            return None
+
+        token_match = re.search(r'window\.tokenData={name:"token",value:"([^"]+)"', response.text)
+        if not token_match:
+            logger.error("未能从页面提取token")
+            return None
+        window_token = token_match.group(1)
+        logger.info("成功从页面提取token")
+
+        # 从配置文件获取加密的用户名和密码
+        username, password = get_credentials()
+        if not username or not password:
+            logger.error("无法获取登录凭据，请确保已正确配置账号信息")
+            return None
+
+        # 执行登录操作，聚宽使用页面中的token进行身份验证
+        login_data = {
+            'username': username,
+            'password': password,
+            'remember_me': 'true',
+            'return_url': '/',
+            'type': 'login',
+            'token': window_token
+        }
+        headers['Referer'] = LOGIN_URL
+        headers['Origin'] = 'https://www.joinquant.com'
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        headers['X-Requested-With'] = 'XMLHttpRequest'
+
+        login_response = session.post(LOGIN_API, data=login_data, headers=headers, allow_redirects=True)
+        if login_response.status_code != 200:
+            logger.error(f"登录请求失败，状态码: {login_response.status_code}")
+            return None
+
+        # 检查登录响应是否包含成功信息
+        try:
+            login_result = login_response.json()
+            if login_result.get('code') != 200:
+                logger.error(f"登录失败: {login_result.get('msg', '未知错误')}")
+                logger.error(f"详细错误信息: {json.dumps(login_result, ensure_ascii=False, indent=2)}")
+                return None
+            logger.info("登录API返回成功状态")
+        except Exception as e:
+            logger.warning(f"解析登录响应时出错: {e}，继续尝试获取cookies")
+            logger.debug(f"登录响应内容: {login_response.text}")
+
+        cookies = session.cookies.get_dict()
+        if not cookies:
+            logger.error("无法获取新的cookies")
+            return None
+
+        # 缺少_xsrf时访问用户主页、算法页面和社区页面以获取完整的cookies
+        if '_xsrf' not in cookies:
+            logger.warning("获取的新cookies中缺少_xsrf字段，尝试访问多个页面获取完整cookies")
+            try:
+                for url in ("https://www.joinquant.com/user/home/index",
+                            "https://www.joinquant.com/algorithm",
+                            "https://www.joinquant.com/community"):
+                    session.get(url, headers=headers)
+                    if '_xsrf' in session.cookies.get_dict():
+                        break
+                cookies = session.cookies.get_dict()
+            except Exception as e:
+                logger.error(f"尝试获取完整cookies时出错: {e}")
+        if '_xsrf' not in cookies:
+            logger.warning("获取的新cookies中仍然缺少_xsrf字段，可能会影响过期时间检测")
+        return cookies
+    except Exception as e:
+        logger.error(f"更新cookies时出错: {e}")
+        return None
+    finally:
+        session.close()
+
+
+class JQSession:
+    """
+    聚宽登录会话
+
+    cookies保存在内存中，所有组件共用；获取数据时只读取内存，不解析文件也不登录。
+    cookies文件的修改时间变化时（其他进程刷新了会话）重新读取，进程之间通过文件共享会话。
+    后台线程在距离过期不足refresh_margin、或开盘前会话即将失效时重新登录；
+    交易时段内只在会话撑不到收盘时登录。登录失败后按逐次加倍的间隔重试
+    （RETRY_INTERVAL起，最长MAX_RETRY_INTERVAL）。记录每次刷新的耗时和失败次数。
+
+    参数:
+        path: cookies文件
+        login_func: 登录函数，返回cookies字典或None
+        refresh_margin: 距离过期不足这么长时间时重新登录
+        clock: 获取当前时间的函数，便于测试
+    """
+    def __init__(self, path=COOKIES_FILE, login_func=login, refresh_margin=REFRESH_MARGIN,
+                 clock=datetime.datetime.now):
+        self.path = path
+        self.login_func = login_func
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._cookies = None
+        self._expiry = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_retry = 0.0
+        self._consecutive_failures = 0
+        self.reloads = 0  # 从文件读取cookies的次数
+        self.refreshes = 0  # 成功登录的次数
+        self.failures = 0  # 登录失败的次数
+        self.last_refresh_seconds = None
+        self.max_refresh_seconds = 0.0
+        self.last_refresh_at = None
+        self.last_error = None
+
+    # ---- 读取 ----
+
+    def get(self):
+        """
+        返回 (cookies, 请求头)，没有可用的会话时返回 (None, None)
+
+        只检查一次文件修改时间，不会阻塞在登录上；会话需要刷新时通知后台线程。
+        """
+        self._reload_if_changed()
+        with self._lock:
+            cookies, expiry = self._cookies, self._expiry
+        now = self.clock()
+        if not self._usable(cookies, expiry, now):
+            self.request_refresh()
+            return None, None
+        if self._needs_refresh(cookies, expiry, now):
+            self.request_refresh()
+        return dict(cookies), dict(REQUEST_HEADERS)
+
+    def request_refresh(self):
+        """通知后台线程检查并刷新会话，不等待结果"""
+        self.start_refresher()
+        self._wakeup.set()
+
+    def _usable(self, cookies, expiry, now):
+        return bool(cookies) and 'token' in cookies and expiry is not None and expiry > now
+
+    def _needs_refresh(self, cookies, expiry, now):
+        return not self._usable(cookies, expiry, now) or expiry - now < self.refresh_margin
+
+    def _reload_if_changed(self):
+        """cookies文件修改时间变化时重新读取"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        cookies = read_cookie_file(self.path)
+        with self._lock:
+            self._mtime = mtime
+            self._cookies = cookies
+            self._expiry = cookie_expiry(cookies)
+            self.reloads += 1
+            expiry = self._expiry
+        if cookies is not None and expiry is None:
+            logger.warning("Cookies中缺少过期时间信息，将在后台重新登录")
+        elif expiry is not None and expiry - self.clock() < WARN_MARGIN:
+            logger.warning(f"Cookies即将在{expiry}过期，临近过期时将在后台重新登录")
+        logger.info(f"已从 {self.path} 加载cookies")
+        return True
+
+    # ---- 刷新 ----
+
+    def refresh(self, force=False):
+        """
+        重新登录并保存cookies；同一时间只有一个线程登录
+
+        登录前再检查一次文件，其他进程已经刷新时直接使用，不重复登录。
+
+        返回:
+            是否有可用的会话
+        """
+        with self._refresh_lock:
+            self._reload_if_changed()
+            with self._lock:
+                cookies, expiry = self._cookies, self._expiry
+            if not force and not self._needs_refresh(cookies, expiry, self.clock()):
+                return True
+
+            start = time.perf_counter()
+            new_cookies = self.login_func()
+            elapsed = time.perf_counter() - start
+            self.last_refresh_seconds = elapsed
+            self.max_refresh_seconds = max(self.max_refresh_seconds, elapsed)
+            if not new_cookies:
+                self.failures += 1
+                self._consecutive_failures += 1
+                retry_interval = self._retry_interval()
+                self._next_retry = time.monotonic() + retry_interval
+                self.last_error = self.clock().isoformat(timespec='seconds')
+                logger.error(f"刷新聚宽会话失败（第{self.failures}次），用时{elapsed:.2f}秒，{retry_interval}秒后重试")
+                return self._usable(cookies, expiry, self.clock())
+
+            # 后台两次登录之间至少间隔RETRY_INTERVAL
+            self._consecutive_failures = 0
+            self._next_retry = time.monotonic() + RETRY_INTERVAL
+            self._save(new_cookies)
+            self.refreshes += 1
+            self.last_refresh_at = self.clock().isoformat(timespec='seconds')
+            logger.info(f"聚宽会话已刷新，用时{elapsed:.2f}秒，过期时间: {self._expiry}")
+            return True
+
+    def _retry_interval(self):
+        """连续登录失败后的重试间隔（秒）"""
+        return min(RETRY_INTERVAL * 2 ** (self._consecutive_failures - 1), MAX_RETRY_INTERVAL)
+
+    def _save(self, cookies):
+        """
+        写入cookies文件（先写临时文件再替换，其他进程不会读到半个文件）并更新内存
+
+        新的cookies和过期时间在会话锁内一次替换，获取数据的线程不会读到新旧混合的会话。
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('; '.join(f"{name}={value}" for name, value in cookies.items()))
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._cookies = dict(cookies)
+            self._expiry = cookie_expiry(cookies)
+            self._mtime = os.stat(self.path).st_mtime_ns
+
+    def start_refresher(self):
+        """启动后台刷新线程（重复调用无效）"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="JQ_Session", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def stop_refresher(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if time.monotonic() >= self._next_retry:
+                try:
+                    self._reload_if_changed()
+                    with self._lock:
+                        cookies, expiry = self._cookies, self._expiry
+                    if self._due_for_refresh(cookies, expiry):
+                        self.refresh(force=True)
+                except Exception as e:
+                    logger.error(f"后台刷新聚宽会话时出错: {e}")
+            self._wakeup.wait(self._seconds_until_next_check())
+            self._wakeup.clear()
+
+    def _refresh_horizon(self):
+        """
+        判断是否需要刷新的参考时间
+
+        开盘前检查时间之后、下午收盘之前，以当日收盘时间为参考，保证会话在整个交易时段内有效。
+        """
+        now = self.clock()
+        if PRE_OPEN_CHECK <= now.time() < MARKET_CLOSE:
+            return datetime.datetime.combine(now.date(), MARKET_CLOSE)
+        return now
+
+    def _due_for_refresh(self, cookies, expiry):
+        """
+        后台线程是否应该登录
+
+        交易时段内只在会话无法用到收盘时登录，临近过期的提前刷新留到收盘后，
+        开盘前登录失败也不会在交易时段内反复重试。
+        """
+        now = self.clock()
+        if TRADING_START <= now.time() < MARKET_CLOSE:
+            return not self._usable(cookies, expiry, datetime.datetime.combine(now.date(), MARKET_CLOSE))
+        return self._needs_refresh(cookies, expiry, self._refresh_horizon())
+
+    def _seconds_until_next_check(self):
+        """到下一次检查的秒数：不超过CHECK_INTERVAL，并在开盘前检查时间醒来"""
+        now = self.clock()
+        pre_open = datetime.datetime.combine(now.date(), PRE_OPEN_CHECK)
+        if pre_open <= now:
+            pre_open += datetime.timedelta(days=1)
+        wait = min(CHECK_INTERVAL, (pre_open - now).total_seconds())
+        return max(1.0, wait, self._next_retry - time.monotonic())
+
+    def stats(self):
+        """返回会话的过期时间和刷新统计"""
+        with self._lock:
+            expiry = self._expiry
+        return {
+            'expiry': expiry.isoformat(timespec='seconds') if expiry else None,
+            'reloads': self.reloads,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_refresh_s': round(self.last_refresh_seconds, 3) if self.last_refresh_seconds is not None else None,
+            'max_refresh_s': round(self.max_refresh_seconds, 3),
+            'last_refresh_at': self.last_refresh_at,
+            'last_error': self.last_error
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_jq_session():
+    """获取进程内共享的聚宽会话"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = JQSession()
+        return _session
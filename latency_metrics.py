@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import atexit
+import logging
+import datetime
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# 信号从策略日志到下单完成经过的各个环节，按先后顺序排列
+HOP_LOG_TIME = 'log_time'  # 策略日志中的时间
+HOP_HTTP_RECEIVED = 'http_received'  # 收到包含该信号的HTTP响应
+HOP_PARSED = 'parsed'  # 解析出信号
+HOP_DEQUEUED = 'dequeued'  # 执行器取出信号
+HOP_WINDOW_ACTIVATED = 'window_activated'  # 交易窗口已激活
+HOP_FIELDS_TYPED = 'fields_typed'  # 委托单已填写
+HOP_SUBMITTED = 'submitted'  # 已按下提交键
+HOP_POPUP_DISMISSED = 'popup_dismissed'  # 提交后的弹窗已处理
+
+HOPS = (HOP_LOG_TIME, HOP_HTTP_RECEIVED, HOP_PARSED, HOP_DEQUEUED, HOP_WINDOW_ACTIVATED,
+        HOP_FIELDS_TYPED, HOP_SUBMITTED, HOP_POPUP_DISMISSED)
+
+# 端到端耗时和执行器处理单个订单耗时（取出到弹窗处理完）的统计名称
+END_TO_END = 'end_to_end'
+EXECUTION = 'execution'
+
+# Prometheus直方图的桶上限（秒）
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRICS_FILE = os.path.join('logs', 'signal_latency.json')
+TRACES_FILE = os.path.join('logs', 'signal_latency_traces.jsonl')
+METRICS_PORT = 9108
+# 指标文件和信号时间戳记录由后台线程定期写入，不在下单路径上写文件（秒）
+FLUSH_INTERVAL = 5
+
+
+def session_window(dt):
+    """按策略日志时间划分统计用的交易时段"""
+    t = dt.time()
+    if t < datetime.time(9, 30):
+        return 'pre_open'
+    if t < datetime.time(13, 0):
+        return 'morning'
+    if t < datetime.time(14, 45):
+        return 'afternoon'
+    return 'close'
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LatencyHistogram:
+    """单个统计项的累计直方图，同时保留最近的样本用于计算分位数"""
+    def __init__(self, max_samples=5000):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+        for i, upper in enumerate(BUCKETS):
+            if value <= upper:
+                self.bucket_counts[i] += 1
+
+    def summary(self):
+        values = sorted(self.samples)
+        result = {'count': self.count, 'sum': round(self.sum, 4)}
+        for q in QUANTILES:
+            result[f'p{int(q * 100)}'] = round(_quantile(values, q), 4)
+        result['max'] = round(values[-1], 4) if values else 0.0
+        return result
+
+
+class LatencyRecorder:
+    """
+    信号延迟记录器
+
+    为每个信号（按委托编号）记录经过各环节的时间戳，信号处理完成后计算相邻环节之间
+    和端到端的耗时，按交易时段分别统计直方图。统计结果由后台线程每隔flush_interval秒写入本地指标文件，
+    也可以通过Prometheus文本格式的HTTP接口读取。
+
+    参数:
+        metrics_file: 汇总指标文件路径
+        traces_file: 每个信号完整时间戳记录的追加文件路径，None表示不记录
+        clock: 时间戳来源，默认time.time，模拟下单界面使用其虚拟时钟
+        flush_interval: 写入指标文件和时间戳记录的间隔（秒）
+    """
+    def __init__(self, metrics_file=METRICS_FILE, traces_file=TRACES_FILE, clock=time.time,
+                 flush_interval=FLUSH_INTERVAL):
+        self.metrics_file = metrics_file
+        self.traces_file = traces_file
+        self.clock = clock
+        self.flush_interval = flush_interval
+        self._traces = {}
+        self._histograms = defaultdict(LatencyHistogram)  # (交易时段, 统计项) -> 直方图
+        self._lock = threading.Lock()
+        self._server = None
+        self._pending = []  # 等待写入的信号时间戳记录
+        self._dirty = False
+        self._flusher = None
+        self._flush_lock = threading.Lock()
+
+    def stamp(self, key, hop, ts=None):
+        """记录信号到达某个环节的时间，同一环节只记录第一次"""
+        if ts is None:
+            ts = self.clock()
+        with self._lock:
+            self._traces.setdefault(key, {}).setdefault(hop, ts)
+
+    def start_trace(self, signal, http_received=None, parsed=None):
+        """开始跟踪一个新信号，以策略日志时间为起点"""
+        key = signal.entrust_id
+        self.stamp(key, HOP_LOG_TIME, signal.trade_time.timestamp())
+        if http_received is not None:
+            self.stamp(key, HOP_HTTP_RECEIVED, http_received)
+        if parsed is not None:
+            self.stamp(key, HOP_PARSED, parsed)
+
+    def discard(self, key):
+        """丢弃信号的时间戳记录（被跳过或执行失败的订单不计入统计）"""
+        with self._lock:
+            self._traces.pop(key, None)
+
+    def finish(self, key):
+        """信号处理完成，计算各环节耗时并更新统计"""
+        with self._lock:
+            trace = self._traces.pop(key, None)
+            if not trace or HOP_LOG_TIME not in trace:
+                return None
+            window = session_window(datetime.datetime.fromtimestamp(trace[HOP_LOG_TIME]))
+            stamped = [(hop, trace[hop]) for hop in HOPS if hop in trace]
+            durations = {}
+            for (prev_hop, prev_ts), (hop, ts) in zip(stamped, stamped[1:]):
+                durations[f'{prev_hop}->{hop}'] = max(0.0, ts - prev_ts)
+            if len(stamped) > 1:
+                durations[END_TO_END] = max(0.0, stamped[-1][1] - stamped[0][1])
+            if HOP_DEQUEUED in trace and HOP_POPUP_DISMISSED in trace:
+                durations[EXECUTION] = max(0.0, trace[HOP_POPUP_DISMISSED] - trace[HOP_DEQUEUED])
+            for stage, seconds in durations.items():
+                self._histograms[(window, stage)].observe(seconds)
+            if self.traces_file:
+                self._pending.append({'key': key, 'window': window,
+                                      'hops': {hop: round(ts, 4) for hop, ts in trace.items()}})
+            self._dirty = True
+
+        logger.info(f"信号 {key} 各环节耗时: " +
+                    ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in durations.items()))
+        self._start_flusher()
+        return durations
+
+    def _start_flusher(self):
+        """启动后台写文件的线程（重复调用无效）"""
+        if self._flusher is not None:
+            return
+        with self._flush_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="Latency_Flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """写入等待中的信号时间戳记录和汇总指标（后台线程定期调用，退出前也可以直接调用）"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                dirty, self._dirty = self._dirty, False
+            if pending:
+                self._write_traces(pending)
+            if dirty:
+                self.write_metrics()
+
+    def _write_traces(self, records):
+        try:
+            with open(self.traces_file, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+        except Exception as e:
+            logger.error(f"写入信号延迟记录时出错: {e}")
+
+    def summary(self):
+        """返回 {交易时段: {统计项: {count, sum, p50, p95, p99, max}}}"""
+        with self._lock:
+            result = defaultdict(dict)
+            for (window, stage), histogram in self._histograms.items():
+                result[window][stage] = histogram.summary()
+            return dict(result)
+
+    def write_metrics(self):
+        """将汇总统计写入本地指标文件"""
+        try:
+            tmp_path = self.metrics_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated': datetime.datetime.now().isoformat(timespec='seconds'),
+                           'windows': self.summary()}, f, indent=2)
+            os.replace(tmp_path, self.metrics_file)
+        except Exception as e:
+            logger.error(f"写入延迟指标文件时出错: {e}")
+
+    def prometheus_text(self):
+        """生成Prometheus文本格式的指标"""
+        lines = [
+            '# HELP ths_signal_latency_seconds Signal latency between pipeline hops.',
+            '# TYPE ths_signal_latency_seconds histogram'
+        ]
+        quantile_lines = [
+            '# HELP ths_signal_latency_quantile_seconds Recent signal latency quantiles.',
+            '# TYPE ths_signal_latency_quantile_seconds gauge'
+        ]
+        with self._lock:
+            for (window, stage), histogram in sorted(self._histograms.items()):
+                labels = f'window="{window}",stage="{stage}"'
+                for upper, count in zip(BUCKETS, histogram.bucket_counts):
+                    lines.append(f'ths_signal_latency_seconds_bucket{{{labels},le="{upper}"}} {count}')
+                lines.append(f'ths_signal_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'ths_signal_latency_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'ths_signal_latency_seconds_count{{{labels}}} {histogram.count}')
+                values = sorted(histogram.samples)
+                for q in QUANTILES:
+                    quantile_lines.append(
+                        f'ths_signal_latency_quantile_seconds{{{labels},quantile="{q}"}} {_quantile(values, q):.6f}')
+        return '\n'.join(lines + quantile_lines) + '\n'
+
+    def start_http_server(self, port=METRICS_PORT, host='127.0.0.1'):
+        """在后台线程启动Prometheus指标接口（GET /metrics）"""
+        recorder = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            logger.error(f"启动延迟指标接口失败: {e}")
+            return False
+        thread = threading.Thread(target=self._server.serve_forever, name="Metrics_HTTP", daemon=True)
+        thread.start()
+        logger.info(f"延迟指标接口已启动: http://{host}:{port}/metrics")
+        return True
+
+    def stop_http_server(self):
+        """停止指标接口，并写入尚未写入的统计"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        self.flush()
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_latency_recorder():
+    """获取进程内共享的延迟记录器"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = LatencyRecorder()
+            atexit.register(_recorder.flush)
+        return _recorder
@@ -0,0 +1,339 @@
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import queue
+import shutil
+import logging
+import argparse
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR = 'logs'
+
+# 每个进程的日志写在日志目录下以进程命名的子目录中（见logging_setup.setup_logging），查询时合并所有子目录
+# 按天轮转后的日志分段：<组件>.log.YYYY-MM-DD，压缩后加 .gz，旁边是同名的 .idx.json 索引
+SEGMENT_RE = re.compile(r'^(?P<base>.+\.log)\.(?P<date>\d{4}-\d{2}-\d{2})$')
+INDEX_SUFFIX = '.idx.json'
+
+# 日志行格式: "2025-02-27 09:26:01,123 - INFO - 输入股票代码: 002051"，不以时间戳开头的行属于上一条记录
+TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+LEVEL_RE = re.compile(r' - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ')
+SECURITY_RE = re.compile(r'(?<!\d)\d{6}(?!\d)')  # 6位证券代码
+ENTRUST_RE = re.compile(r'(?:entrust_id=|订单 )(\d{7,})')  # 聚宽委托编号
+
+
+class SegmentIndexBuilder:
+    """逐行累计一个日志分段的索引：时间范围、各级别记录数、出现过的证券代码和委托编号"""
+    def __init__(self, segment):
+        self.segment = segment
+        self.start = None
+        self.end = None
+        self.lines = 0
+        self.levels = Counter()
+        self.securities = set()
+        self.entrust_ids = set()
+
+    def add(self, line):
+        self.lines += 1
+        match = TIMESTAMP_RE.match(line)
+        if match:
+            timestamp = match.group(0)
+            if self.start is None:
+                self.start = timestamp
+            self.end = timestamp
+            level = LEVEL_RE.search(line, len(timestamp))
+            if level:
+                self.levels[level.group(1)] += 1
+        self.securities.update(SECURITY_RE.findall(line))
+        self.entrust_ids.update(ENTRUST_RE.findall(line))
+
+    def to_dict(self):
+        return {
+            'segment': self.segment,
+            'start': self.start,
+            'end': self.end,
+            'lines': self.lines,
+            'levels': dict(self.levels),
+            'securities': sorted(self.securities),
+            'entrust_ids': sorted(self.entrust_ids)
+        }
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def compress_segment(path):
+    """
+    压缩一个已轮转的日志分段并生成索引，完成后删除原文件
+
+    先写临时文件再替换，中途退出时原文件保留，下次启动时重新压缩。
+
+    返回:
+        索引字典
+    """
+    gz_path = f"{path}.gz"
+    builder = SegmentIndexBuilder(os.path.basename(gz_path))
+    with open(path, 'rb') as src, gzip.open(f"{gz_path}.tmp", 'wb') as dst:
+        for raw in src:
+            dst.write(raw)
+            builder.add(raw.decode('utf-8', errors='replace'))
+    os.replace(f"{gz_path}.tmp", gz_path)
+    index = builder.to_dict()
+    _write_json(f"{path}{INDEX_SUFFIX}", index)
+    os.remove(path)
+    return index
+
+
+def pending_segments(log_dir=LOG_DIR):
+    """已轮转但还没有压缩的分段（如上次进程在压缩前退出），只查找log_dir本身，不含子目录"""
+    return sorted(path for path in glob.glob(os.path.join(log_dir, '*.log.*'))
+                  if SEGMENT_RE.match(os.path.basename(path)))
+
+
+def log_dirs(log_dir=LOG_DIR, process=None):
+    """查询时要查找的目录：日志目录本身和各进程的子目录，process为进程名时只查找该进程的子目录"""
+    if process is not None:
+        return [os.path.join(log_dir, process)]
+    return [log_dir] + sorted(path for path in glob.glob(os.path.join(log_dir, '*')) if os.path.isdir(path))
+
+
+class LogCompressor:
+    """
+    在后台线程中压缩轮转下来的日志分段并生成索引
+
+    rotate() 作为TimedRotatingFileHandler的rotator，只重命名文件，写日志的线程不等待压缩。
+    每个进程只压缩自己日志目录中的分段，多个进程不会同时处理同一个分段。
+
+    参数:
+        log_dir: 本进程的日志目录，启动时压缩其中遗留的未压缩分段
+    """
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = log_dir
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.rotate_failures = 0  # 无法轮转、继续写入原文件的次数
+
+    def start(self):
+        """启动后台线程（重复调用无效），并加入遗留的未压缩分段"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="LogCompressor", daemon=True)
+            self._thread.start()
+        for path in pending_segments(self.log_dir):
+            self.submit(path)
+
+    def rotate(self, source, dest):
+        """
+        把当前日志文件改为分段并交给后台线程压缩
+
+        改名失败时（如Windows上文件被其他程序打开）复制为分段后清空原文件；仍然失败时
+        不轮转，继续写入原文件，下次轮转时再处理。不抛出异常：处理器此时已经关闭了原文件，
+        轮转出错会使之后的记录全部丢失。
+        """
+        try:
+            os.rename(source, dest)
+        except OSError as e:
+            try:
+                shutil.copyfile(source, dest)
+            except OSError as copy_error:
+                self.rotate_failures += 1
+                logger.error(f"无法轮转日志文件 {source}（{e}；{copy_error}），继续写入原文件")
+                return
+            try:
+                with open(source, 'wb'):
+                    pass
+            except OSError as truncate_error:
+                os.remove(dest)
+                self.rotate_failures += 1
+                logger.error(f"无法轮转日志文件 {source}（{e}；{truncate_error}），继续写入原文件")
+                return
+            logger.warning(f"无法重命名日志文件 {source}（{e}），已复制为分段并清空原文件")
+        self.submit(dest)
+
+    def submit(self, path):
+        self._queue.put(path)
+
+    def join(self):
+        """等待已提交的分段全部压缩完成"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if os.path.exists(path):
+                    index = compress_segment(path)
+                    self.compressed += 1
+                    logger.info(f"日志分段已压缩: {index['segment']}，{index['lines']}行")
+            except Exception as e:
+                logger.error(f"压缩日志分段 {path} 时出错: {e}")
+            finally:
+                self._queue.task_done()
+
+
+# ---- 查询 ----
+
+def _term_kind(term):
+    """查询词可以用哪一部分索引筛选：securities、entrust_ids 或 None（只按时间范围）"""
+    if term and term.isdigit():
+        if len(term) == 6:
+            return 'securities'
+        if len(term) >= 7:
+            return 'entrust_ids'
+    return None
+
+
+def load_indexes(log_dir=LOG_DIR, component=None, process=None):
+    """
+    读取日志目录（包括各进程的子目录）中全部分段索引
+
+    参数:
+        component: 组件名（如trade_executor），只读取该组件的
+        process: 进程名（如main_controller），只读取该进程的
+    """
+    indexes = []
+    for directory in log_dirs(log_dir, process):
+        for path in sorted(glob.glob(os.path.join(directory, f"{component or '*'}.log.*{INDEX_SUFFIX}"))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"无法读取日志索引 {path}: {e}")
+                continue
+            index['path'] = os.path.join(directory, index['segment'])
+            indexes.append(index)
+    return indexes
+
+
+def segment_matches(index, date=None, term=None):
+    """根据索引判断分段中是否可能有所查的记录"""
+    if index['start'] is None:
+        return False
+    if date is not None and not (index['start'][:10] <= date <= index['end'][:10]):
+        return False
+    kind = _term_kind(term)
+    return kind is None or term in index[kind]
+
+
+def _first_date(path):
+    """日志文件第一条记录的日期，空文件返回None"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if TIMESTAMP_RE.match(line):
+                return line[:10]
+    return None
+
+
+def select_files(log_dir=LOG_DIR, date=None, term=None, component=None, process=None):
+    """
+    选出需要打开的日志文件：索引匹配的分段，以及各进程当前正在写入的日志
+
+    返回:
+        (文件路径列表, 按索引跳过的分段数)
+    """
+    indexes = load_indexes(log_dir, component, process)
+    selected = [index['path'] for index in indexes if segment_matches(index, date, term)]
+    skipped = len(indexes) - len(selected)
+    for directory in log_dirs(log_dir, process):
+        for path in sorted(glob.glob(os.path.join(directory, f"{component or '*'}.log"))):
+            first = _first_date(path)
+            if first is not None and (date is None or first <= date):
+                selected.append(path)
+    return selected, skipped
+
+
+def iter_records(lines):
+    """把日志行按记录分组（异常堆栈等续行归入上一条记录）"""
+    record = []
+    for line in lines:
+        if TIMESTAMP_RE.match(line) and record:
+            yield ''.join(record)
+            record = []
+        record.append(line)
+    if record:
+        yield ''.join(record)
+
+
+def search_file(path, date=None, term=None, level=None):
+    """在一个日志文件（或压缩分段）中查找记录，返回 [(时间戳, 记录)]"""
+    opener = gzip.open if path.endswith('.gz') else open
+    results = []
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for record in iter_records(f):
+            if date is not None and not record.startswith(date):
+                continue
+            if term is not None and term not in record:
+                continue
+            if level is not None and f" - {level} - " not in record[:40]:
+                continue
+            results.append((record[:23], record.rstrip('\n')))
+    return results
+
+
+def search(log_dir=LOG_DIR, date=None, term=None, component=None, level=None, process=None):
+    """
+    查找日志记录，只打开索引显示可能包含结果的分段
+
+    参数:
+        date: 日期（YYYY-MM-DD）
+        term: 查询词；6位数字按证券代码、7位以上数字按委托编号使用索引筛选，其他文字只按日期筛选
+        component: 组件名，如trade_executor
+        level: 日志级别，如ERROR
+        process: 进程名，如trade_executor，None表示全部进程
+    返回:
+        ([(相对日志目录的文件名, 记录)] 按时间排序, 打开的文件数, 跳过的分段数)
+    """
+    paths, skipped = select_files(log_dir, date, term, component, process)
+    results = []
+    for path in paths:
+        name = os.path.relpath(path, log_dir).replace(os.sep, '/')
+        results.extend((timestamp, name, record) for timestamp, record in search_file(path, date, term, level))
+    results.sort(key=lambda r: r[0])
+    return [(name, record) for _, name, record in results], len(paths), skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按日期、证券代码或委托编号查找日志，只解压索引匹配的分段")
+    parser.add_argument('term', nargs='?', help="查询词：证券代码、委托编号或任意文字")
+    parser.add_argument('--date', help="日期，如 2025-02-27")
+    parser.add_argument('--component', help="组件名（日志文件名去掉.log），如 trade_executor")
+    parser.add_argument('--process', help="进程名（日志目录下的子目录），如 main_controller、trade_executor")
+    parser.add_argument('--level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'), help="日志级别")
+    parser.add_argument('--log-dir', default=LOG_DIR, help="日志目录")
+    parser.add_argument('--compress', action='store_true', help="压缩遗留的未压缩分段并生成索引")
+    args = parser.parse_args()
+
+    if args.compress:
+        for directory in log_dirs(args.log_dir, args.process):
+            for path in pending_segments(directory):
+                try:
+                    index = compress_segment(path)
+                except FileNotFoundError:
+                    continue  # 运行中的进程已经压缩了这个分段
+                print(f"已压缩 {os.path.relpath(path, args.log_dir)}: {index['lines']}行 "
+                      f"{index['start']} ~ {index['end']}")
+
+    if args.term is None and args.date is None:
+        return 0
+    results, opened, skipped = search(args.log_dir, args.date, args.term, args.component, args.level,
+                                      args.process)
+    for name, record in results:
+        print(f"[{name}] {record}")
+    print(f"共{len(results)}条记录，打开{opened}个文件，按索引跳过{skipped}个分段", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from log_archive import LogCompressor
+
+LOG_DIR = 'logs'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# 日志文件每天午夜轮转，轮转下来的分段在后台压缩并生成索引（见log_archive.py）
+ROTATE_WHEN = 'midnight'
+
+# 各模块的日志写入的文件：使用模块日志器的记录按日志器名，直接调用logging.info的记录按所在的模块文件名
+COMPONENT_LOGS = {
+    'get_jq_data': 'jq_data.log',
+    'jq_session': 'jq_data.log',
+    'jq_http': 'jq_data.log',
+    'poll_scheduler': 'jq_data.log',
+    'extract_trade_signals': 'extract_signals.log',
+    'signal_parser': 'extract_signals.log',
+    'signal_model': 'extract_signals.log',
+    'trade_executor': 'trade_executor.log',
+    'execution_ledger': 'trade_executor.log',
+    'order_scheduler': 'trade_executor.log',
+    'wait_engine': 'trade_executor.log',
+    'timing_profile': 'trade_executor.log',
+    'broker_adapter': 'trade_executor.log',
+    'popup_detector': 'trade_executor.log',
+    'simulated_broker': 'trade_executor.log',
+    'trade_window_control': 'trade_window.log',
+    'screen_state': 'trade_window.log',
+    'open_ths_client': 'ths_client.log',
+    'window_registry': 'ths_client.log',
+    'config_manager': 'config_manager.log',
+}
+# 其他模块（包括第三方库）的日志写入主控制器日志
+DEFAULT_LOG = 'main_controller.log'
+
+# 启动脚本：以这些脚本启动的进程写在以脚本名命名的子目录中
+ENTRY_POINTS = (
+    'main_controller', 'trade_executor', 'open_ths_client', 'get_jq_data', 'extract_trade_signals',
+    'config_manager', 'timing_profile', 'popup_detector', 'screen_state', 'log_archive',
+    'benchmark_order_entry', 'benchmark_signal_parser',
+)
+# 其他方式运行（pytest、临时脚本、交互环境）时的日志子目录
+DEFAULT_PROCESS = 'other'
+
+
+class ComponentFileHandler(logging.Handler):
+    """
+    按产生日志的模块把记录写入对应组件的日志文件，每条记录只写一次
+
+    文件在第一次写入时打开。传入compressor时文件每天轮转，轮转下来的分段交给compressor在后台压缩。
+
+    参数:
+        log_dir: 日志目录
+        routes: {模块名: 文件名}
+        default: 未列出的模块写入的文件名
+        compressor: log_archive.LogCompressor，None表示不轮转
+    """
+    def __init__(self, log_dir=LOG_DIR, routes=None, default=DEFAULT_LOG, compressor=None):
+        super().__init__()
+        self.log_dir = log_dir
+        self.routes = COMPONENT_LOGS if routes is None else routes
+        self.default = default
+        self.compressor = compressor
+        self.handlers = {}  # {文件名: 文件处理器}
+
+    def _open(self, filename):
+        """创建写入一个日志文件的处理器"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, filename)
+        if self.compressor is None:
+            return logging.FileHandler(path, encoding='utf-8')
+        handler = TimedRotatingFileHandler(path, when=ROTATE_WHEN, encoding='utf-8')
+        handler.rotator = self.compressor.rotate
+        return handler
+
+    def handler_for(self, record):
+        component = record.module if record.name == 'root' else record.name.split('.')[0]
+        filename = self.routes.get(component, self.default)
+        handler = self.handlers.get(filename)
+        if handler is None:
+            handler = self._open(filename)
+            handler.setFormatter(self.formatter)
+            self.handlers[filename] = handler
+        return handler
+
+    def emit(self, record):
+        try:
+            self.handler_for(record).emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        for handler in self.handlers.values():
+            handler.setFormatter(fmt)
+
+    def flush(self):
+        for handler in self.handlers.values():
+            handler.flush()
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        self.handlers.clear()
+        super().close()
+
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def process_name():
+    """本进程日志子目录的名称：ENTRY_POINTS中的启动脚本名（如main_controller、trade_executor），其他为DEFAULT_PROCESS"""
+    name = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ''))[0]
+    return name if name in ENTRY_POINTS else DEFAULT_PROCESS
+
+
+def setup_logging(level=logging.INFO, log_dir=LOG_DIR, console=True, stream=None, rotate=True, process=None):
+    """
+    配置进程内的日志（重复调用无效）
+
+    根日志器只保留一个QueueHandler，记录日志的线程只把记录放入队列；后台的QueueListener
+    线程负责格式化，按模块写入各组件的日志文件，并输出到控制台一次。进程退出时写完队列中的记录。
+
+    同时运行的几个进程（主控制器、交易执行器、同花顺客户端）都会写trade_executor.log等组件日志，
+    每个进程写在log_dir下以进程命名的子目录中，各自轮转和压缩自己的文件，不会争用同一个文件。
+
+    参数:
+        level: 日志级别
+        log_dir: 日志目录
+        console: 是否同时输出到控制台
+        stream: 控制台输出流，None表示标准错误
+        rotate: 是否每天轮转日志文件并在后台压缩
+        process: 日志子目录名，None表示使用process_name()，空字符串表示直接写在log_dir中
+    返回:
+        QueueListener
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        if process is None:
+            process = process_name()
+        if process:
+            log_dir = os.path.join(log_dir, process)
+        formatter = logging.Formatter(LOG_FORMAT)
+        compressor = None
+        if rotate:
+            compressor = LogCompressor(log_dir)
+            compressor.start()
+        handlers = [ComponentFileHandler(log_dir, compressor=compressor)]
+        if console:
+            handlers.append(logging.StreamHandler(stream or sys.stderr))
+        for handler in handlers:
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(QueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """停止后台写日志的线程，写完队列中的记录并关闭日志文件"""
+    global _listener
+    with _setup_lock:
+        listener, _listener = _listener, None
+        if listener is None:
+            return
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            if isinstance(handler, QueueHandler):
+                root.removeHandler(handler)
@@ -2,48 +2,101 @@ import os
 import sys
 import time
 import logging
+import datetime
 import threading
 from queue import Queue
-from open_ths_client import THSClient
-from get_jq_data import fetch_jq_data
-from extract_trade_signals import extract_trade_signals
-from trade_executor import TradeExecutor
+from get_jq_data import fetch_new_log_lines, get_local_log_data, process_new_data, is_trading_time, get_fetch_cursor
+from poll_scheduler import AdaptivePollScheduler
+from pipeline import PipelineStage, StageStats, put_with_backpressure
+from risk_check import RiskChecker
+from order_scheduler import OrderScheduler
+from latency_metrics import get_latency_recorder
+from execution_ledger import get_execution_ledger
+from config_manager import get_credential_provider
+from startup_report import StartupReport
+from window_registry import get_window_registry
+from jq_session import get_jq_session
+from logging_setup import setup_logging
 
-# 配置日志记录
-log_file = 'logs/main_controller.log'
-os.makedirs('logs', exist_ok=True)
+# 配置日志：记录由后台线程写入 logs/<进程名>/main_controller.log
+setup_logging()
 
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# 流水线统计的记录间隔（秒）
+STATS_REPORT_INTERVAL = 300
+# 启动完成后等待并行的启动阶段（凭据、首次日志同步）写入启动报告的最长时间（秒）
+STARTUP_REPORT_WAIT = 30
+# 重新启动同花顺客户端失败后，再次尝试前等待的时间（秒）
+CLIENT_RESTART_BACKOFF = 30
+# 开盘前预热的时间段：在此期间每天预热一次
+WARM_UP_START = datetime.time(9, 0)
+WARM_UP_END = datetime.time(9, 20)
+# 预热完成后到交易时段开始前，每隔这么久同步一次日志，保持到聚宽的连接不被关闭（秒）
+WARM_UP_KEEPALIVE = 30
+# 每次预热的分阶段耗时追加保存的位置
+WARM_UP_REPORT_FILE = os.path.join('logs', 'warm_up_report.jsonl')
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+class MainController:
+    """
+    常驻交易流水线控制器
+    
+    在一个进程内运行分阶段的流水线：获取 -> 解析/去重 -> 风险检查 -> 执行，
+    各阶段之间用有界阻塞队列连接。执行阶段在操作界面下单时，获取和解析阶段照常运行；
+    新信号一经解析就交给执行阶段。headless模式只运行获取和解析阶段，不加载任何GUI模块，
+    新信号写入交易信号文件，由常驻的交易执行器（trade_executor.py --watch）执行。
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+    启动时获取、解析和风险检查阶段、凭据解密和首次日志同步与同花顺客户端的启动并行进行，
+    客户端各步骤探测到就绪即进入下一步；各阶段耗时记入启动报告。
 
-class MainController:
-    def __init__(self):
+    每个交易日开盘前（WARM_UP_START ~ WARM_UP_END）预热一次：刷新聚宽会话、全量同步日志并保持连接、
+    确认同花顺客户端和交易窗口、加载界面识别模板并检查委托单，全部完成后进入就绪状态，
+    当天第一笔订单与之后的订单走同样的路径。
+    """
+    # 各阶段输入队列的容量
+    PARSE_QUEUE_SIZE = 8
+    RISK_QUEUE_SIZE = 64
+    EXECUTE_QUEUE_SIZE = 64
+    
+    def __init__(self, headless=False):
+        self.headless = headless
         self.ths_client = None
         self.trade_executor = None
-        self.signal_queue = Queue()
+        self.ledger = None
+        self.startup_summary = None
+        self.client_restarts = 0
+        self._next_client_restart = 0.0
+        self.ready = False
+        self.warm_up_summary = None
+        self._warm_up_date = None
+        self._fetch_lock = threading.Lock()
+        self.risk_checker = RiskChecker.load()
+        self.latency = get_latency_recorder()
+        self.poll_scheduler = AdaptivePollScheduler(self.fetch_stage)
+        self.parse_queue = Queue(maxsize=self.PARSE_QUEUE_SIZE)
+        self.risk_queue = Queue(maxsize=self.RISK_QUEUE_SIZE)
+        # 执行阶段的输入按优先级和有效期限调度，不再先进先出
+        self.execute_queue = OrderScheduler(maxsize=self.EXECUTE_QUEUE_SIZE, on_expired=self.on_order_expired)
+        self.stages = []
+        self.fetch_stats = StageStats()
         self.running = False
+        self.stop_event = threading.Event()
         self.threads = []
 
-    def start_ths_client(self):
-        """启动同花顺客户端线程"""
+    def start_ths_client(self, report=None):
+        """
+        启动同花顺客户端并打开交易界面，等待进程、主窗口和交易窗口依次就绪
+
+        参数:
+            report: 启动耗时报告，None表示不记录
+        """
         try:
-            self.ths_client = THSClient(r"D:\同花顺\hexin.exe")
-            if self.ths_client.open():
+            if self.ths_client is None:
+                from open_ths_client import THSClient
+                self.ths_client = THSClient(r"D:\同花顺\hexin.exe")
+            if self.ths_client.open(report):
                 logging.info("同花顺客户端已成功启动")
-                time.sleep(3)  # 等待客户端初始化
                 
                 # 打开交易界面
-                if self.ths_client.navigate_to_trading():
+                if self.ths_client.navigate_to_trading(report):
                     logging.info("交易界面已成功打开")
                     return True
                 else:
@@ -56,55 +109,303 @@ class MainController:
             logging.error(f"启动同花顺客户端时出错: {e}")
             return False
 
-    def jq_data_monitor(self):
-        """聚宽数据监控线程"""
-        while self.running:
-            try:
-                if fetch_jq_data():
-                    logging.info("成功获取聚宽数据")
-                time.sleep(300)  # 每5分钟检查一次
-            except Exception as e:
-                logging.error(f"获取聚宽数据时出错: {e}")
-                time.sleep(60)  # 出错后等待1分钟再试
-
-    def signal_processor(self):
-        """信号处理线程"""
-        while self.running:
-            try:
-                if not self.signal_queue.empty():
-                    signals = self.signal_queue.get()
-                    if signals:
-                        self.trade_executor.execute_all_trades(signals)
-                time.sleep(1)
-            except Exception as e:
-                logging.error(f"处理交易信号时出错: {e}")
-                time.sleep(5)
+    def jq_data_monitor(self, initial_sync=None):
+        """
+        聚宽数据监控线程，按自适应轮询策略获取数据
+
+        参数:
+            initial_sync: 启动时首次日志同步的线程，完成后才开始轮询，避免同时获取
+        """
+        if initial_sync is not None:
+            initial_sync.join()
+        self.poll_scheduler.run()
+
+    def initial_sync(self):
+        """启动时同步一次日志，不等交易时段的第一次轮询"""
+        self.fetch_stage()
+        return True
+
+    def prepare_trading_window(self, report):
+        """创建交易执行器，激活交易窗口并确认委托单能够响应按键"""
+        with report.phase('executor'):
+            from trade_executor import TradeExecutor
+            self.trade_executor = TradeExecutor(ledger=self.ledger, latency=self.latency,
+                                                on_submitted=self.risk_checker.record_submitted)
+        self.prepare_ticket(report)
+
+    def prepare_ticket(self, report):
+        """激活交易窗口并确认委托单能够响应按键"""
+        with report.phase('ticket') as status:
+            status['ok'] = bool(self.trade_executor.activate_trading_window()) \
+                and self.trade_executor.trade_control.switch_trade_mode('buy', force=True)
+            if not status['ok']:
+                logging.warning("委托单未能响应，将在下单时重试")
+
+    def fetch_stage(self, force=False):
+        """
+        获取阶段：同步新日志行，有新数据时连同收到响应的时间交给解析阶段
+
+        参数:
+            force: 为True时非交易时间也获取（开盘前预热）
+        """
+        # 轮询和预热可能同时获取，日志游标和本地日志文件不能并发更新
+        with self._fetch_lock:
+            start = time.perf_counter()
+            new_lines = fetch_new_log_lines(force)
+            received_at = time.time()
+            self.fetch_stats.record(time.perf_counter() - start)
+        if not new_lines:
+            return False
+        put_with_backpressure(self.parse_queue, (received_at, get_local_log_data()), self.stop_event)
+        self.fetch_stats.emitted += 1
+        return True
+
+    def check_ths_client(self):
+        """
+        检查同花顺客户端和交易程序进程，进程退出时立即重新启动
+
+        只校验已记录的进程（PID和创建时间），不遍历进程表，由主循环每秒调用。客户端退出时
+        重新启动客户端并打开交易界面；只有交易程序（xiadan.exe）退出或被重新启动时重新打开交易界面，
+        并重新记录交易程序的进程和窗口。重新启动期间持有界面锁，不会下单；重新启动失败时等待一段时间再试。
+
+        返回:
+            客户端和交易程序是否都在运行
+        """
+        if self.ths_client is None:
+            return True
+        client_alive = self.ths_client.is_alive()
+        if client_alive and self.ths_client.is_ticket_alive():
+            return True
+        if time.monotonic() < self._next_client_restart:
+            return False
+        
+        self.client_restarts += 1
+        if client_alive:
+            logging.error(f"交易程序进程已退出或被重新启动，正在重新打开交易界面（第{self.client_restarts}次）")
+        else:
+            logging.error(f"同花顺客户端进程已退出，正在重新启动（第{self.client_restarts}次）")
+        get_window_registry().invalidate()
+        report = StartupReport()
+        with self.trade_executor.gui_lock():
+            ok = self.start_ths_client(report)
+            if ok:
+                self.prepare_ticket(report)
+        summary = report.log()
+        report.save()
+        if not ok:
+            logging.error(f"重新启动同花顺客户端失败，{CLIENT_RESTART_BACKOFF}秒后重试")
+            self._next_client_restart = time.monotonic() + CLIENT_RESTART_BACKOFF
+            return False
+        logging.info(f"同花顺客户端已重新启动，用时{summary['total_s']:.2f}秒")
+        return True
+
+    def warm_up_if_due(self):
+        """
+        每个交易日在预热时间段内启动一次预热，由主循环每秒调用
+
+        返回:
+            是否启动了预热
+        """
+        now = datetime.datetime.now()
+        if now.weekday() > 4 or not (WARM_UP_START <= now.time() < WARM_UP_END) \
+                or self._warm_up_date == now.date():
+            return False
+        self._warm_up_date = now.date()
+        thread = threading.Thread(target=self.warm_up, name="WarmUp", daemon=True)
+        thread.start()
+        self._register_thread(thread)
+        return True
+
+    def warm_up(self):
+        """
+        开盘前预热所有下单路径，完成后记录就绪状态和各阶段耗时
+
+        聚宽会话和日志同步与同花顺客户端的检查并行进行；操作界面的阶段持有界面锁，
+        与下单和时序复查互斥。预热完成后到交易时段开始前定期同步日志，保持连接。
+
+        返回:
+            是否全部就绪
+        """
+        logging.info("开始开盘前预热")
+        self.ready = False
+        report = StartupReport()
+        report.run_in_background('jq', lambda: self._warm_up_jq(report))
+        if not self.headless:
+            self._warm_up_gui(report)
+        report.join()
+        summary = report.log()
+        report.save(WARM_UP_REPORT_FILE)
+        self.ready = all(phase['ok'] for phase in summary['phases'])
+        self.warm_up_summary = dict(summary, ready=self.ready)
+        if self.ready:
+            logging.info(f"开盘前预热完成，系统已就绪，用时{summary['total_s']:.2f}秒")
+        else:
+            failed = [phase['name'] for phase in summary['phases'] if not phase['ok']]
+            logging.warning(f"开盘前预热未全部完成，未就绪的阶段: {', '.join(failed)}")
+        self._hold_connection()
+        return self.ready
+
+    def _warm_up_jq(self, report):
+        """预热聚宽会话和日志同步"""
+        with report.phase('jq_session') as status:
+            status['ok'] = get_jq_session().refresh()
+        if not status['ok']:
+            return False
+        with report.phase('full_log_sync') as status:
+            # 重置游标做一次全量同步，校验本地日志，同时建立连接池中的连接；
+            # 新行照常交给解析阶段，当天第一次增量获取只处理之后的新行
+            with self._fetch_lock:
+                get_fetch_cursor().reset()
+            self.fetch_stage(force=True)
+            status['ok'] = get_fetch_cursor().offset is not None
+        return status['ok']
+
+    def _warm_up_gui(self, report):
+        """预热同花顺客户端、窗口句柄、界面识别模板和委托单"""
+        with self.trade_executor.gui_lock():
+            # 客户端和交易窗口已经打开时只解析并缓存窗口句柄
+            if not self.start_ths_client(report):
+                return False
+            with report.phase('vision') as status:
+                status['ok'] = self._warm_up_vision()
+            self.prepare_ticket(report)
+            with report.phase('ticket_check') as status:
+                status['ok'] = self.trade_executor.trade_control.verify_trade_mode('buy') is not False
+        return True
+
+    def _warm_up_vision(self):
+        """加载缺少的弹窗模板和界面指纹，并各识别一次当前界面"""
+        from popup_detector import POPUP_NONE, load_popup_detector
+        broker = self.trade_executor.broker
+        if getattr(broker, 'popups', False) is None:
+            broker.popups = load_popup_detector()
+        if getattr(broker, 'screens', False) is None:
+            from screen_state import load_screen_recognizer
+            broker.screens = load_screen_recognizer()
+        popup = broker.read_popup()
+        screen = broker.read_screen_state()
+        logging.info(f"界面识别预热: 弹窗={popup}，委托单={screen}")
+        return popup in (None, POPUP_NONE)
+
+    def _hold_connection(self):
+        """交易时段开始前定期同步日志，保持到聚宽的连接和本地日志最新"""
+        while not self.stop_event.wait(WARM_UP_KEEPALIVE) and not is_trading_time():
+            self.fetch_stage(force=True)
+
+    def parse_stage(self, item):
+        """解析/去重阶段：只解析新增日志行，跳过台账中已提交的订单"""
+        received_at, log_data = item
+        new_signals = process_new_data(log_data, received_at)
+        if self.headless:
+            return None
+        parsed_at = time.time()
+        signals = [s for s in new_signals if self.ledger.should_execute(s.entrust_id)]
+        for signal in signals:
+            self.latency.start_trace(signal, http_received=received_at, parsed=parsed_at)
+        return signals
+
+    def risk_stage(self, signal):
+        """风险检查阶段"""
+        passed, _ = self.risk_checker.check(signal)
+        if not passed:
+            self.latency.discard(signal.entrust_id)
+            return None
+        return [signal]
+
+    def execute_stage(self, signal):
+        """
+        执行阶段：连同调度器中已在等待的订单一起批量执行，保持窗口和委托单模式
+
+        每执行完一笔才从调度器取下一笔，执行期间新到的更紧急订单（如卖出）会先执行。
+        """
+        self.trade_executor.execute_batch(self.execute_queue.drain(signal), order=False)
+        return None
+
+    def on_order_expired(self, signal, overdue):
+        """调度器取出时订单已超过有效期限"""
+        if self.trade_executor is not None:
+            self.trade_executor.expire_order(signal, overdue)
+
+    def get_pipeline_stats(self):
+        """返回各阶段的队列深度和处理耗时"""
+        stats = {'fetch': {
+            'processed': self.fetch_stats.processed,
+            'emitted': self.fetch_stats.emitted,
+            'avg_service_ms': round(self.fetch_stats.avg_service_time * 1000, 2),
+            'max_service_ms': round(self.fetch_stats.max_service_time * 1000, 2)
+        }}
+        for stage in self.stages:
+            stats[stage.name] = stage.snapshot()
+        stats['jq_session'] = get_jq_session().stats()
+        stats['credentials'] = get_credential_provider().stats()
+        if self.warm_up_summary is not None:
+            stats['warm_up'] = self.warm_up_summary
+        if self.startup_summary is not None:
+            stats['startup'] = self.startup_summary
+        if self.ths_client is not None:
+            stats['ths_client'] = dict(self.ths_client.stats(), restarts=self.client_restarts)
+        if self.trade_executor is not None:
+            stats['order_waits'] = self.trade_executor.waits.report()
+            stats['order_batches'] = dict(self.trade_executor.batch_stats)
+            stats['order_queue'] = self.execute_queue.snapshot()
+            windows = getattr(self.trade_executor.broker, 'windows', None)
+            if windows is not None:
+                stats['window_registry'] = windows.stats()
+        return stats
+
+    def log_pipeline_stats(self):
+        """记录流水线统计"""
+        for name, stage_stats in self.get_pipeline_stats().items():
+            logging.info(f"流水线阶段 {name}: {stage_stats}")
 
     def start(self):
         """启动所有功能模块"""
         try:
-            logging.info("正在启动交易系统...")
+            if self.headless:
+                logging.info("正在以headless模式启动数据获取和信号解析...")
+            else:
+                logging.info("正在启动交易系统...")
+            report = StartupReport()
             
-            # 启动同花顺客户端
-            if not self.start_ths_client():
-                logging.error("启动同花顺客户端失败，系统退出")
-                return False
+            parse_output = None if self.headless else self.risk_queue
+            self.stages = [PipelineStage('parse', self.parse_stage, self.parse_queue, parse_output)]
+            if not self.headless:
+                self.ledger = get_execution_ledger()
+                self.stages.append(PipelineStage('risk', self.risk_stage, self.risk_queue, self.execute_queue))
 
             self.running = True
-            self.trade_executor = TradeExecutor()
+            self.stop_event.clear()
 
-            # 创建并启动线程
-            threads = [
-                threading.Thread(target=self.jq_data_monitor, name="JQ_Monitor"),
-                threading.Thread(target=self.signal_processor, name="Signal_Processor")
-            ]
-
-            for thread in threads:
-                thread.daemon = True
-                thread.start()
-                self.threads.append(thread)
-                logging.info(f"线程 {thread.name} 已启动")
+            # 获取、解析和风险检查不依赖同花顺客户端，先启动；客户端就绪前通过风险检查的订单在调度器中等待
+            for stage in self.stages:
+                self._register_thread(stage.start(self.stop_event))
+            # 提前解密凭据放入缓存，后台刷新聚宽会话时不再读取文件和解密
+            report.run_in_background('credentials', get_credential_provider().prime)
+            # 聚宽会话在后台刷新（开盘前、临近过期时），获取阶段不会等待登录
+            get_jq_session().start_refresher()
+            initial_sync = report.run_in_background('log_sync', self.initial_sync)
+            thread = threading.Thread(target=self.jq_data_monitor, args=(initial_sync,), name="JQ_Monitor",
+                                      daemon=True)
+            thread.start()
+            self._register_thread(thread)
+            
+            if not self.headless:
+                # 启动同花顺客户端，与上面的阶段并行
+                if not self.start_ths_client(report):
+                    logging.error("启动同花顺客户端失败，系统退出")
+                    self.stop()
+                    return False
+                
+                self.prepare_trading_window(report)
+                self.latency.start_http_server()
+                stage = PipelineStage('execute', self.execute_stage, self.execute_queue)
+                self.stages.append(stage)
+                self._register_thread(stage.start(self.stop_event))
 
+            if not report.join(STARTUP_REPORT_WAIT):
+                logging.warning("凭据或首次日志同步尚未完成")
+            self.startup_summary = report.log()
+            report.save()
             logging.info("所有功能模块已启动完成")
             return True
 
@@ -113,20 +414,41 @@ class MainController:
             self.stop()
             return False
 
+    def _register_thread(self, thread):
+        """登记已启动的线程"""
+        self.threads.append(thread)
+        logging.info(f"线程 {thread.name} 已启动")
+
     def stop(self):
         """停止所有功能模块"""
         self.running = False
+        self.poll_scheduler.stop()
+        self.stop_event.set()
         for thread in self.threads:
             thread.join(timeout=5)
+        self.log_pipeline_stats()
+        self.latency.stop_http_server()
         logging.info("系统已停止")
 
 def main():
-    controller = MainController()
+    # --headless: 只运行数据获取和信号解析，不启动同花顺客户端和交易执行器
+    controller = MainController(headless='--headless' in sys.argv[1:])
     if controller.start():
         try:
-            # 保持主线程运行
+            # 保持主线程运行，定期记录流水线统计
+            last_report = time.monotonic()
             while True:
                 time.sleep(1)
+                if time.monotonic() - last_report >= STATS_REPORT_INTERVAL:
+                    controller.log_pipeline_stats()
+                    last_report = time.monotonic()
+                # 同花顺客户端退出时立即发现并重新启动
+                controller.check_ths_client()
+                # 开盘前预热
+                controller.warm_up_if_due()
+                if controller.trade_executor is not None and controller.execute_queue.empty():
+                    # 开盘前空闲时复查下单时序配置（只在复查时间段内进行）
+                    controller.trade_executor.recheck_timing_if_due()
         except KeyboardInterrupt:
             logging.info("接收到停止信号，正在关闭系统...")
             controller.stop()
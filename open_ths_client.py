@@ -5,23 +5,74 @@ import sys
 import psutil
 import pyautogui
 import logging
+from window_registry import get_window_registry, ROLE_MAIN, ROLE_TRADING
+from startup_report import StartupReport, wait_for
+from logging_setup import setup_logging
 
-# 配置日志记录
-log_file = 'logs/ths_client.log'
-os.makedirs('logs', exist_ok=True)
+# 启动各步骤的最长等待时间（秒），步骤就绪即继续，不再固定等待
+PROCESS_TIMEOUT = 30  # 客户端进程出现
+MAIN_WINDOW_TIMEOUT = 60  # 主窗口出现（冷启动时包括登录和加载）
+TRADING_WINDOW_TIMEOUT = 15  # 按F12或点击交易按钮后交易窗口出现
+ACTIVATE_TIMEOUT = 3  # 窗口恢复或激活
 
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# 交易窗口所属的网上股票交易程序，由客户端按F12启动，可能单独退出或被重新启动
+TICKET_EXE = 'xiadan.exe'
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# 配置日志：记录由后台线程写入 logs/<进程名>/ths_client.log
+setup_logging()
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+class TrackedProcess:
+    """
+    记录一个程序的进程（PID和创建时间）
+
+    查找时先校验已记录的进程：PID仍然存在且创建时间一致（排除PID被复用）、不是僵尸进程，
+    校验失败才遍历进程表重新查找。is_alive只做校验不遍历，可以频繁调用。
+
+    参数:
+        exe_name: 可执行文件名（不区分大小写）
+    """
+    def __init__(self, exe_name):
+        self.exe_name = exe_name.lower()
+        self.process = None
+        self.pid = None
+        self.create_time = None
+        self.hits = 0  # 校验通过、不需要遍历进程表的次数
+        self.scans = 0  # 遍历进程表的次数
+
+    def is_alive(self):
+        """已记录的进程是否仍在运行"""
+        if self.process is None:
+            return False
+        try:
+            # is_running会比较创建时间，PID被其他进程复用时返回False
+            return self.process.is_running() and self.process.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+
+    def find(self):
+        """返回程序的进程，找不到返回None"""
+        if self.is_alive():
+            self.hits += 1
+            return self.process
+        self.process = self.pid = self.create_time = None
+        self.scans += 1
+        for proc in psutil.process_iter(['pid', 'name', 'create_time']):
+            try:
+                # 检查进程名是否匹配
+                if self.exe_name in (proc.info['name'] or '').lower():
+                    self.process = proc
+                    self.pid = proc.info['pid']
+                    self.create_time = proc.info['create_time']
+                    logging.info(f"找到正在运行的程序 {self.exe_name}，进程ID: {self.pid}")
+                    return proc
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass  # 忽略进程访问相关的异常
+        return None
+
+    def stats(self):
+        """返回记录的进程和查找统计"""
+        return {'exe': self.exe_name, 'pid': self.pid, 'alive': self.is_alive(),
+                'hits': self.hits, 'scans': self.scans}
 
 class THSClient:
     def __init__(self, ths_path=None):
@@ -54,203 +105,180 @@ class THSClient:
         logging.info(f"同花顺交易客户端路径: {self.ths_path}")
         
         self.process = None  # 初始化进程对象为None
+        # 记录客户端进程，查找时先校验PID和创建时间，避免每次遍历全部进程
+        self.tracked = TrackedProcess(os.path.basename(self.ths_path))
+        # 交易窗口打开后同样记录交易程序的进程
+        if self.tracked.exe_name == TICKET_EXE:
+            self.ticket_tracked = self.tracked
+        else:
+            self.ticket_tracked = TrackedProcess(TICKET_EXE)
     
     def is_running(self):
-        """检查同花顺客户端是否正在运行"""
-        if self.process is None:
-            return False
-        
-        try:
-            # 使用poll()方法检查进程状态，如果返回None表示进程仍在运行
-            if self.process.poll() is None:
-                return True
-            return False
-        except:
+        """检查同花顺客户端是否正在运行（包括不是由本程序启动的实例）"""
+        return self.find_running_instance() is not None
+
+    def is_alive(self):
+        """廉价的存活检查：只校验已记录的客户端进程，不遍历进程表，可以每秒调用"""
+        return self.tracked.is_alive()
+
+    def is_ticket_alive(self):
+        """
+        廉价的交易程序检查：已记录的交易程序进程是否仍在运行
+
+        进程退出或被重新启动（PID相同但创建时间不同）时返回False；还没有记录交易程序时返回True。
+        """
+        return self.ticket_tracked.process is None or self.ticket_tracked.is_alive()
+
+    def track_ticket(self):
+        """记录交易窗口所属的交易程序进程，返回是否找到"""
+        if self.ticket_tracked.find() is None:
+            logging.warning(f"交易窗口已打开，但未找到交易程序 {TICKET_EXE} 的进程")
             return False
+        return True
+
+    def stats(self):
+        """返回客户端和交易程序进程的记录和查找统计"""
+        return dict(self.tracked.stats(), ticket=self.ticket_tracked.stats())
     
     def find_running_instance(self):
-        """查找已经运行的同花顺实例"""
-        # 获取可执行文件名（小写）用于进程匹配
-        exe_name = os.path.basename(self.ths_path).lower()
-        
-        # 遍历系统中的所有进程
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                # 检查进程名是否匹配同花顺程序
-                if exe_name in proc.info['name'].lower():
-                    logging.info(f"找到正在运行的程序 {exe_name}，进程ID: {proc.info['pid']}")
-                    return proc
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass  # 忽略进程访问相关的异常
-        return None
+        """查找已经运行的同花顺实例，已记录的进程仍然有效时不遍历进程表"""
+        return self.tracked.find()
     
-    def open(self):
-        """打开同花顺客户端"""
-        # 首先检查是否已有实例在运行
-        existing_process = self.find_running_instance()
-        if existing_process:
-            logging.info("同花顺客户端已经在运行")
-            return True
-        
-        try:
-            logging.info("正在启动同花顺客户端...")
-            # 使用subprocess.Popen启动程序，shell=True确保能正常启动Windows程序
-            self.process = subprocess.Popen(self.ths_path, shell=True)
-            time.sleep(5)  # 等待5秒，确保程序完全启动
-            
-            # 检查程序是否成功启动
-            if self.is_running():
-                logging.info("同花顺客户端已成功启动")
+    def open(self, report=None):
+        """
+        打开同花顺客户端，启动后探测到进程出现即返回
+
+        参数:
+            report: 启动耗时报告，None表示不记录
+        """
+        report = report or StartupReport()
+        with report.phase('ths_process') as status:
+            # 首先检查是否已有实例在运行
+            existing_process = self.find_running_instance()
+            if existing_process:
+                logging.info("同花顺客户端已经在运行")
                 return True
-            else:
+            
+            try:
+                logging.info("正在启动同花顺客户端...")
+                # 使用subprocess.Popen启动程序，shell=True确保能正常启动Windows程序
+                self.process = subprocess.Popen(self.ths_path, shell=True)
+                
+                # 通过shell启动时Popen得到的是shell进程，以系统中出现客户端进程为准
+                if wait_for(self.find_running_instance, PROCESS_TIMEOUT):
+                    logging.info("同花顺客户端已成功启动")
+                    return True
                 logging.error("同花顺客户端启动失败")
+                status['ok'] = False
                 return False
-        except Exception as e:
-            logging.error(f"启动同花顺客户端时出错: {e}")
-            return False
+            except Exception as e:
+                logging.error(f"启动同花顺客户端时出错: {e}")
+                status['ok'] = False
+                return False
+
+    def navigate_to_trading(self, report=None):
+        """
+        打开交易界面：等待主窗口出现并激活，按F12（失败时点击交易按钮）后等待交易窗口出现
 
-    def navigate_to_trading(self):
-        """打开交易界面"""
+        参数:
+            report: 启动耗时报告，None表示不记录
+        返回:
+            交易窗口是否已打开
+        """
+        report = report or StartupReport()
+        windows = get_window_registry()
         try:
-            # 等待界面完全加载
-            time.sleep(3)
-            
-            # 查找并确保同花顺主窗口处于激活状态（非最小化）
-            ths_window = None
-            for window in pyautogui.getAllWindows():
-                if "同花顺" in window.title and "网上股票交易" not in window.title:
-                    ths_window = window
-                    # 确保窗口不是最小化状态
-                    if window.isMinimized:
-                        logging.info("同花顺窗口处于最小化状态，正在恢复")
-                        window.restore()
-                        time.sleep(1)
-                    
-                    # 激活窗口
-                    window.activate()
-                    logging.info(f"已激活同花顺主窗口: {window.title}")
-                    time.sleep(2)
-                    
-                    # 点击窗口中心以确保窗口真正激活
-                    window_center_x = window.left + window.width // 2
-                    window_center_y = window.top + window.height // 2
-                    pyautogui.click(window_center_x, window_center_y)
-                    time.sleep(0.5)
-                    break
-            
-            if not ths_window:
-                logging.error("未找到同花顺主窗口")
-                return False
+            # 等待主窗口出现（冷启动时客户端加载需要的时间因机器而异）
+            with report.phase('main_window') as status:
+                window = wait_for(lambda: windows.get(ROLE_MAIN), MAIN_WINDOW_TIMEOUT)
+                if not window:
+                    logging.error("未找到同花顺主窗口")
+                    status['ok'] = False
+                    return False
             
-            # 使用F12快捷键打开交易界面，避免使用不可靠的图像识别
-            logging.info("尝试使用F12快捷键打开交易界面")
-            pyautogui.press('f12')
-            time.sleep(5)  # 等待界面切换完成
-            return True
+            with report.phase('trading_window') as status:
+                # 交易窗口已经打开时不再操作主窗口
+                trading_window = windows.get(ROLE_TRADING)
+                if trading_window:
+                    logging.info(f"找到交易窗口: {trading_window.title}")
+                    self.track_ticket()
+                    return True
+                
+                # 确保窗口不是最小化状态
+                if window.isMinimized:
+                    logging.info("同花顺窗口处于最小化状态，正在恢复")
+                    window.restore()
+                    wait_for(lambda: not window.isMinimized, ACTIVATE_TIMEOUT, poll_interval=0.05)
+                
+                # 激活窗口并点击窗口中心以确保窗口真正激活
+                window.activate()
+                wait_for(lambda: window.isActive, ACTIVATE_TIMEOUT, poll_interval=0.05)
+                logging.info(f"已激活同花顺主窗口: {window.title}")
+                pyautogui.click(window.left + window.width // 2, window.top + window.height // 2)
+                
+                # 使用F12快捷键打开交易界面，避免使用不可靠的图像识别
+                logging.info("尝试使用F12快捷键打开交易界面")
+                pyautogui.press('f12')
+                trading_window = wait_for(lambda: windows.get(ROLE_TRADING), TRADING_WINDOW_TIMEOUT)
+                
+                # 如果F12快捷键失败，尝试点击交易按钮
+                if not trading_window:
+                    logging.info("F12快捷键未能打开交易窗口，尝试点击交易按钮")
+                    button_x = window.left + int(window.width * 0.5)
+                    button_y = window.top + int(window.height * 0.2)
+                    pyautogui.click(button_x, button_y)
+                    logging.info(f"尝试点击交易按钮位置: ({button_x}, {button_y})")
+                    trading_window = wait_for(lambda: windows.get(ROLE_TRADING), TRADING_WINDOW_TIMEOUT)
+                
+                if not trading_window:
+                    logging.error("未能打开交易窗口")
+                    status['ok'] = False
+                    return False
+                logging.info(f"交易窗口已打开: {trading_window.title}")
+                self.track_ticket()
+                return True
         except Exception as e:
             logging.error(f"打开交易界面时出错: {e}")
             return False
 
+    def bring_trading_window_to_front(self):
+        """将交易窗口置于最前面"""
+        trading_window = get_window_registry().get(ROLE_TRADING)
+        if not trading_window:
+            return False
+        trading_window.activate()
+        wait_for(lambda: trading_window.isActive, ACTIVATE_TIMEOUT, poll_interval=0.05)
+        
+        # 点击窗口中心以确保窗口真正激活
+        pyautogui.click(trading_window.left + trading_window.width // 2,
+                        trading_window.top + trading_window.height // 2)
+        logging.info(f"已将交易窗口 '{trading_window.title}' 置于最前面")
+        return True
+
 def main():
-    """主函数：启动同花顺客户端并打开交易界面"""
+    """主函数：启动同花顺客户端并打开交易界面，各步骤探测到就绪即进入下一步"""
+    report = StartupReport()
     try:
         # 创建并启动同花顺客户端实例
         client_hexin = THSClient(r"D:\同花顺\hexin.exe")
-        if client_hexin.open():
+        if client_hexin.open(report):
             logging.info("同花顺客户端已成功启动")
         else:
             logging.error("无法启动同花顺客户端")
             return False
         
-        # 等待客户端初始化
-        time.sleep(3)
-        
-        # 自动打开交易窗口的处理流程
-        try:
-            # 查找并激活同花顺主窗口
-            ths_window = None
-            for window in pyautogui.getAllWindows():
-                if "同花顺" in window.title and "网上股票交易" not in window.title:
-                    ths_window = window
-                    window.activate()  # 激活窗口
-                    logging.info(f"已激活同花顺主窗口: {window.title}")
-                    time.sleep(2)
-                    break
-            
-            if not ths_window:
-                logging.error("未找到同花顺主窗口")
-                return False
-            
-            # 检查交易窗口是否已经打开
-            trading_window = None
-            for window in pyautogui.getAllWindows():
-                if "网上股票交易系统5.0" in window.title:
-                    trading_window = window
-                    logging.info(f"找到交易窗口: {window.title}")
-                    break
-            
-            # 如果交易窗口未打开，尝试多种方式打开它
-            if not trading_window:
-                logging.info("交易窗口未打开，尝试使用F12快捷键打开")
-                
-                # 确保主窗口处于激活状态
-                ths_window.activate()
-                time.sleep(1)
-                
-                # 尝试使用F12快捷键打开交易窗口
-                pyautogui.press('f12')
-                time.sleep(5)
-                
-                # 检查F12快捷键是否成功打开交易窗口
-                for window in pyautogui.getAllWindows():
-                    if "网上股票交易系统5.0" in window.title:
-                        trading_window = window
-                        logging.info(f"交易窗口已打开: {window.title}")
-                        break
-                
-                # 如果F12快捷键失败，尝试点击交易按钮
-                if not trading_window:
-                    logging.info("F12快捷键未能打开交易窗口，尝试其他方法")
-                    
-                    if ths_window:
-                        # 计算并点击主窗口中交易按钮的估计位置
-                        button_x = ths_window.left + int(ths_window.width * 0.5)
-                        button_y = ths_window.top + int(ths_window.height * 0.2)
-                        pyautogui.click(button_x, button_y)
-                        logging.info(f"尝试点击交易按钮位置: ({button_x}, {button_y})")
-                        time.sleep(5)
-                        
-                        # 再次检查交易窗口是否打开
-                        for window in pyautogui.getAllWindows():
-                            if "网上股票交易系统5.0" in window.title:
-                                trading_window = window
-                                logging.info(f"交易窗口已打开: {window.title}")
-                                break
-            
-            # 如果成功找到交易窗口，确保它在最前面
-            if trading_window:
-                # 激活交易窗口
-                trading_window.activate()
-                time.sleep(1)
-                
-                # 点击窗口中心以确保窗口真正激活
-                window_center_x = trading_window.left + trading_window.width // 2
-                window_center_y = trading_window.top + trading_window.height // 2
-                pyautogui.click(window_center_x, window_center_y)
-                
-                logging.info(f"已将交易窗口 '{trading_window.title}' 置于最前面")
-                return True
-            else:
-                logging.error("未能打开交易窗口")
-                return False
-                
-        except Exception as e:
-            logging.error(f"通过同花顺客户端启动交易功能时出错: {e}")
+        # 等待主窗口和交易窗口，交易窗口未打开时尝试F12和点击交易按钮
+        if not client_hexin.navigate_to_trading(report):
             return False
         
+        # 确保交易窗口在最前面
+        return client_hexin.bring_trading_window_to_front()
+        
     except Exception as e:
         logging.error(f"运行过程中出错: {e}")
         return False
+    finally:
+        report.log()
 
 if __name__ == "__main__":
-    main()  # 当脚本直接运行时，执行main函数
\ No newline at end of file
+    main()  # 当脚本直接运行时，执行main函数
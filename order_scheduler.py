@@ -0,0 +1,158 @@
+import time
+import heapq
+import queue
+import datetime
+import logging
+import threading
+from collections import deque
+
+from signal_model import SIDE_BUY, SIDE_SELL
+
+logger = logging.getLogger(__name__)
+
+# 优先级：数值越小越先执行。卖出释放资金供买入使用，先于买入执行
+PRIORITY_EXIT = 0
+PRIORITY_ENTRY = 1
+PRIORITIES = {SIDE_SELL: PRIORITY_EXIT, SIDE_BUY: PRIORITY_ENTRY}
+
+# 信号在策略日志时间之后多久仍然值得下单（秒）
+MAX_ORDER_AGE = {SIDE_SELL: 900, SIDE_BUY: 300}
+# 收盘后不再下单
+MARKET_CLOSE = datetime.time(15, 0)
+
+
+def order_deadline(signal, max_age=MAX_ORDER_AGE):
+    """计算订单的有效期限（time.time()时间戳）：日志时间加最长等待时间，且不晚于当日收盘"""
+    deadline = signal.trade_time + datetime.timedelta(seconds=max_age[signal.side])
+    close = datetime.datetime.combine(signal.trade_time.date(), MARKET_CLOSE)
+    return min(deadline, close).timestamp()
+
+
+class OrderScheduler:
+    """
+    按优先级和有效期限调度待执行订单
+
+    替代执行阶段的先进先出队列，接口与queue.Queue一致（put/get/get_nowait/qsize/maxsize），
+    可以直接作为流水线阶段的输入队列。取出顺序为：优先级（卖出先于买入）、有效期限
+    （先到期的先执行）、入队顺序。执行器每执行完一笔再取下一笔，因此新到的紧急订单
+    可以插到已排队的非紧急订单前面。取出时已超过有效期限的订单不再下单，
+    交给on_expired回调并计数。记录每笔订单的排队时间。
+
+    参数:
+        maxsize: 队列容量，已满时put阻塞（反压）
+        max_age: {方向: 日志时间之后的最长有效秒数}
+        on_expired: 订单过期时调用，参数为(信号, 超出期限的秒数)
+        clock: 时间来源，默认time.time
+    """
+    def __init__(self, maxsize=0, max_age=None, on_expired=None, clock=time.time):
+        self.maxsize = maxsize
+        self.max_age = dict(max_age or MAX_ORDER_AGE)
+        self.on_expired = on_expired
+        self.clock = clock
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.pushed = 0
+        self.dispatched = 0
+        self.expired = 0
+        self.queue_delays = deque(maxlen=1000)  # 最近订单的排队时间（秒）
+        self.max_queue_delay = 0.0
+
+    def qsize(self):
+        with self._cond:
+            return len(self._heap)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def put(self, signal, block=True, timeout=None):
+        """加入待执行订单，队列已满时等待，超时抛出queue.Full"""
+        with self._cond:
+            if self.maxsize > 0:
+                if not block and len(self._heap) >= self.maxsize:
+                    raise queue.Full
+                if not self._cond.wait_for(lambda: len(self._heap) < self.maxsize, timeout):
+                    raise queue.Full
+            entry = (PRIORITIES[signal.side], order_deadline(signal, self.max_age), self._seq, self.clock(), signal)
+            self._seq += 1
+            heapq.heappush(self._heap, entry)
+            self.pushed += 1
+            self._cond.notify_all()
+
+    def get(self, block=True, timeout=None):
+        """取出最优先的未过期订单，没有订单时等待，超时抛出queue.Empty"""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            expired = []
+            with self._cond:
+                while not self._heap:
+                    remaining = None if end is None else end - time.monotonic()
+                    if not block or (remaining is not None and remaining <= 0):
+                        raise queue.Empty
+                    self._cond.wait(remaining)
+                now = self.clock()
+                entry = None
+                while self._heap:
+                    candidate = heapq.heappop(self._heap)
+                    if candidate[1] < now:
+                        expired.append(candidate)
+                        continue
+                    entry = candidate
+                    break
+                self._cond.notify_all()
+                if entry is not None:
+                    delay = now - entry[3]
+                    self.dispatched += 1
+                    self.queue_delays.append(delay)
+                    if delay > self.max_queue_delay:
+                        self.max_queue_delay = delay
+            self._report_expired(expired, now)
+            if entry is not None:
+                logger.info(f"订单 {entry[4].entrust_id} {entry[4].side_label} 排队{delay:.3f}秒后开始执行")
+                return entry[4]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def drain(self, first=None):
+        """
+        逐笔产生待执行订单，直到队列为空
+
+        每次取下一笔时才从队列中选择，执行期间新加入的更紧急订单会先被取出。
+
+        参数:
+            first: 已经取出的第一笔订单
+        """
+        if first is not None:
+            yield first
+        while True:
+            try:
+                yield self.get_nowait()
+            except queue.Empty:
+                return
+
+    def _report_expired(self, expired, now):
+        for _, deadline, _, _, signal in expired:
+            self.expired += 1
+            overdue = now - deadline
+            logger.warning(f"订单 {signal.entrust_id} {signal.side_label} {signal.security} "
+                           f"已超过有效期限{overdue:.1f}秒，不再下单")
+            if self.on_expired is not None:
+                try:
+                    self.on_expired(signal, overdue)
+                except Exception as e:
+                    logger.error(f"处理过期订单 {signal.entrust_id} 时出错: {e}")
+
+    def snapshot(self):
+        """返回队列深度、过期数和排队时间统计"""
+        with self._cond:
+            delays = sorted(self.queue_delays)
+            return {
+                'depth': len(self._heap),
+                'pushed': self.pushed,
+                'dispatched': self.dispatched,
+                'expired': self.expired,
+                'avg_queue_ms': round(sum(delays) / len(delays) * 1000, 1) if delays else 0.0,
+                'p95_queue_ms': round(delays[int(0.95 * (len(delays) - 1))] * 1000, 1) if delays else 0.0,
+                'max_queue_ms': round(self.max_queue_delay * 1000, 1)
+            }
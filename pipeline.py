@@ -0,0 +1,108 @@
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def put_with_backpressure(target_queue, item, stop_event, timeout=0.5):
+    """
+    放入有界队列，队列已满时阻塞等待（反压），收到停止信号时放弃
+
+    返回:
+        是否成功放入
+    """
+    while not stop_event.is_set():
+        try:
+            target_queue.put(item, timeout=timeout)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class StageStats:
+    """流水线阶段的处理统计"""
+    def __init__(self):
+        self.processed = 0  # 已处理的数据项数
+        self.errors = 0  # 处理出错的数据项数
+        self.emitted = 0  # 输出到下一阶段的数据项数
+        self.total_service_time = 0.0  # 累计处理耗时（秒）
+        self.max_service_time = 0.0  # 单项最长处理耗时（秒）
+        self.last_service_time = 0.0  # 最近一项的处理耗时（秒）
+
+    def record(self, service_time):
+        self.processed += 1
+        self.total_service_time += service_time
+        self.last_service_time = service_time
+        if service_time > self.max_service_time:
+            self.max_service_time = service_time
+
+    @property
+    def avg_service_time(self):
+        return self.total_service_time / self.processed if self.processed else 0.0
+
+
+class PipelineStage:
+    """
+    流水线阶段
+
+    从有界输入队列阻塞取出数据项交给handler处理，handler返回的结果逐个放入
+    下一阶段的有界队列；下一阶段处理不过来时本阶段阻塞，形成反压。
+
+    参数:
+        name: 阶段名称
+        handler: 处理函数，参数为数据项，返回输出数据项的可迭代对象或None
+        input_queue: 输入队列
+        output_queue: 输出队列，最后一个阶段为None
+    """
+    def __init__(self, name, handler, input_queue, output_queue=None):
+        self.name = name
+        self.handler = handler
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stats = StageStats()
+        self.thread = None
+
+    def run(self, stop_event):
+        """阶段主循环，直到stop_event被设置"""
+        while not stop_event.is_set():
+            try:
+                item = self.input_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                outputs = self.handler(item)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"流水线阶段 {self.name} 处理出错: {e}")
+                outputs = None
+            self.stats.record(time.perf_counter() - start)
+
+            if outputs and self.output_queue is not None:
+                for output in outputs:
+                    if not put_with_backpressure(self.output_queue, output, stop_event):
+                        return
+                    self.stats.emitted += 1
+
+    def start(self, stop_event):
+        """在后台线程中运行阶段"""
+        self.thread = threading.Thread(target=self.run, args=(stop_event,), name=f"Stage_{self.name}", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def snapshot(self):
+        """返回阶段的队列深度和处理耗时"""
+        return {
+            'queue_depth': self.input_queue.qsize(),
+            'queue_capacity': self.input_queue.maxsize,
+            'processed': self.stats.processed,
+            'emitted': self.stats.emitted,
+            'errors': self.stats.errors,
+            'avg_service_ms': round(self.stats.avg_service_time * 1000, 2),
+            'max_service_ms': round(self.stats.max_service_time * 1000, 2),
+            'last_service_ms': round(self.stats.last_service_time * 1000, 2)
+        }
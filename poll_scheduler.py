@@ -0,0 +1,214 @@
+import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 策略已知的下单时间点
+ORDER_TIMES = ['09:01', '09:26', '11:25', '14:50']
+
+# 连续竞价开始时间，之前的窗口属于开盘前，需要越过交易时间检查获取数据
+SESSION_OPEN = datetime.time(9, 30)
+
+# 空闲时单次等待的最长时间（秒），避免系统时间调整后长时间不醒
+MAX_IDLE_WAIT = 600
+
+
+def _shift_time(t, seconds):
+    """将datetime.time平移指定秒数"""
+    dt = datetime.datetime.combine(datetime.date.today(), t) + datetime.timedelta(seconds=seconds)
+    return dt.time()
+
+
+class PollWindow:
+    """
+    轮询时间窗口
+
+    参数:
+        name: 窗口名称
+        start: 窗口开始时间（datetime.time，包含）
+        end: 窗口结束时间（datetime.time，不包含）
+        interval: 窗口内的轮询间隔（秒）
+        anchor: 窗口对应的策略下单时间点，用于统计检测延迟，None表示普通窗口
+        pre_open: 是否为开盘前窗口，窗口内轮询时以force=True调用轮询任务
+    """
+    def __init__(self, name, start, end, interval, anchor=None, pre_open=False):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.interval = interval
+        self.anchor = anchor
+        self.pre_open = pre_open
+
+    def contains(self, t):
+        """检查时间是否落在窗口内"""
+        return self.start <= t < self.end
+
+    def __repr__(self):
+        return f"PollWindow({self.name}, {self.start}-{self.end}, {self.interval}s)"
+
+
+def build_default_windows(order_times=ORDER_TIMES, burst_interval=1, tail_interval=5,
+                          session_interval=60):
+    """
+    构建默认轮询策略
+
+    交易时段内慢速轮询；09:25集合竞价结束到开盘之间按开盘前窗口轮询；
+    每个下单时间点前10秒到后90秒每秒轮询，之后到下单后5分钟每5秒轮询。
+    在开盘前结束的下单时间点窗口同样属于开盘前窗口。
+    """
+    windows = [
+        PollWindow('集合竞价后', datetime.time(9, 25), SESSION_OPEN, session_interval, pre_open=True),
+        PollWindow('上午盘', SESSION_OPEN, datetime.time(11, 30, 1), session_interval),
+        PollWindow('下午盘', datetime.time(13, 0), datetime.time(15, 0, 1), session_interval),
+    ]
+    for order_time in order_times:
+        anchor = datetime.datetime.strptime(order_time, '%H:%M').time()
+        burst_end = _shift_time(anchor, 90)
+        tail_end = _shift_time(anchor, 300)
+        windows.append(PollWindow(f'{order_time}下单', _shift_time(anchor, -10), burst_end,
+                                  burst_interval, anchor, burst_end <= SESSION_OPEN))
+        windows.append(PollWindow(f'{order_time}跟踪', burst_end, tail_end,
+                                  tail_interval, anchor, tail_end <= SESSION_OPEN))
+    return windows
+
+
+class AdaptivePollScheduler:
+    """
+    分时段自适应轮询调度器
+
+    根据当前所处的时间窗口选择轮询间隔，按精确的截止时间唤醒，
+    交易时段以外不轮询。每个下单时间点统计从下单时间到检测到新数据的延迟。
+
+    参数:
+        task: 轮询任务，返回True表示检测到新数据
+        windows: 轮询窗口列表，默认使用build_default_windows()
+        now_func: 获取当前时间的函数，便于测试
+    """
+    def __init__(self, task, windows=None, now_func=datetime.datetime.now):
+        self.task = task
+        self.windows = windows if windows is not None else build_default_windows()
+        self.now_func = now_func
+        self.detection_latency = {}  # 下单时间点 -> 检测延迟列表（秒）
+        self._stop_event = threading.Event()
+        self._last_poll = None
+        self._pending_anchors = {}  # (日期, 下单时间点) -> 下单时刻
+        self._resolved_anchors = set()
+
+    def active_windows(self, now):
+        """返回当前时间所在的所有窗口，周末不轮询"""
+        if now.weekday() > 4:
+            return []
+        t = now.time()
+        return [w for w in self.windows if w.contains(t)]
+
+    def active_window(self, now):
+        """返回当前生效的窗口（轮询间隔最短的窗口）"""
+        windows = self.active_windows(now)
+        if not windows:
+            return None
+        return min(windows, key=lambda w: w.interval)
+
+    def _next_boundary(self, now):
+        """返回当前时间之后最近的窗口边界"""
+        boundaries = []
+        for day_offset in range(8):
+            day = now.date() + datetime.timedelta(days=day_offset)
+            if day.weekday() > 4:
+                continue
+            for w in self.windows:
+                for t in (w.start, w.end):
+                    dt = datetime.datetime.combine(day, t)
+                    if dt > now:
+                        boundaries.append(dt)
+            if boundaries:
+                break
+        return min(boundaries) if boundaries else None
+
+    def next_poll_time(self, now):
+        """计算下一次轮询的时间"""
+        boundary = self._next_boundary(now)
+        window = self.active_window(now)
+        if window is None:
+            return boundary
+
+        # 轮询时刻对齐到窗口开始时间的整数倍间隔
+        start = datetime.datetime.combine(now.date(), window.start)
+        ticks = int((now - start).total_seconds() // window.interval)
+        due = start + datetime.timedelta(seconds=ticks * window.interval)
+        if self._last_poll is not None and self._last_poll >= due:
+            due += datetime.timedelta(seconds=window.interval)
+        if boundary is not None and due > boundary:
+            return boundary
+        return due
+
+    def _arm_anchors(self, now):
+        """登记当前窗口对应的、已到达的下单时间点"""
+        active_keys = set()
+        for w in self.active_windows(now):
+            if w.anchor is None:
+                continue
+            anchor_dt = datetime.datetime.combine(now.date(), w.anchor)
+            key = (now.date(), w.anchor)
+            active_keys.add(key)
+            if anchor_dt <= now and key not in self._resolved_anchors:
+                self._pending_anchors[key] = anchor_dt
+
+        # 窗口已结束仍未检测到新数据的下单时间点
+        for key in list(self._pending_anchors):
+            if key not in active_keys:
+                del self._pending_anchors[key]
+                self._resolved_anchors.add(key)
+                logger.info(f"{key[1].strftime('%H:%M')}下单窗口内未检测到新数据")
+
+    def _record_detection(self, detected_at):
+        """记录各下单时间点的检测延迟"""
+        for key, anchor_dt in list(self._pending_anchors.items()):
+            latency = (detected_at - anchor_dt).total_seconds()
+            name = key[1].strftime('%H:%M')
+            self.detection_latency.setdefault(name, []).append(latency)
+            logger.info(f"{name}下单窗口检测延迟: {latency:.2f}秒")
+            del self._pending_anchors[key]
+            self._resolved_anchors.add(key)
+
+    def poll_once(self):
+        """立即执行一次轮询，开盘前窗口内以force=True调用轮询任务"""
+        now = self.now_func()
+        self._last_poll = now
+        self._arm_anchors(now)
+        pre_open = any(w.pre_open for w in self.active_windows(now))
+        try:
+            has_new_data = self.task(force=True) if pre_open else self.task()
+        except Exception as e:
+            logger.error(f"轮询任务执行出错: {e}")
+            return False
+        if has_new_data:
+            self._record_detection(self.now_func())
+        return has_new_data
+
+    def run(self):
+        """按调度策略持续轮询，直到调用stop()"""
+        self._stop_event.clear()
+        logger.info("自适应轮询调度器已启动")
+        while not self._stop_event.is_set():
+            now = self.now_func()
+            due = self.next_poll_time(now)
+            if due is None:
+                logger.error("未配置任何轮询窗口，调度器退出")
+                break
+            wait_seconds = (due - now).total_seconds()
+            if wait_seconds > 0:
+                self._stop_event.wait(min(wait_seconds, MAX_IDLE_WAIT))
+                continue
+            self.poll_once()
+        logger.info("自适应轮询调度器已停止")
+
+    def start(self):
+        """在后台线程中运行调度器"""
+        thread = threading.Thread(target=self.run, name="JQ_Poller", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """停止调度器"""
+        self._stop_event.set()
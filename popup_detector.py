@@ -0,0 +1,200 @@
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# 弹窗识别结果
+POPUP_NONE = 'none'  # 没有可识别的弹窗
+POPUP_UNKNOWN = 'unknown'  # 时间预算用完前没有模板匹配，无法判断是否有弹窗
+POPUP_CONFIRM = 'confirm'  # 委托确认，回车后委托生效
+POPUP_SUCCESS = 'success'  # 委托已成功提交
+POPUP_REJECT_PRICE = 'reject_price'  # 委托价格超出涨跌停限制
+POPUP_REJECT_FUNDS = 'reject_funds'  # 可用资金不足
+POPUP_REJECT_POSITION = 'reject_position'  # 可用股份不足
+POPUP_REJECT_OTHER = 'reject_other'  # 其他错误提示（如委托单填写不完整）
+
+REJECT_OUTCOMES = (POPUP_REJECT_PRICE, POPUP_REJECT_FUNDS, POPUP_REJECT_POSITION, POPUP_REJECT_OTHER)
+# 模板匹配的顺序：最常见的确认和成功弹窗在前，时间预算用完时已经比较过它们
+OUTCOMES = (POPUP_CONFIRM, POPUP_SUCCESS) + REJECT_OUTCOMES
+
+# 模板目录：每种结果一个子目录，放置从弹窗截图中裁剪的特征区域（png）
+TEMPLATE_DIR = os.path.join('data', 'popup_templates')
+# 弹窗出现在交易窗口中部，只截取这一区域：(左, 上, 宽, 高) 占交易窗口的比例
+POPUP_REGION = (0.15, 0.2, 0.7, 0.6)
+
+DEFAULT_SCALE = 0.5  # 模板和截图缩小的比例，越小越快
+DEFAULT_THRESHOLD = 0.85  # 归一化相关系数达到该值视为匹配
+DEFAULT_BUDGET = 0.05  # 单次识别的时间预算（秒）
+
+
+class PopupResult(NamedTuple):
+    """弹窗识别结果"""
+    outcome: str
+    score: float  # 最佳匹配的相关系数
+    template: str  # 匹配到的模板文件名
+    elapsed: float  # 识别用时（秒）
+    complete: bool  # 是否比较了全部模板（False表示时间预算用完）
+
+
+def read_image(path):
+    """以灰度读取图片，支持中文路径"""
+    import cv2
+    import numpy as np
+    image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"无法读取图片: {path}")
+    return image
+
+
+def write_image(path, image):
+    """保存图片，支持中文路径"""
+    import cv2
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    ok, data = cv2.imencode(os.path.splitext(path)[1] or '.png', image)
+    if not ok:
+        raise ValueError(f"无法编码图片: {path}")
+    data.tofile(path)
+
+
+def popup_region(left, top, width, height, region=POPUP_REGION):
+    """根据交易窗口位置计算弹窗截图区域 (left, top, width, height)"""
+    x, y, w, h = region
+    return (int(left + width * x), int(top + height * y), int(width * w), int(height * h))
+
+
+class PopupDetector:
+    """
+    提交后弹窗的模板匹配识别
+
+    启动时读取模板目录中的全部模板，转为灰度并按scale缩小后保存在内存中；识别时
+    只处理交易窗口中部的截图区域，同样缩小后与模板做归一化相关匹配（cv2.matchTemplate）。
+    按OUTCOMES的顺序比较，达到阈值立即返回；时间预算用完时返回目前最好的结果。
+
+    参数:
+        template_dir: 模板目录，子目录名为识别结果（如confirm、reject_funds）
+        scale: 缩小比例
+        threshold: 匹配阈值
+        budget: 单次识别的时间预算（秒）
+    """
+    def __init__(self, template_dir=TEMPLATE_DIR, scale=DEFAULT_SCALE, threshold=DEFAULT_THRESHOLD,
+                 budget=DEFAULT_BUDGET):
+        import cv2
+        self._cv2 = cv2
+        self.template_dir = template_dir
+        self.scale = scale
+        self.threshold = threshold
+        self.budget = budget
+        self.templates = []  # [(结果, 模板文件名, 缩小后的灰度图)]
+        self.load_templates()
+
+    def load_templates(self):
+        """读取模板目录，返回模板数量"""
+        templates = []
+        for outcome in OUTCOMES:
+            for path in sorted(glob.glob(os.path.join(self.template_dir, outcome, '*.png'))):
+                try:
+                    templates.append((outcome, os.path.basename(path), self._prepare(read_image(path))))
+                except ValueError as e:
+                    logger.warning(f"跳过弹窗模板: {e}")
+        self.templates = templates
+        logger.info(f"已加载{len(templates)}个弹窗模板: {self.template_dir}")
+        return len(templates)
+
+    def _prepare(self, image):
+        """转为灰度并缩小"""
+        cv2 = self._cv2
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY if image.shape[2] == 3 else cv2.COLOR_BGRA2GRAY)
+        if self.scale != 1.0:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return image
+
+    def classify(self, image):
+        """
+        识别截图中的弹窗
+
+        参数:
+            image: 弹窗区域截图（NumPy数组，灰度或BGR）
+        返回:
+            PopupResult，没有模板达到阈值时outcome为POPUP_NONE
+        """
+        cv2 = self._cv2
+        start = time.perf_counter()
+        region = self._prepare(image)
+        best = (POPUP_NONE, 0.0, '')
+        complete = True
+        for outcome, name, template in self.templates:
+            if time.perf_counter() - start > self.budget:
+                complete = False
+                break
+            if template.shape[0] > region.shape[0] or template.shape[1] > region.shape[1]:
+                continue
+            _, score, _, _ = cv2.minMaxLoc(cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED))
+            if score > best[1]:
+                best = (outcome, score, name)
+            if score >= self.threshold:
+                break
+        outcome, score, name = best
+        if score < self.threshold:
+            outcome = POPUP_NONE
+        return PopupResult(outcome, round(float(score), 3), name, time.perf_counter() - start, complete)
+
+    def classify_file(self, path):
+        """识别保存的截图文件"""
+        return self.classify(read_image(path))
+
+
+def load_popup_detector(template_dir=TEMPLATE_DIR, **kwargs):
+    """创建弹窗识别器；没有模板或缺少OpenCV时返回None，调用方退回不识别弹窗的处理方式"""
+    if not glob.glob(os.path.join(template_dir, '*', '*.png')):
+        logger.info(f"未找到弹窗模板（{template_dir}），提交后的弹窗不做识别")
+        return None
+    try:
+        return PopupDetector(template_dir, **kwargs)
+    except ImportError as e:
+        logger.warning(f"无法加载弹窗识别（{e}），提交后的弹窗不做识别")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用弹窗模板识别保存的截图，或从截图中裁剪新模板")
+    parser.add_argument('images', nargs='+', help="截图文件")
+    parser.add_argument('--templates', default=TEMPLATE_DIR, help="模板目录")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="匹配阈值")
+    parser.add_argument('--scale', type=float, default=DEFAULT_SCALE, help="缩小比例")
+    parser.add_argument('--add-template', choices=OUTCOMES, metavar='OUTCOME',
+                        help=f"将截图保存为该结果的模板，可选: {', '.join(OUTCOMES)}")
+    parser.add_argument('--crop', type=int, nargs=4, metavar=('X', 'Y', 'W', 'H'),
+                        help="保存模板时只保留截图中的这一区域（弹窗中的文字或图标）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.add_template:
+        for path in args.images:
+            image = read_image(path)
+            if args.crop:
+                x, y, w, h = args.crop
+                image = image[y:y + h, x:x + w]
+            target = os.path.join(args.templates, args.add_template, os.path.basename(path))
+            write_image(os.path.splitext(target)[0] + '.png', image)
+            print(f"已保存模板: {target}")
+        return 0
+
+    detector = PopupDetector(args.templates, scale=args.scale, threshold=args.threshold, budget=float('inf'))
+    if not detector.templates:
+        print(f"模板目录 {args.templates} 中没有模板")
+        return 1
+    for path in args.images:
+        r = detector.classify_file(path)
+        print(f"{path}: {r.outcome} 相关系数{r.score:.3f} 模板{r.template or '-'} 用时{r.elapsed * 1000:.1f}毫秒")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import os
+import json
+import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+RISK_LIMITS_FILE = os.path.join('data', 'risk_limits.json')
+
+# 默认风险限额，按账户规模在 data/risk_limits.json 中覆盖（只需写出要修改的项）
+DEFAULT_LIMITS = {
+    # 买入单笔委托金额上限（元）
+    'max_order_value': 200000,
+    # 每日已提交的买入委托笔数上限
+    'max_daily_buys': 20,
+    # 每日已提交的卖出委托笔数上限：卖出只减少持仓，单独计数且上限较高，买入达到上限后仍能平仓
+    'max_daily_sells': 100
+}
+
+
+def load_risk_limits(path=RISK_LIMITS_FILE):
+    """加载风险限额，文件中未设置的项使用默认值，文件不存在或损坏时使用默认限额"""
+    limits = dict(DEFAULT_LIMITS)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"未找到风险限额配置 {path}，使用默认限额: {limits}")
+        return limits
+    except (OSError, ValueError) as e:
+        logger.error(f"读取风险限额配置 {path} 出错，使用默认限额: {e}")
+        return limits
+    if not isinstance(data, dict):
+        logger.error(f"风险限额配置 {path} 格式不正确，使用默认限额")
+        return limits
+
+    for name, value in data.items():
+        if name not in DEFAULT_LIMITS:
+            logger.warning(f"忽略未知的风险限额 {name}")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            logger.error(f"风险限额 {name}={value!r} 无效，使用默认值{DEFAULT_LIMITS[name]}")
+        else:
+            limits[name] = value
+    logger.info(f"已加载风险限额配置 {path}: {limits}")
+    return limits
+
+
+class RiskChecker:
+    """
+    下单前的风险检查
+
+    检查信号是否为当天信号、数量是否有效（买入须为100股的整数倍，卖出允许零股）、价格是否有效、
+    买入的单笔金额和当日委托笔数是否超过上限，以及同一委托编号是否重复。
+    卖出不检查金额，笔数单独计数，不受买入笔数上限的限制。
+
+    当日笔数只统计已提交的委托（由执行器在提交时调用record_submitted），检查通过后
+    未能提交的订单（过期、执行失败）不占用笔数。已通过检查、尚在排队的订单不计入，
+    因此同时排队的订单可能使笔数略超上限。
+
+    参数:
+        max_order_value: 买入单笔委托金额上限（元）
+        max_daily_buys: 每日已提交的买入委托笔数上限
+        max_daily_sells: 每日已提交的卖出委托笔数上限
+    """
+    def __init__(self, max_order_value=DEFAULT_LIMITS['max_order_value'],
+                 max_daily_buys=DEFAULT_LIMITS['max_daily_buys'],
+                 max_daily_sells=DEFAULT_LIMITS['max_daily_sells']):
+        self.max_order_value = max_order_value
+        self.max_daily_buys = max_daily_buys
+        self.max_daily_sells = max_daily_sells
+        self._date = None
+        self._seen = set()
+        self._buys = 0
+        self._sells = 0
+        self.rejected = 0
+        self.sells_blocked = 0
+
+    @classmethod
+    def load(cls, path=RISK_LIMITS_FILE):
+        """按风险限额配置创建风险检查器"""
+        return cls(**load_risk_limits(path))
+
+    def _roll_date(self):
+        """跨日时清空当日的委托编号和笔数"""
+        today = datetime.date.today()
+        if self._date != today:
+            self._date = today
+            self._seen.clear()
+            self._buys = 0
+            self._sells = 0
+        return today
+
+    def check(self, signal):
+        """
+        检查交易信号
+
+        返回:
+            (是否通过, 不通过的原因)
+        """
+        today = self._roll_date()
+        if signal.trade_time.date() != today:
+            return self._reject(signal, "不是当天的交易信号")
+        if signal.entrust_id in self._seen:
+            return self._reject(signal, "委托编号重复")
+        if signal.amount <= 0:
+            return self._reject(signal, f"数量{signal.amount}无效")
+        if signal.is_buy:
+            if signal.amount % 100 != 0:
+                return self._reject(signal, f"买入数量{signal.amount}不是100股的整数倍")
+            if signal.price <= 0:
+                return self._reject(signal, f"买入价格{signal.price}无效")
+            if signal.price * signal.amount > self.max_order_value:
+                return self._reject(signal, f"委托金额{signal.price * signal.amount:.2f}超过上限{self.max_order_value}")
+            if self._buys >= self.max_daily_buys:
+                return self._reject(signal, f"当日买入委托笔数已达上限{self.max_daily_buys}")
+        else:
+            if self._sells >= self.max_daily_sells:
+                return self._reject(signal, f"当日卖出委托笔数已达上限{self.max_daily_sells}")
+
+        self._seen.add(signal.entrust_id)
+        return True, None
+
+    def record_submitted(self, signal):
+        """委托已提交，计入当日笔数"""
+        self._roll_date()
+        if signal.is_buy:
+            self._buys += 1
+        else:
+            self._sells += 1
+
+    def _reject(self, signal, reason):
+        self.rejected += 1
+        message = f"风险检查未通过，订单 {signal.entrust_id} {signal.side_label} {signal.security}: {reason}"
+        if signal.is_buy:
+            logger.warning(message)
+        else:
+            # 卖出被拦截时持仓无法平掉，需要人工处理
+            self.sells_blocked += 1
+            logger.error(f"{message}，持仓未能卖出，请人工处理")
+        return False, reason
@@ -0,0 +1,237 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# 交易窗口的界面状态
+SCREEN_BUY = 'buy'  # 买入委托单
+SCREEN_SELL = 'sell'  # 卖出委托单
+SCREEN_LOGIN = 'login'  # 登录界面
+SCREEN_LOCKED = 'locked'  # 超时锁定界面
+SCREEN_ERROR = 'error'  # 错误提示框
+SCREEN_UNKNOWN = 'unknown'  # 与所有参考画面都不够接近
+
+STATES = (SCREEN_BUY, SCREEN_SELL, SCREEN_LOGIN, SCREEN_LOCKED, SCREEN_ERROR)
+
+# 参考画面目录：每种状态一个子目录，放置委托单标题区域的截图（png）
+FRAME_DIR = os.path.join('data', 'screen_states')
+# 由参考画面计算的指纹，运行时只读取这个文件
+FINGERPRINT_FILE = os.path.join(FRAME_DIR, 'fingerprints.json')
+# 委托单标题所在区域：(左, 上, 宽, 高) 占交易窗口的比例，买入/卖出委托单在这里的标题和颜色不同
+TICKET_REGION = (0.18, 0.04, 0.4, 0.12)
+
+HASH_SIZE = 16  # 指纹为 HASH_SIZE x HASH_SIZE 位的均值哈希
+MAX_DISTANCE = 24  # 与最近的参考指纹相差超过这么多位时视为未知状态
+
+
+class ScreenState(NamedTuple):
+    """界面状态识别结果"""
+    state: str
+    distance: int  # 与最近的参考指纹相差的位数
+    frame: str  # 最近的参考画面
+    elapsed: float  # 识别用时（秒）
+
+
+def ticket_region(left, top, width, height, region=TICKET_REGION):
+    """根据交易窗口位置计算委托单标题的截图区域 (left, top, width, height)"""
+    x, y, w, h = region
+    return (int(left + width * x), int(top + height * y), int(width * w), int(height * h))
+
+
+def fingerprint(image, size=HASH_SIZE):
+    """
+    计算画面的均值哈希
+
+    转为灰度后按块取平均缩小到 size x size，每个像素高于整体平均值记为1。
+
+    参数:
+        image: 画面（NumPy数组或PIL图像，灰度或彩色）
+    返回:
+        打包后的位数组（uint8，长度 size*size/8）
+    """
+    import numpy as np
+    pixels = np.asarray(image, dtype=np.float32)
+    if pixels.ndim == 3:
+        pixels = pixels[..., :3].mean(axis=2)
+    height, width = pixels.shape
+    if height < size or width < size:
+        raise ValueError(f"画面尺寸 {width}x{height} 小于指纹尺寸 {size}")
+    rows = np.linspace(0, height, size + 1).astype(int)
+    cols = np.linspace(0, width, size + 1).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(pixels, rows[:-1], axis=0), cols[:-1], axis=1)
+    small = sums / (np.diff(rows)[:, None] * np.diff(cols)[None, :])
+    return np.packbits(small > small.mean())
+
+
+class ScreenStateRecognizer:
+    """
+    用缓存的指纹识别交易窗口当前的界面状态
+
+    参考画面的指纹预先计算并保存在FINGERPRINT_FILE中；识别时只计算截图区域的指纹，
+    与全部参考指纹一次性比较汉明距离，取最近的一个，耗时在几毫秒以内，
+    可以在每组按键之前调用。
+
+    参数:
+        fingerprints: [(状态, 参考画面名, 指纹)]
+        hash_size: 指纹尺寸
+        max_distance: 最大允许的汉明距离
+    """
+    def __init__(self, fingerprints, hash_size=HASH_SIZE, max_distance=MAX_DISTANCE):
+        if not fingerprints:
+            raise ValueError("没有参考指纹")
+        import numpy as np
+        self._np = np
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.labels = [(state, frame) for state, frame, _ in fingerprints]
+        self._matrix = np.array([fp for _, _, fp in fingerprints], dtype=np.uint8).reshape(len(fingerprints), -1)
+
+    @classmethod
+    def from_frames(cls, frame_dir=FRAME_DIR, **kwargs):
+        """读取参考画面目录，计算指纹；目录中没有参考画面时抛出ValueError"""
+        from popup_detector import read_image
+        hash_size = kwargs.get('hash_size', HASH_SIZE)
+        fingerprints = []
+        for state in STATES:
+            for path in sorted(glob.glob(os.path.join(frame_dir, state, '*.png'))):
+                fingerprints.append((state, f'{state}/{os.path.basename(path)}',
+                                     fingerprint(read_image(path), hash_size)))
+        if not fingerprints:
+            raise ValueError(f"参考画面目录 {frame_dir} 中没有参考画面（{'、'.join(STATES)}子目录下的png文件）")
+        return cls(fingerprints, **kwargs)
+
+    @classmethod
+    def load(cls, path=FINGERPRINT_FILE, **kwargs):
+        """读取保存的指纹文件"""
+        import numpy as np
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        fingerprints = [(item['state'], item['frame'], np.frombuffer(bytes.fromhex(item['hash']), dtype=np.uint8))
+                        for item in data['fingerprints']]
+        return cls(fingerprints, hash_size=data['hash_size'], **kwargs)
+
+    def save(self, path=FINGERPRINT_FILE):
+        """保存指纹文件"""
+        data = {
+            'hash_size': self.hash_size,
+            'fingerprints': [{'state': state, 'frame': frame, 'hash': bytes(row).hex()}
+                             for (state, frame), row in zip(self.labels, self._matrix)]
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def recognize(self, image, exclude=None):
+        """
+        识别画面对应的界面状态
+
+        参数:
+            image: 委托单标题区域的截图
+            exclude: 不参与比较的参考画面名（用于留一法自检）
+        返回:
+            ScreenState，没有足够接近的参考指纹时state为SCREEN_UNKNOWN
+        """
+        np = self._np
+        start = time.perf_counter()
+        candidates = [i for i, (_, frame) in enumerate(self.labels) if frame != exclude]
+        if not candidates:
+            return ScreenState(SCREEN_UNKNOWN, -1, '', time.perf_counter() - start)
+        diff = np.bitwise_xor(self._matrix, fingerprint(image, self.hash_size))
+        distances = np.unpackbits(diff, axis=1).sum(axis=1)
+        best = min(candidates, key=lambda i: distances[i])
+        distance = int(distances[best])
+        state, frame = self.labels[best]
+        if distance > self.max_distance:
+            state = SCREEN_UNKNOWN
+        return ScreenState(state, distance, frame, time.perf_counter() - start)
+
+
+def load_screen_recognizer(path=FINGERPRINT_FILE, **kwargs):
+    """创建界面状态识别器；没有指纹文件或缺少NumPy时返回None，调用方退回不识别界面的处理方式"""
+    if not os.path.exists(path):
+        logger.info(f"未找到界面指纹文件（{path}），不识别委托单状态")
+        return None
+    try:
+        return ScreenStateRecognizer.load(path, **kwargs)
+    except (ImportError, ValueError, KeyError) as e:
+        logger.warning(f"无法加载界面指纹（{e}），不识别委托单状态")
+        return None
+
+
+def self_check(recognizer, frame_dir=FRAME_DIR):
+    """
+    用参考画面自检：每张画面排除自身后识别，应得到所在目录的状态
+
+    返回:
+        (识别正确的画面数, 画面总数, 错误描述列表, 平均用时秒数)
+    """
+    from popup_detector import read_image
+    correct = 0
+    total = 0
+    problems = []
+    elapsed = 0.0
+    for state in STATES:
+        for path in sorted(glob.glob(os.path.join(frame_dir, state, '*.png'))):
+            frame = f'{state}/{os.path.basename(path)}'
+            result = recognizer.recognize(read_image(path), exclude=frame)
+            total += 1
+            elapsed += result.elapsed
+            if result.state == state:
+                correct += 1
+            else:
+                problems.append(f"{frame}: 识别为{result.state}（最近{result.frame}，相差{result.distance}位）")
+    return correct, total, problems, elapsed / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易窗口界面状态识别：生成参考指纹、自检，或识别截图")
+    parser.add_argument('images', nargs='*', help="要识别的委托单标题区域截图")
+    parser.add_argument('--frames', default=FRAME_DIR, help="参考画面目录，每种状态一个子目录")
+    parser.add_argument('--fingerprints', default=FINGERPRINT_FILE, help="指纹文件")
+    parser.add_argument('--build', action='store_true', help="由参考画面重新计算并保存指纹")
+    parser.add_argument('--check', action='store_true', help="用参考画面自检（每张画面排除自身后识别）")
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE, help="最大允许的汉明距离")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.build or args.check:
+            recognizer = ScreenStateRecognizer.from_frames(args.frames, max_distance=args.max_distance)
+        else:
+            recognizer = ScreenStateRecognizer.load(args.fingerprints, max_distance=args.max_distance)
+    except FileNotFoundError:
+        print(f"指纹文件 {args.fingerprints} 不存在，请先用 --build 生成")
+        return 1
+    except (ValueError, KeyError) as e:
+        print(f"无法创建界面状态识别器: {e}")
+        return 1
+
+    if args.build:
+        recognizer.save(args.fingerprints)
+        print(f"已保存{len(recognizer.labels)}个参考指纹: {args.fingerprints}")
+
+    status = 0
+    if args.check:
+        correct, total, problems, avg = self_check(recognizer, args.frames)
+        print(f"自检: 正确{correct}/{total}，平均用时{avg * 1000:.2f}毫秒")
+        for problem in problems:
+            print(f"    {problem}")
+        status = 0 if correct == total else 1
+
+    if args.images:
+        from popup_detector import read_image
+        for path in args.images:
+            r = recognizer.recognize(read_image(path))
+            print(f"{path}: {r.state} 相差{r.distance}位（最近{r.frame or '-'}） 用时{r.elapsed * 1000:.2f}毫秒")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import os
+import json
+import datetime
+from typing import NamedTuple
+
+SIDE_BUY = 'buy'
+SIDE_SELL = 'sell'
+
+_SIDE_LABELS = {SIDE_BUY: '买入', SIDE_SELL: '卖出'}
+_SIDE_CODES = {SIDE_BUY: 'B', SIDE_SELL: 'S'}
+_SIDES_BY_CODE = {code: side for side, code in _SIDE_CODES.items()}
+
+# 交易时间按本地时间相对该时刻的整秒数存储，与时区无关且可以直接按整数比较
+_EPOCH = datetime.datetime(1970, 1, 1)
+_ONE_SECOND = datetime.timedelta(seconds=1)
+
+SIGNALS_FILE = os.path.join('data', 'trade_signals.jsonl')
+
+
+class Signal(NamedTuple):
+    """
+    交易信号
+
+    不可变，基于tuple实现，没有实例字典。交易时间精确到秒。
+
+    字段:
+        entrust_id: 聚宽委托编号
+        trade_time: 策略日志中的交易时间（本地时间）
+        side: SIDE_BUY 或 SIDE_SELL
+        security: 6位股票代码
+        price: 委托价格（买入）或成交价格（卖出）
+        amount: 数量（股）
+        line_offset: 信号所在日志行的行号
+    """
+    entrust_id: str
+    trade_time: datetime.datetime
+    side: str
+    security: str
+    price: float
+    amount: int
+    line_offset: int
+
+    @property
+    def is_buy(self):
+        return self.side == SIDE_BUY
+
+    @property
+    def side_label(self):
+        """交易类型的中文名称"""
+        return _SIDE_LABELS[self.side]
+
+
+def time_to_seconds(dt):
+    """将本地时间转换为整数秒"""
+    return (dt - _EPOCH) // _ONE_SECOND
+
+
+def seconds_to_time(seconds):
+    """将整数秒转换为本地时间"""
+    return _EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def encode_signal(signal, hops=None):
+    """
+    将信号编码为一行紧凑的JSON数组
+
+    格式: [委托编号, 交易时间秒数, 方向(B/S), 股票代码, 价格, 数量, 行号(, 环节时间戳)]
+
+    参数:
+        hops: {环节: 时间戳}，如获取和解析进程记录的http_received、parsed，
+            由另一进程中的执行器读取后继续跟踪延迟；None表示不写入
+    """
+    row = [signal.entrust_id, time_to_seconds(signal.trade_time), _SIDE_CODES[signal.side],
+           signal.security, signal.price, signal.amount, signal.line_offset]
+    if hops:
+        row.append({hop: round(ts, 4) for hop, ts in hops.items()})
+    return json.dumps(row, separators=(',', ':'))
+
+
+def decode_signal(line):
+    """从一行紧凑JSON数组解码信号"""
+    return _signal_from_row(json.loads(line))
+
+
+def decode_record(line):
+    """从一行紧凑JSON数组解码 (信号, {环节: 时间戳})"""
+    row = json.loads(line)
+    return _signal_from_row(row), (row[7] if len(row) > 7 else {})
+
+
+def _signal_from_row(row):
+    entrust_id, seconds, side_code, security, price, amount, line_offset = row[:7]
+    return Signal(entrust_id, seconds_to_time(seconds), _SIDES_BY_CODE[side_code],
+                  security, price, amount, line_offset)
+
+
+def save_signals(path, signals):
+    """覆盖保存信号列表（先写临时文件再替换）"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for signal in signals:
+            f.write(encode_signal(signal))
+            f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def append_signals(path, signals, hops=None):
+    """追加信号到文件末尾，hops为这批信号共同的环节时间戳"""
+    with open(path, 'a', encoding='utf-8') as f:
+        for signal in signals:
+            f.write(encode_signal(signal, hops))
+            f.write('\n')
+
+
+def load_signals(path, date=None):
+    """
+    加载信号文件
+
+    参数:
+        path: 信号文件路径
+        date: 只加载该日期（datetime.date）的信号，按整数秒范围过滤，None表示全部加载
+
+    返回:
+        按委托编号去重后的信号列表，保持文件中的顺序
+    """
+    if date is not None:
+        day_start = time_to_seconds(datetime.datetime.combine(date, datetime.time()))
+        day_end = day_start + 86400
+
+    signals = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if date is not None and not day_start <= row[1] < day_end:
+                continue
+            signals[row[0]] = _signal_from_row(row)
+    return list(signals.values())
+
+
+class SignalFileTail:
+    """
+    跟踪信号文件新追加的信号
+
+    通过文件大小和修改时间判断文件是否变化，只读取上次位置之后新追加的完整行；
+    文件被截断或替换时从头读取。
+
+    参数:
+        path: 信号文件路径
+        from_end: 为True时忽略已有内容，只返回之后追加的信号
+    """
+    def __init__(self, path=SIGNALS_FILE, from_end=False):
+        self.path = path
+        self._offset = 0
+        self._stat_key = None
+        self._file_id = None
+        if from_end and os.path.exists(path):
+            st = os.stat(path)
+            self._offset = st.st_size
+            self._file_id = st.st_ino
+
+    def changed(self):
+        """检查文件自上次读取后是否有变化"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_size, st.st_mtime_ns) != self._stat_key
+
+    def read_new(self):
+        """返回新追加的信号列表"""
+        return [signal for signal, _ in self.read_new_records()]
+
+    def read_new_records(self):
+        """返回新追加的 [(信号, {环节: 时间戳})]"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        self._stat_key = (st.st_size, st.st_mtime_ns)
+        if st.st_size < self._offset or st.st_ino != self._file_id:
+            self._offset = 0
+            self._file_id = st.st_ino
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # 只处理完整的行，写入中的半行留到下次读取
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        return [decode_record(line) for line in data[:end].decode('utf-8').splitlines() if line.strip()]
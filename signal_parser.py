@@ -0,0 +1,155 @@
+import re
+import datetime
+import logging
+from collections import deque
+
+from signal_model import Signal, SIDE_BUY, SIDE_SELL
+
+logger = logging.getLogger(__name__)
+
+# 日志行格式: "2025-02-27 14:50:00 - INFO  - 订单已委托：StockOrder(entrust_id=... security=002051.XSHE ...)"
+_ORDER_RE = re.compile(
+    r'(?P<kind>订单已委托：|order )StockOrder\(entrust_id=(?P<entrust_id>\d+) '
+    r'security=(?P<security>\d{6})\.\w+ .*?_limit_price=(?P<limit_price>[\d.]+) '
+    r'side=\w+ action=(?P<action>open|close) '
+)
+_ADJUSTED_AMOUNT_RE = re.compile(r'调整为 ?(\d+)')
+_TRADE_RE = re.compile(r'trade price: ?(?P<price>[\d.]+), amount: ?(?P<amount>\d+)')
+
+# 时间戳格式固定为 "YYYY-MM-DD HH:MM:SS"
+TIMESTAMP_LENGTH = 19
+
+
+class TimestampDecoder:
+    """
+    固定格式时间戳解码器
+
+    同一秒内的日志行时间戳相同，解码结果按时间戳字符串缓存，
+    缓存未命中时按固定位置切片转换，不使用strptime。
+    """
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._cache = {}
+
+    def decode(self, stamp):
+        """将 "YYYY-MM-DD HH:MM:SS" 转换为datetime"""
+        value = self._cache.get(stamp)
+        if value is None:
+            if len(stamp) != TIMESTAMP_LENGTH or stamp[4] != '-' or stamp[13] != ':':
+                raise ValueError(f"时间戳格式不正确: {stamp}")
+            value = datetime.datetime(int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10]),
+                                      int(stamp[11:13]), int(stamp[14:16]), int(stamp[17:19]))
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+            self._cache[stamp] = value
+        return value
+
+
+class ParseStats:
+    """解析统计"""
+    def __init__(self):
+        self.lines = 0  # 处理的日志行数
+        self.other_date = 0  # 非目标日期跳过的行数
+        self.candidates = 0  # 订单类日志行数
+        self.signals = 0  # 解析出的交易信号数
+        self.rejected = 0  # 无法解析的订单类日志行数
+        self.reject_samples = deque(maxlen=5)  # 最近被拒绝的日志行
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        self.reject_samples.append((reason, line[:100]))
+
+    def __repr__(self):
+        return (f"ParseStats(lines={self.lines}, other_date={self.other_date}, candidates={self.candidates}, "
+                f"signals={self.signals}, rejected={self.rejected})")
+
+
+class SignalParser:
+    """
+    单遍交易信号解析器
+
+    每行只做一次分类：先按时间戳的日期前缀过滤，再用预编译正则一次性提取
+    委托编号、股票代码、方向、价格和数量。无法解析的订单行计入拒绝统计，不抛出异常。
+    """
+    def __init__(self):
+        self.decoder = TimestampDecoder()
+        self.stats = ParseStats()
+
+    def parse_line(self, line, line_offset=0, date_prefix=None):
+        """
+        解析单行日志
+
+        参数:
+            line: 日志行
+            line_offset: 日志行在整份日志中的行号
+            date_prefix: 只解析该日期的日志（"YYYY-MM-DD"），None表示不过滤
+
+        返回:
+            Signal，不是交易信号时返回None
+        """
+        stats = self.stats
+        stats.lines += 1
+        if date_prefix is not None and not line.startswith(date_prefix):
+            stats.other_date += 1
+            return None
+        if 'StockOrder(' not in line:
+            return None
+
+        match = _ORDER_RE.search(line)
+        if match is None:
+            return None
+        kind = match.group('kind')
+        action = match.group('action')
+
+        # 买入信号取"订单已委托"的开仓日志，卖出信号取带成交价的平仓日志
+        if kind == '订单已委托：' and action == 'open':
+            stats.candidates += 1
+            amount_match = _ADJUSTED_AMOUNT_RE.search(line, match.end())
+            if amount_match is None:
+                stats.reject(line, '缺少委托数量')
+                return None
+            side = SIDE_BUY
+            price = float(match.group('limit_price'))
+            amount = int(amount_match.group(1))
+        elif action == 'close' and kind == 'order ':
+            stats.candidates += 1
+            trade_match = _TRADE_RE.search(line, match.end())
+            if trade_match is None:
+                stats.reject(line, '缺少成交价或数量')
+                return None
+            side = SIDE_SELL
+            price = float(trade_match.group('price'))
+            amount = int(trade_match.group('amount'))
+        else:
+            return None
+
+        try:
+            trade_time = self.decoder.decode(line[:TIMESTAMP_LENGTH])
+        except ValueError:
+            stats.reject(line, '时间戳格式不正确')
+            return None
+
+        stats.signals += 1
+        return Signal(match.group('entrust_id'), trade_time, side, match.group('security'),
+                      price, amount, line_offset)
+
+    def parse_lines(self, lines, start_offset=0, date=None):
+        """
+        解析日志行列表
+
+        参数:
+            lines: 日志行列表
+            start_offset: lines[0]在整份日志中的行号
+            date: 只解析该日期（datetime.date）的日志，None表示不过滤
+
+        返回:
+            Signal列表，按日志顺序排列
+        """
+        date_prefix = date.isoformat() if date is not None else None
+        parse_line = self.parse_line
+        signals = []
+        for i, line in enumerate(lines, start_offset):
+            signal = parse_line(line, i, date_prefix)
+            if signal is not None:
+                signals.append(signal)
+        return signals
@@ -0,0 +1,319 @@
+import time
+import logging
+from typing import NamedTuple
+
+from broker_adapter import BrokerAdapter
+from popup_detector import POPUP_NONE, POPUP_CONFIRM, POPUP_SUCCESS, POPUP_REJECT_OTHER, REJECT_OUTCOMES
+from screen_state import SCREEN_ERROR, SCREEN_UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+# 买入和卖出委托单的Tab顺序相同：证券代码 -> 价格 -> 数量 -> 提交按钮
+FIELD_CODE = 'code'
+FIELD_PRICE = 'price'
+FIELD_AMOUNT = 'amount'
+FIELD_SUBMIT = 'submit'
+TAB_ORDER = (FIELD_CODE, FIELD_PRICE, FIELD_AMOUNT, FIELD_SUBMIT)
+
+SCREEN_KEYS = {'f1': 'buy', 'f2': 'sell'}
+
+POPUP_ERROR = POPUP_REJECT_OTHER  # 委托单填写不完整的提示弹窗
+
+
+class SimulatedLatencies:
+    """
+    模拟下单界面各操作的响应时间（秒）
+
+    参数:
+        activate: 激活交易窗口
+        open_window: 打开交易窗口
+        screen_switch: F1/F2切换委托单，切换完成前的按键会丢失
+        quote_load: 输入证券代码后加载行情，加载完成时价格框被行情价覆盖
+        submit_popup: 按下提交键到确认弹窗出现，期间的按键会丢失
+        popup_close: 弹窗关闭后委托单恢复可用
+        keystroke: 每次按键（输入文字时每个字符）
+    """
+    def __init__(self, activate=0.05, open_window=2.0, screen_switch=0.15, quote_load=0.3,
+                 submit_popup=0.2, popup_close=0.05, keystroke=0.005):
+        self.activate = activate
+        self.open_window = open_window
+        self.screen_switch = screen_switch
+        self.quote_load = quote_load
+        self.submit_popup = submit_popup
+        self.popup_close = popup_close
+        self.keystroke = keystroke
+
+    def scaled(self, factor):
+        """返回所有响应时间乘以factor后的副本，用于模拟较慢或较快的机器"""
+        return SimulatedLatencies(**{name: value * factor for name, value in vars(self).items()})
+
+
+class SimulatedOrder(NamedTuple):
+    """模拟券商接受的委托"""
+    side: str
+    security: str
+    price: float
+    amount: int
+    submitted_at: float
+    confirmed_at: float
+
+
+class SimulatedTHSBroker(BrokerAdapter):
+    """
+    内存中的同花顺下单界面模拟
+
+    模拟F1/F2买入/卖出委托单、窗口前台状态、输入焦点和Tab顺序、证券代码输入后的
+    行情加载，以及提交后的确认弹窗和券商返回的成功/拒绝弹窗。各操作的响应时间可配置；
+    界面未就绪时的按键会被丢弃（记入dropped_keys），与真实界面上等待不足时的表现一致。
+
+    默认使用虚拟时钟：sleep和每次按键只推进时钟，不真正等待，因此可以在任何
+    机器上快速运行大量订单。虚拟时钟从创建时的time.time()开始，与延迟记录器的
+    时间戳兼容。
+
+    参数:
+        latencies: SimulatedLatencies，None表示使用默认值
+        window_open: 交易窗口初始是否已打开
+        quotes: {证券代码: 行情价}，未列出的代码使用default_quote
+        rejects: {证券代码: 拒绝弹窗}，确认后券商拒绝这些代码的委托（如POPUP_REJECT_FUNDS）
+        success_popup: 为True时委托被接受后显示成功弹窗，需要再按回车关闭
+        realtime: 为True时真正等待，使用真实时钟
+    """
+    def __init__(self, latencies=None, window_open=True, quotes=None, default_quote=10.0, rejects=None,
+                 success_popup=False, realtime=False):
+        self.latencies = latencies or SimulatedLatencies()
+        self.window_open = window_open
+        self.quotes = quotes or {}
+        self.default_quote = default_quote
+        self.rejects = rejects or {}
+        self.success_popup = success_popup
+        self.realtime = realtime
+        self._clock = time.time()
+
+        self.foreground = False
+        self.screen = None  # 已就绪的委托单：'buy'、'sell' 或 None
+        self._switching_to = None
+        self._screen_ready_at = 0.0
+        self.focus = 0
+        self.fields = {}
+        self._selected = False
+        self._quote_ready_at = None
+        self.popup = None
+        self._popup_at = None
+        self._ready_at = 0.0  # 弹窗关闭后委托单恢复可用的时间
+        self._pending_order = None
+
+        self.orders = []  # 已确认的委托
+        self.rejected = 0  # 因填写不完整或券商拒绝而未成交的提交次数
+        self.dropped_keys = 0  # 界面未就绪或窗口不在前台时丢失的按键数
+        self.keystrokes = 0
+        self._clear_fields()
+
+    # ---- 时钟 ----
+
+    def now(self):
+        return time.time() if self.realtime else self._clock
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        if self.realtime:
+            time.sleep(seconds)
+        else:
+            self._clock += seconds
+
+    # ---- 窗口 ----
+
+    def is_trading_window_open(self):
+        return self.window_open
+
+    def open_trading_window(self):
+        self.sleep(self.latencies.open_window)
+        self.window_open = True
+        return True
+
+    def activate_trading_window(self):
+        self.sleep(self.latencies.activate)
+        if not self.window_open:
+            return False
+        self.foreground = True
+        return True
+
+    # ---- 界面探测 ----
+
+    def is_trading_window_foreground(self):
+        return self.window_open and self.foreground
+
+    def is_ticket_ready(self, mode):
+        self._update()
+        return self.screen == mode and self._switching_to is None
+
+    def is_input_ready(self):
+        self._update()
+        return self.popup is None and self._pending_order is None and self._switching_to is None \
+            and self.now() >= self._ready_at
+
+    def is_quote_loaded(self, code):
+        self._update()
+        return self._quote_loaded and self.fields[FIELD_CODE] == code
+
+    def is_popup_present(self):
+        self._update()
+        return self.popup is not None
+
+    def read_popup(self):
+        self._update()
+        return self.popup or POPUP_NONE
+
+    def read_screen_state(self):
+        self._update()
+        if self.popup in REJECT_OUTCOMES:
+            return SCREEN_ERROR
+        if self._switching_to is not None or self.screen is None:
+            return SCREEN_UNKNOWN
+        return self.screen
+
+    # ---- 按键 ----
+
+    def press(self, key):
+        self._keystroke()
+        key = key.lower()
+        if not self._accepts_input():
+            return
+
+        if self.popup is not None:
+            if key in ('enter', 'esc'):
+                self._close_popup(confirm=(key == 'enter'))
+            else:
+                self.dropped_keys += 1
+            return
+
+        if key in SCREEN_KEYS:
+            self._switch_screen(SCREEN_KEYS[key])
+            return
+        if self.screen is None:
+            self.dropped_keys += 1
+            return
+
+        field = TAB_ORDER[self.focus]
+        if key == 'tab':
+            self._move_focus()
+        elif key in ('delete', 'backspace'):
+            if field != FIELD_SUBMIT:
+                if self._selected or key == 'delete':
+                    self.fields[field] = ''
+                else:
+                    self.fields[field] = self.fields[field][:-1]
+                self._on_field_changed(field)
+        elif key == 'enter':
+            if field == FIELD_SUBMIT:
+                self._submit()
+            else:
+                self._move_focus()
+        self._selected = False
+
+    def hotkey(self, *keys):
+        self._keystroke()
+        if not self._accepts_input() or self.popup is not None or self.screen is None:
+            return
+        if tuple(k.lower() for k in keys) == ('ctrl', 'a'):
+            self._selected = TAB_ORDER[self.focus] != FIELD_SUBMIT
+
+    def typewrite(self, text, interval=0.0):
+        for char in text:
+            self.sleep(interval)
+            self._keystroke()
+            if not self._accepts_input() or self.popup is not None or self.screen is None:
+                continue
+            field = TAB_ORDER[self.focus]
+            if field == FIELD_SUBMIT:
+                self.dropped_keys += 1
+                continue
+            if self._selected:
+                self.fields[field] = ''
+                self._selected = False
+            self.fields[field] += char
+            self._on_field_changed(field)
+
+    # ---- 界面状态 ----
+
+    def _keystroke(self):
+        self.keystrokes += 1
+        self.sleep(self.latencies.keystroke)
+        self._update()
+
+    def _accepts_input(self):
+        """窗口在前台、没有正在切换的委托单、没有等待中的弹窗时才接受按键"""
+        waiting_popup = self._pending_order is not None and self.popup is None
+        if not (self.window_open and self.foreground) or self._switching_to is not None \
+                or waiting_popup or self.now() < self._ready_at:
+            self.dropped_keys += 1
+            return False
+        return True
+
+    def _update(self):
+        """处理已到时间的界面事件"""
+        now = self.now()
+        if self._switching_to is not None and now >= self._screen_ready_at:
+            self.screen = self._switching_to
+            self._switching_to = None
+        if self._quote_ready_at is not None and now >= self._quote_ready_at:
+            self._quote_ready_at = None
+            code = self.fields[FIELD_CODE]
+            self.fields[FIELD_PRICE] = f"{self.quotes.get(code, self.default_quote):.2f}"
+            self._quote_loaded = True
+        if self._pending_order is not None and now >= self._popup_at:
+            self.popup = POPUP_CONFIRM
+
+    def _switch_screen(self, screen):
+        self._switching_to = screen
+        self._screen_ready_at = self.now() + self.latencies.screen_switch
+        self._clear_fields()
+
+    def _clear_fields(self):
+        self.fields = {FIELD_CODE: '', FIELD_PRICE: '', FIELD_AMOUNT: ''}
+        self.focus = 0
+        self._selected = False
+        self._quote_ready_at = None
+        self._quote_loaded = False
+
+    def _move_focus(self):
+        self.focus = (self.focus + 1) % len(TAB_ORDER)
+
+    def _on_field_changed(self, field):
+        if field != FIELD_CODE:
+            return
+        self._quote_loaded = False
+        self._quote_ready_at = None
+        if len(self.fields[FIELD_CODE]) == 6 and self.fields[FIELD_CODE].isdigit():
+            self._quote_ready_at = self.now() + self.latencies.quote_load
+
+    def _submit(self):
+        try:
+            price = float(self.fields[FIELD_PRICE])
+            amount = int(self.fields[FIELD_AMOUNT])
+        except ValueError:
+            price, amount = 0.0, 0
+        if not self._quote_loaded or price <= 0 or amount <= 0:
+            self.rejected += 1
+            self.popup = POPUP_ERROR
+            return
+        self._pending_order = (self.screen, self.fields[FIELD_CODE], price, amount, self.now())
+        self._popup_at = self.now() + self.latencies.submit_popup
+
+    def _close_popup(self, confirm):
+        if self.popup == POPUP_CONFIRM:
+            side, security, price, amount, submitted_at = self._pending_order
+            self._pending_order = None
+            self._clear_fields()
+            if confirm:
+                # 券商的处理结果以新的弹窗显示，关闭后委托单才恢复可用
+                if security in self.rejects:
+                    self.rejected += 1
+                    self.popup = self.rejects[security]
+                    return
+                self.orders.append(SimulatedOrder(side, security, price, amount, submitted_at, self.now()))
+                if self.success_popup:
+                    self.popup = POPUP_SUCCESS
+                    return
+        self.popup = None
+        self._ready_at = self.now() + self.latencies.popup_close
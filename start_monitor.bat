@@ -1,5 +1,8 @@
 @echo off
 
+:: Re-invoked by the start commands below to run a resident script in a restart loop
+if "%~1"==":restart" goto restart
+
 :: Set console code page to UTF-8
 chcp 65001
 
@@ -18,20 +21,23 @@ start "THS Client Monitor" /min cmd /k ""%~dp0venv\Scripts\python.exe" "%~dp0ope
 :: Wait for 2 seconds
 timeout /t 2 /nobreak
 
-:: Start JoinQuant data monitor
-start "JoinQuant Data Monitor" /min cmd /k ""%~dp0venv\Scripts\python.exe" "%~dp0get_jq_data.py""
-
-:: Wait for 2 seconds
-timeout /t 2 /nobreak
-
-:: Start trade signal extraction monitor with auto-restart
-start "Trade Signal Monitor" /min cmd /k "@echo off & :loop & "%~dp0venv\Scripts\python.exe" "%~dp0extract_trade_signals.py" & timeout /t 5 /nobreak & goto loop"
+:: Start JoinQuant data fetch and signal extraction (resident, headless) with auto-restart
+start "JoinQuant Data Monitor" /min cmd /k ""%~f0" :restart main_controller.py --headless"
 
 :: Wait for 2 seconds
 timeout /t 2 /nobreak
 
-:: Start trade execution monitor with auto-restart
-start "Trade Execution Monitor" /min cmd /k "@echo off & :loop & "%~dp0venv\Scripts\python.exe" "%~dp0trade_executor.py" & timeout /t 5 /nobreak & goto loop"
+:: Start resident trade executor, driven by changes to data\trade_signals.jsonl, with auto-restart
+start "Trade Execution Monitor" /min cmd /k ""%~f0" :restart trade_executor.py --watch"
 
 :: Keep window open
-pause
\ No newline at end of file
+pause
+goto :eof
+
+:restart
+:: Run the script given as %2 with argument %3, restarting it 5 seconds after it exits
+:loop
+"%~dp0venv\Scripts\python.exe" "%~dp0%~2" %3
+echo %~2 exited, restarting in 5 seconds...
+timeout /t 5 /nobreak
+goto loop
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 每次启动的分阶段耗时追加保存的位置
+STARTUP_REPORT_FILE = os.path.join('logs', 'startup_report.jsonl')
+
+# 就绪探测的轮询间隔（秒）
+PROBE_INTERVAL = 0.25
+
+
+def wait_for(condition, timeout, poll_interval=PROBE_INTERVAL):
+    """
+    轮询探测条件直到满足或超时，代替启动过程中的固定等待
+
+    参数:
+        condition: 探测函数，返回真值表示就绪；抛出异常视为未就绪
+        timeout: 最长等待时间（秒）
+    返回:
+        条件的返回值，超时返回None
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = condition()
+        except Exception as e:
+            logger.debug(f"就绪探测出错: {e}")
+            result = None
+        if result:
+            return result
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll_interval)
+
+
+class StartupReport:
+    """
+    启动过程的分阶段计时
+
+    记录每个阶段的开始时间（相对启动开始）、耗时和是否成功。阶段可以在不同线程中
+    并行进行，如同花顺客户端启动的同时获取日志和解密凭据。
+    """
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.started_wall = datetime.datetime.now()
+        self.phases = []  # [(阶段, 开始秒数, 耗时秒数, 是否成功)]
+        self._lock = threading.Lock()
+        self._threads = []
+
+    @contextmanager
+    def phase(self, name):
+        """
+        计时一个阶段；with块内抛出异常时记为失败
+
+        用法: with report.phase('main_window') as status: ...，探测超时等情况把status['ok']设为False。
+        """
+        start = time.monotonic()
+        status = {'ok': True}
+        try:
+            yield status
+        except Exception:
+            status['ok'] = False
+            raise
+        finally:
+            self._record(name, start, time.monotonic() - start, status['ok'])
+
+    def _record(self, name, start, duration, ok):
+        with self._lock:
+            self.phases.append((name, start - self.started_at, duration, ok))
+        logger.info(f"启动阶段 {name}: {'完成' if ok else '失败'}，用时{duration:.2f}秒")
+
+    def run_in_background(self, name, func):
+        """在后台线程中运行一个阶段，func返回假值记为失败"""
+        def run():
+            try:
+                with self.phase(name) as status:
+                    status['ok'] = bool(func())
+            except Exception as e:
+                logger.error(f"启动阶段 {name} 出错: {e}")
+
+        thread = threading.Thread(target=run, name=f"Startup_{name}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def join(self, timeout=None):
+        """等待后台阶段完成，返回是否全部完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def summary(self):
+        """返回总耗时和各阶段的开始时间、耗时"""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+        return {
+            'time': self.started_wall.isoformat(timespec='seconds'),
+            'total_s': round(time.monotonic() - self.started_at, 3),
+            'phases': [{'name': name, 'start_s': round(start, 3), 'duration_s': round(duration, 3), 'ok': ok}
+                       for name, start, duration, ok in phases]
+        }
+
+    def log(self):
+        """记录启动耗时报告"""
+        summary = self.summary()
+        logger.info(f"启动总用时{summary['total_s']:.2f}秒: " + ", ".join(
+            f"{p['name']}={p['duration_s']:.2f}秒(+{p['start_s']:.2f}){'' if p['ok'] else '失败'}"
+            for p in summary['phases']))
+        return summary
+
+    def save(self, path=STARTUP_REPORT_FILE):
+        """将启动耗时报告追加到文件"""
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.summary(), ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.error(f"保存启动耗时报告失败: {e}")
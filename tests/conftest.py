@@ -0,0 +1,21 @@
+import os
+import sys
+import shutil
+import tempfile
+
+# 各模块位于仓库根目录，测试直接按模块名导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging_setup
+
+_log_dir = tempfile.mkdtemp(prefix='test-logs-')
+
+
+def pytest_configure(config):
+    # 被测模块在导入时配置日志，先把日志配置到临时目录，测试不在仓库的logs目录中写文件
+    logging_setup.setup_logging(log_dir=_log_dir, console=False, rotate=False, process='')
+
+
+def pytest_unconfigure(config):
+    logging_setup.shutdown_logging()
+    shutil.rmtree(_log_dir, ignore_errors=True)
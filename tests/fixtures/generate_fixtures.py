@@ -0,0 +1,137 @@
+"""
+生成测试用的合成界面图片
+
+tests/fixtures 中的png由本脚本生成并提交到仓库，测试不依赖桌面环境。修改图案后重新运行:
+    python tests/fixtures/generate_fixtures.py
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(FIXTURE_DIR)))
+
+from popup_detector import write_image, POPUP_CONFIRM, POPUP_SUCCESS, POPUP_REJECT_FUNDS, POPUP_REJECT_OTHER
+from screen_state import SCREEN_BUY, SCREEN_SELL, SCREEN_LOGIN, SCREEN_LOCKED, SCREEN_ERROR
+
+POPUP_DIR = os.path.join(FIXTURE_DIR, 'popups')
+SCREEN_DIR = os.path.join(FIXTURE_DIR, 'screens')
+
+# 弹窗截图区域的大小（交易窗口中部，见popup_detector.POPUP_REGION）
+POPUP_SHOT_SIZE = (360, 560)
+# 每种弹窗的图标和标题文字
+POPUP_STYLES = {
+    POPUP_CONFIRM: ('?', 'Confirm order'),
+    POPUP_SUCCESS: ('v', 'Order submitted'),
+    POPUP_REJECT_FUNDS: ('!', 'Insufficient funds'),
+    POPUP_REJECT_OTHER: ('x', 'Invalid order'),
+}
+
+
+def ticket_background(size):
+    """委托单背景：浅灰底色和若干输入框"""
+    height, width = size
+    image = np.full((height, width), 236, np.uint8)
+    for i, y in enumerate(range(30, height - 30, 48)):
+        cv2.rectangle(image, (40, y), (width - 40, y + 28), 255, -1)
+        cv2.rectangle(image, (40, y), (width - 40, y + 28), 160, 1)
+        cv2.putText(image, f'field {i}', (50, y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 90, 1, cv2.LINE_AA)
+    return image
+
+
+def popup_dialog(outcome):
+    """一种弹窗的对话框：标题栏、图标和提示文字"""
+    icon, text = POPUP_STYLES[outcome]
+    dialog = np.full((150, 320), 250, np.uint8)
+    cv2.rectangle(dialog, (0, 0), (319, 149), 60, 2)
+    cv2.rectangle(dialog, (0, 0), (319, 24), 120, -1)
+    cv2.circle(dialog, (40, 75), 20, 40, 2)
+    cv2.putText(dialog, icon, (31, 85), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 40, 2, cv2.LINE_AA)
+    cv2.putText(dialog, text, (75, 84), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 20, 2, cv2.LINE_AA)
+    cv2.rectangle(dialog, (120, 110), (200, 138), 200, -1)
+    cv2.putText(dialog, 'OK', (145, 130), cv2.FONT_HERSHEY_SIMPLEX, 0.55, 30, 1, cv2.LINE_AA)
+    return dialog
+
+
+def popup_screenshot(outcome, offset):
+    """弹窗区域截图：委托单背景上叠加对话框，outcome为None时没有弹窗"""
+    image = ticket_background(POPUP_SHOT_SIZE)
+    if outcome is not None:
+        dialog = popup_dialog(outcome)
+        y, x = offset
+        image[y:y + dialog.shape[0], x:x + dialog.shape[1]] = dialog
+    return image
+
+
+def generate_popups():
+    for i, outcome in enumerate(POPUP_STYLES):
+        # 模板只保留图标和提示文字，截图中对话框的位置各不相同
+        write_image(os.path.join(POPUP_DIR, 'templates', outcome, f'{outcome}.png'),
+                    popup_dialog(outcome)[44:104, 10:310])
+        write_image(os.path.join(POPUP_DIR, 'screenshots', f'{outcome}.png'),
+                    popup_screenshot(outcome, (80 + 10 * i, 100 + 20 * i)))
+    write_image(os.path.join(POPUP_DIR, 'screenshots', 'none.png'), popup_screenshot(None, None))
+
+
+# 委托单标题区域的大小（见screen_state.TICKET_REGION）
+TICKET_SHOT_SIZE = (84, 400)
+
+
+def ticket_title(state, shift=0, brightness=0, text=''):
+    """
+    一种界面状态的委托单标题区域
+
+    参数:
+        shift: 整体向右平移的像素数（窗口位置略有不同）
+        brightness: 整体亮度变化
+        text: 输入框中的文字（同一状态下内容不同）
+    """
+    height, width = TICKET_SHOT_SIZE
+    image = np.full((height, width), 225, np.uint8)
+    if state == SCREEN_BUY:
+        cv2.rectangle(image, (0, 0), (width // 2, 30), 70, -1)
+        cv2.putText(image, 'BUY', (20, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 250, 2, cv2.LINE_AA)
+        cv2.rectangle(image, (20, 44), (200, 72), 255, -1)
+    elif state == SCREEN_SELL:
+        cv2.rectangle(image, (width // 2, 0), (width - 1, 30), 70, -1)
+        cv2.putText(image, 'SELL', (width // 2 + 20, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 250, 2, cv2.LINE_AA)
+        cv2.rectangle(image, (width - 200, 44), (width - 20, 72), 255, -1)
+    elif state == SCREEN_LOGIN:
+        image[:] = 245
+        cv2.rectangle(image, (120, 8), (280, 34), 140, 2)
+        cv2.rectangle(image, (120, 46), (280, 72), 140, 2)
+    elif state == SCREEN_LOCKED:
+        image[:] = 60
+        cv2.rectangle(image, (140, 20), (260, 64), 200, -1)
+    elif state == SCREEN_ERROR:
+        image[:] = 250
+        cv2.rectangle(image, (0, 0), (width - 1, height - 1), 40, 6)
+        cv2.circle(image, (60, 42), 24, 30, -1)
+    if text:
+        y = 64 if state in (SCREEN_BUY, SCREEN_SELL) else height - 6
+        x = 26 if state != SCREEN_SELL else width - 194
+        cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 30, 1, cv2.LINE_AA)
+    image = np.clip(image.astype(np.int16) + brightness, 0, 255).astype(np.uint8)
+    return np.roll(image, shift, axis=1)
+
+
+def generate_screens():
+    states = (SCREEN_BUY, SCREEN_SELL, SCREEN_LOGIN, SCREEN_LOCKED, SCREEN_ERROR)
+    for state in states:
+        # 每种状态两张参考画面，另有一张不在参考画面中的截图
+        write_image(os.path.join(SCREEN_DIR, 'frames', state, '1.png'), ticket_title(state))
+        write_image(os.path.join(SCREEN_DIR, 'frames', state, '2.png'), ticket_title(state, shift=2, brightness=-8))
+        write_image(os.path.join(SCREEN_DIR, 'captures', f'{state}.png'),
+                    ticket_title(state, shift=1, brightness=10, text='600000'))
+    # 不属于任何状态的画面（如被其他窗口遮住）
+    gradient = np.tile(np.linspace(0, 255, TICKET_SHOT_SIZE[1]), (TICKET_SHOT_SIZE[0], 1)).astype(np.uint8)
+    stripes = np.indices(TICKET_SHOT_SIZE)[0] % 20 < 10
+    write_image(os.path.join(SCREEN_DIR, 'captures', 'unknown.png'),
+                np.where(stripes, gradient, 255 - gradient).astype(np.uint8))
+
+
+if __name__ == '__main__':
+    generate_popups()
+    generate_screens()
@@ -0,0 +1,98 @@
+import json
+import time
+
+import pytest
+
+from execution_ledger import (ExecutionLedger, STATE_PENDING, STATE_TYPED, STATE_SUBMITTED,
+                              STATE_CONFIRMED, STATE_FAILED, STATE_EXPIRED, STATE_REJECTED)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'execution_ledger.jsonl')
+
+
+def write_records(path, *records, tail=''):
+    with open(path, 'w', encoding='utf-8') as f:
+        for key, state in records:
+            f.write(json.dumps({'k': key, 's': state, 't': 0}) + '\n')
+        f.write(tail)
+
+
+@pytest.mark.parametrize('state', [STATE_SUBMITTED, STATE_CONFIRMED, STATE_EXPIRED, STATE_REJECTED])
+def test_resume_skips_closed_orders(path, state):
+    write_records(path, ('1', STATE_PENDING), ('1', STATE_TYPED), ('1', state))
+    ledger = ExecutionLedger(path)
+    assert ledger.state('1') == state
+    assert not ledger.should_execute('1')
+    ledger.close()
+
+
+@pytest.mark.parametrize('state', [STATE_PENDING, STATE_TYPED, STATE_FAILED])
+def test_resume_retries_unsubmitted_orders(path, state):
+    write_records(path, ('1', STATE_PENDING), ('1', state))
+    ledger = ExecutionLedger(path)
+    assert ledger.should_execute('1')
+    assert not ledger.is_done('1')
+    ledger.close()
+
+
+def test_submitted_orders_are_done(path):
+    write_records(path, ('1', STATE_SUBMITTED), ('2', STATE_CONFIRMED), ('3', STATE_EXPIRED))
+    ledger = ExecutionLedger(path)
+    assert ledger.is_done('1') and ledger.is_done('2')
+    assert not ledger.is_done('3')
+    ledger.close()
+
+
+def test_torn_trailing_record_is_ignored(path):
+    write_records(path, ('1', STATE_PENDING), ('2', STATE_TYPED), tail='{"k": "1", "s": "subm')
+    ledger = ExecutionLedger(path)
+    # 半行记录不生效，订单1仍会重新执行
+    assert ledger.state('1') == STATE_PENDING
+    assert ledger.should_execute('1')
+
+    # 新记录从新的一行开始，重新打开后可以正常读取
+    ledger.mark('1', STATE_SUBMITTED)
+    ledger.close()
+    reopened = ExecutionLedger(path)
+    assert reopened.state('1') == STATE_SUBMITTED
+    assert reopened.state('2') == STATE_TYPED
+    reopened.close()
+
+
+def test_partial_line_from_another_writer_is_read_when_complete(path):
+    ledger = ExecutionLedger(path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"k": "1", "s": "submitted"')
+        f.flush()
+        assert ledger.should_execute('1')
+        f.write(', "t": 0}\n')
+    assert not ledger.should_execute('1')
+    ledger.close()
+
+
+def test_last_record_is_synced_without_further_writes(path, monkeypatch):
+    synced = []
+    monkeypatch.setattr('execution_ledger.os.fsync', lambda fd: synced.append(fd))
+    ledger = ExecutionLedger(path, sync_interval=0.2)
+    ledger.mark('1', STATE_PENDING)
+    ledger.mark('1', STATE_EXPIRED)
+    assert not synced
+
+    deadline = time.monotonic() + 2
+    while not synced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert synced
+    ledger.close()
+
+
+def test_submitted_is_synced_immediately(path, monkeypatch):
+    synced = []
+    monkeypatch.setattr('execution_ledger.os.fsync', lambda fd: synced.append(fd))
+    ledger = ExecutionLedger(path, sync_interval=60)
+    ledger.mark('1', STATE_PENDING)
+    assert not synced
+    ledger.mark('1', STATE_SUBMITTED)
+    assert len(synced) == 1
+    ledger.close()
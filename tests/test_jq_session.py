@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+
+pytest.importorskip('cryptography')
+
+import jq_session
+from jq_session import JQSession, RETRY_INTERVAL, MAX_RETRY_INTERVAL
+
+DAY = datetime.date(2025, 2, 27)
+
+
+def at(hour, minute):
+    return datetime.datetime.combine(DAY, datetime.time(hour, minute))
+
+
+def session_cookies(expiry):
+    return {'token': 'abc', '_xsrf': f'2|ffc493a1|18404ccad881b1822f58a5db6c063ba1|{int(expiry.timestamp())}'}
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(at(9, 0))
+
+
+@pytest.fixture
+def make_session(tmp_path, clock):
+    def make(login_func=lambda: None):
+        return JQSession(path=str(tmp_path / 'cookies.txt'), login_func=login_func, clock=clock)
+    return make
+
+
+def test_expiring_session_refreshed_before_open(make_session):
+    session = make_session()
+    # 收盘后一小时过期，开盘前应提前登录
+    cookies = session_cookies(at(16, 0))
+    assert session._due_for_refresh(cookies, at(16, 0))
+
+
+@pytest.mark.parametrize('now', [at(9, 30), at(11, 0), at(14, 59)])
+def test_no_login_in_session_while_session_lasts_until_close(make_session, clock, now):
+    clock.now = now
+    session = make_session()
+    assert not session._due_for_refresh(session_cookies(at(16, 0)), at(16, 0))
+
+
+def test_login_in_session_when_session_expires_before_close(make_session, clock):
+    clock.now = at(10, 0)
+    session = make_session()
+    assert session._due_for_refresh(session_cookies(at(14, 0)), at(14, 0))
+    assert session._due_for_refresh(None, None)
+
+
+def test_after_close_uses_refresh_margin(make_session, clock):
+    clock.now = at(15, 30)
+    session = make_session()
+    assert session._due_for_refresh(session_cookies(at(16, 0)), at(16, 0))
+
+
+def test_failed_logins_back_off(make_session, monkeypatch):
+    monotonic = [1000.0]
+    monkeypatch.setattr(jq_session.time, 'monotonic', lambda: monotonic[0])
+    session = make_session()
+    intervals = []
+    for _ in range(6):
+        assert not session.refresh(force=True)
+        intervals.append(session._next_retry - monotonic[0])
+    assert intervals == [RETRY_INTERVAL, 2 * RETRY_INTERVAL, 4 * RETRY_INTERVAL, 8 * RETRY_INTERVAL,
+                         MAX_RETRY_INTERVAL, MAX_RETRY_INTERVAL]
+    assert session.failures == 6
+
+
+def test_successful_login_resets_backoff(make_session, monkeypatch):
+    monotonic = [1000.0]
+    monkeypatch.setattr(jq_session.time, 'monotonic', lambda: monotonic[0])
+    results = [None, None, session_cookies(at(9, 0) + datetime.timedelta(days=30)), None]
+    session = make_session(lambda: results.pop(0))
+    session.refresh(force=True)
+    session.refresh(force=True)
+    assert session.refresh(force=True)
+    assert session._next_retry - monotonic[0] == RETRY_INTERVAL
+    session.refresh(force=True)
+    assert session._next_retry - monotonic[0] == RETRY_INTERVAL
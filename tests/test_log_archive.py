@@ -0,0 +1,143 @@
+import os
+import gzip
+import logging
+from logging.handlers import TimedRotatingFileHandler
+
+import pytest
+
+import log_archive
+from log_archive import LogCompressor, search, pending_segments
+
+
+def write_lines(path, *lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+
+@pytest.fixture
+def compressor(tmp_path):
+    return LogCompressor(str(tmp_path))
+
+
+def test_rotate_renames_and_submits(tmp_path, compressor):
+    source = str(tmp_path / 'trade_executor.log')
+    dest = source + '.2026-10-16'
+    write_lines(source, '2026-10-16 09:30:00,000 - INFO - 买入 002051')
+    compressor.rotate(source, dest)
+    assert not os.path.exists(source)
+    assert os.path.exists(dest)
+    assert compressor._queue.get_nowait() == dest
+
+
+def test_rotate_copies_when_rename_fails(tmp_path, compressor, monkeypatch):
+    source = str(tmp_path / 'trade_executor.log')
+    dest = source + '.2026-10-16'
+    write_lines(source, '2026-10-16 09:30:00,000 - INFO - 买入 002051')
+
+    def locked(src, dst):
+        raise PermissionError(32, '另一个程序正在使用此文件')
+    monkeypatch.setattr(log_archive.os, 'rename', locked)
+
+    compressor.rotate(source, dest)
+    assert os.path.getsize(source) == 0
+    with open(dest, encoding='utf-8') as f:
+        assert '002051' in f.read()
+    assert compressor._queue.get_nowait() == dest
+    assert compressor.rotate_failures == 0
+
+
+def test_rotate_keeps_source_when_copy_fails(tmp_path, compressor, monkeypatch):
+    source = str(tmp_path / 'trade_executor.log')
+    dest = source + '.2026-10-16'
+    write_lines(source, '2026-10-16 09:30:00,000 - INFO - 买入 002051')
+
+    def fail(*args):
+        raise PermissionError(32, '另一个程序正在使用此文件')
+    monkeypatch.setattr(log_archive.os, 'rename', fail)
+    monkeypatch.setattr(log_archive.shutil, 'copyfile', fail)
+
+    compressor.rotate(source, dest)
+    assert os.path.getsize(source) > 0
+    assert not os.path.exists(dest)
+    assert compressor._queue.empty()
+    assert compressor.rotate_failures == 1
+
+
+def test_failed_rollover_keeps_handler_writing(tmp_path, compressor, monkeypatch):
+    path = str(tmp_path / 'trade_executor.log')
+    handler = TimedRotatingFileHandler(path, when='midnight', encoding='utf-8')
+    handler.rotator = compressor.rotate
+    handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def fail(*args):
+        raise PermissionError(32, '另一个程序正在使用此文件')
+    monkeypatch.setattr(log_archive.os, 'rename', fail)
+    monkeypatch.setattr(log_archive.shutil, 'copyfile', fail)
+
+    record = logging.LogRecord('trade_executor', logging.INFO, __file__, 1, '轮转之前', None, None)
+    handler.emit(record)
+    handler.rolloverAt = 0  # 下一条记录触发轮转
+    record.msg = '轮转之后'
+    handler.emit(record)
+    record.msg = '再下一条'
+    handler.emit(record)
+    handler.close()
+
+    with open(path, encoding='utf-8') as f:
+        assert f.read().splitlines() == ['轮转之前', '轮转之后', '再下一条']
+    assert handler.rolloverAt > 0
+    assert compressor.rotate_failures == 1
+
+
+def test_search_merges_process_directories(tmp_path):
+    log_dir = str(tmp_path)
+    write_lines(os.path.join(log_dir, 'main_controller', 'trade_executor.log'),
+                '2026-10-16 09:30:00,100 - INFO - 风险检查通过 002051')
+    write_lines(os.path.join(log_dir, 'trade_executor', 'trade_executor.log'),
+                '2026-10-16 09:30:01,200 - INFO - 买入 002051 委托已提交')
+    segment = os.path.join(log_dir, 'trade_executor', 'trade_executor.log.2026-10-15')
+    write_lines(segment, '2026-10-15 14:00:00,000 - INFO - 卖出 002051')
+    assert pending_segments(os.path.join(log_dir, 'trade_executor')) == [segment]
+    assert pending_segments(log_dir) == []
+    log_archive.compress_segment(segment)
+
+    results, opened, _ = search(log_dir, term='002051')
+    assert [name for name, _ in results] == ['trade_executor/trade_executor.log.2026-10-15.gz',
+                                             'main_controller/trade_executor.log',
+                                             'trade_executor/trade_executor.log']
+    assert opened == 3
+
+    results, _, _ = search(log_dir, term='002051', process='trade_executor', date='2026-10-16')
+    assert [name for name, _ in results] == ['trade_executor/trade_executor.log']
+    with gzip.open(segment + '.gz', 'rt', encoding='utf-8') as f:
+        assert '卖出' in f.read()
+
+
+def test_search_includes_legacy_top_level_logs(tmp_path):
+    # 按进程分子目录之前写在日志目录顶层的日志仍然可以查询
+    log_dir = str(tmp_path)
+    write_lines(os.path.join(log_dir, 'trade_executor.log'), '2025-02-27 09:26:01,123 - INFO - 输入股票代码: 002051')
+    write_lines(os.path.join(log_dir, 'trade_executor', 'trade_executor.log'),
+                '2026-10-16 09:30:01,200 - INFO - 买入 002051 委托已提交')
+
+    results, _, _ = search(log_dir, term='002051')
+    assert [name for name, _ in results] == ['trade_executor.log', 'trade_executor/trade_executor.log']
+    results, _, _ = search(log_dir, term='002051', date='2025-02-27')
+    assert [name for name, _ in results] == ['trade_executor.log']
+
+
+@pytest.mark.parametrize('argv0, expected', [
+    ('main_controller.py', 'main_controller'),
+    (os.path.join('D:', 'ths', 'trade_executor.py'), 'trade_executor'),
+    (os.path.join('venv', 'bin', 'pytest'), 'other'),
+    (os.path.join('pytest', '__main__.py'), 'other'),
+    ('scratch.py', 'other'),
+    ('-c', 'other'),
+    ('', 'other'),
+])
+def test_process_name_only_for_entry_points(monkeypatch, argv0, expected):
+    import logging_setup
+    monkeypatch.setattr('sys.argv', [argv0])
+    assert logging_setup.process_name() == expected
@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+import get_jq_data
+from get_jq_data import LogFetchCursor, sync_log_data, OFFSET_START, OFFSET_END
+from extract_trade_signals import IncrementalSignalExtractor
+
+
+class FakeLogServer:
+    """按offset返回日志行的聚宽日志接口（offset超出日志长度时按日志末尾返回），end_offset为True时data.offset报告结束位置"""
+    def __init__(self, lines, end_offset=False):
+        self.lines = list(lines)
+        self.end_offset = end_offset
+        self.requests = []
+
+    def __call__(self, cookies, headers, offset):
+        self.requests.append(offset)
+        start = 0 if offset == -1 else min(offset, len(self.lines))
+        batch = self.lines[start:]
+        reported = start + len(batch) if self.end_offset else start
+        return {'data': {'offset': reported, 'state': 'running', 'logArr': batch}}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    monkeypatch.setattr(get_jq_data, '_local_log_data', None)
+    monkeypatch.setattr(get_jq_data, '_fetch_cursor', None)
+    return tmp_path
+
+
+def serve(monkeypatch, server):
+    monkeypatch.setattr(get_jq_data, 'request_log_data', server)
+    return server
+
+
+@pytest.mark.parametrize('end_offset', [False, True])
+def test_incremental_fetch_follows_offset(workdir, monkeypatch, end_offset):
+    server = serve(monkeypatch, FakeLogServer(['a', 'b', 'c'], end_offset))
+    assert sync_log_data({}, {}) == ['a', 'b', 'c']
+    cursor = get_jq_data.get_fetch_cursor()
+    assert cursor.offset_mode == (OFFSET_END if end_offset else OFFSET_START)
+    assert cursor.offset == 3
+
+    server.lines += ['d', 'e']
+    assert sync_log_data({}, {}) == ['d', 'e']
+    assert sync_log_data({}, {}) == []
+    assert server.requests == [-1, 3, 5]
+    assert get_jq_data.get_local_log_data()['data']['logArr'] == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_cursor_mode_survives_restart(workdir, monkeypatch):
+    serve(monkeypatch, FakeLogServer(['a', 'b'], end_offset=True))
+    sync_log_data({}, {})
+    reloaded = LogFetchCursor(get_jq_data.JQ_BACKTEST_ID)
+    assert (reloaded.offset, reloaded.offset_mode) == (2, OFFSET_END)
+
+
+def test_rejected_cursor_falls_back_to_full_sync(workdir, monkeypatch):
+    server = serve(monkeypatch, FakeLogServer(['a', 'b', 'c']))
+    sync_log_data({}, {})
+
+    # 策略重启，服务端日志变短，游标位置的响应不再从游标处开始
+    server.lines = ['x', 'y']
+    assert sync_log_data({}, {}) == ['x', 'y']
+    assert server.requests == [-1, 3, -1]
+    assert get_jq_data.get_local_log_data()['data']['logArr'] == ['x', 'y']
+    assert get_jq_data.get_fetch_cursor().offset == 2
+
+
+def test_full_sync_keeps_only_new_lines(workdir, monkeypatch):
+    server = serve(monkeypatch, FakeLogServer(['a', 'b']))
+    sync_log_data({}, {})
+    # 游标与本地日志行数不一致（如本地文件被替换）时全量同步，只返回本地没有的行
+    get_jq_data.get_fetch_cursor().line_count = 99
+    server.lines += ['c']
+    assert sync_log_data({}, {}) == ['c']
+    assert server.requests == [-1, -1]
+
+
+def order_line(entrust_id, time='09:26:00'):
+    today = datetime.date.today().isoformat()
+    return (f"{today} {time} - INFO  - 订单已委托：StockOrder(entrust_id={entrust_id} security=002051.XSHE "
+            f"mode=OrderValue: _value=100000.0 style=MarketOrderStyle: _limit_price=9.65 side=long action=open "
+            f"margin=False entrust_time={today} {time} cancel_time=None finish_time=None comment= "
+            f"error=开仓数量必须是 100 的整数倍，调整为 10500)")
+
+
+def test_extractor_parses_only_new_lines():
+    extractor = IncrementalSignalExtractor()
+    lines = ['start', order_line(1740000001)]
+    assert [s.entrust_id for s in extractor.process(lines)] == ['1740000001']
+    assert extractor.process(lines) == []
+    lines.append(order_line(1740000002, '09:31:00'))
+    assert [s.entrust_id for s in extractor.process(lines)] == ['1740000002']
+
+
+def test_extractor_detects_truncated_log():
+    extractor = IncrementalSignalExtractor()
+    extractor.process(['start', order_line(1740000001), 'tail'])
+    # 日志变短
+    assert [s.entrust_id for s in extractor.process(['start', order_line(1740000001)])] == ['1740000001']
+    assert extractor.processed_count == 2
+
+
+def test_extractor_detects_rewritten_log():
+    extractor = IncrementalSignalExtractor()
+    extractor.process(['start', order_line(1740000001)])
+    # 行数不少，但已处理的行内容变了（策略重启后写了新日志）
+    rewritten = ['restart', order_line(1740000003), order_line(1740000004, '09:40:00')]
+    assert [s.entrust_id for s in extractor.process(rewritten)] == ['1740000003', '1740000004']
+    assert extractor.processed_count == 3
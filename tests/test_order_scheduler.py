@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+
+from execution_ledger import ExecutionLedger, STATE_EXPIRED
+from order_scheduler import OrderScheduler, order_deadline, MAX_ORDER_AGE, MARKET_CLOSE
+from signal_model import Signal, SIDE_BUY, SIDE_SELL
+
+TRADE_TIME = datetime.datetime(2025, 2, 27, 10, 0, 0)
+
+
+def make_signal(entrust_id, side, trade_time=TRADE_TIME):
+    return Signal(entrust_id, trade_time, side, '600000', 10.0, 100, 0)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now.timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(TRADE_TIME)
+
+
+def drain_ids(scheduler):
+    return [signal.entrust_id for signal in scheduler.drain()]
+
+
+def test_sell_preempts_queued_buys(clock):
+    scheduler = OrderScheduler(clock=clock)
+    scheduler.put(make_signal('b1', SIDE_BUY))
+    scheduler.put(make_signal('b2', SIDE_BUY))
+    orders = scheduler.drain()
+    assert next(orders).entrust_id == 'b1'
+    # 执行b1期间到达的卖出订单排在已排队的b2之前
+    scheduler.put(make_signal('s1', SIDE_SELL, TRADE_TIME + datetime.timedelta(seconds=30)))
+    assert [signal.entrust_id for signal in orders] == ['s1', 'b2']
+
+
+def test_fifo_within_priority(clock):
+    scheduler = OrderScheduler(clock=clock)
+    for entrust_id in ('b1', 'b2', 'b3'):
+        scheduler.put(make_signal(entrust_id, SIDE_BUY))
+    for entrust_id in ('s1', 's2'):
+        scheduler.put(make_signal(entrust_id, SIDE_SELL))
+    assert drain_ids(scheduler) == ['s1', 's2', 'b1', 'b2', 'b3']
+
+
+def test_earlier_log_time_first_within_priority(clock):
+    scheduler = OrderScheduler(clock=clock)
+    scheduler.put(make_signal('late', SIDE_BUY, TRADE_TIME + datetime.timedelta(seconds=10)))
+    scheduler.put(make_signal('early', SIDE_BUY))
+    assert drain_ids(scheduler) == ['early', 'late']
+
+
+def test_deadlines_by_side():
+    assert MAX_ORDER_AGE == {SIDE_BUY: 300, SIDE_SELL: 900}
+    assert order_deadline(make_signal('b', SIDE_BUY)) == TRADE_TIME.timestamp() + 300
+    assert order_deadline(make_signal('s', SIDE_SELL)) == TRADE_TIME.timestamp() + 900
+
+
+def test_deadline_capped_at_close():
+    late = datetime.datetime.combine(TRADE_TIME.date(), datetime.time(14, 55))
+    close = datetime.datetime.combine(TRADE_TIME.date(), MARKET_CLOSE).timestamp()
+    assert order_deadline(make_signal('b', SIDE_BUY, late)) == close
+    assert order_deadline(make_signal('s', SIDE_SELL, late)) == close
+
+
+def test_expiry_at_close_cap_writes_ledger(tmp_path):
+    ledger = ExecutionLedger(str(tmp_path / 'ledger.jsonl'))
+
+    def expire(signal, overdue):
+        ledger.mark(signal.entrust_id, STATE_EXPIRED, overdue=round(overdue, 1))
+
+    late = datetime.datetime.combine(TRADE_TIME.date(), datetime.time(14, 58))
+    clock = FakeClock(datetime.datetime.combine(TRADE_TIME.date(), datetime.time(15, 0, 1)))
+    scheduler = OrderScheduler(clock=clock, on_expired=expire)
+    # 按有效期限仍未到期（买入5分钟、卖出15分钟），但已过收盘
+    scheduler.put(make_signal('b1', SIDE_BUY, late))
+    scheduler.put(make_signal('s1', SIDE_SELL, late))
+    assert drain_ids(scheduler) == []
+    assert scheduler.expired == 2
+    assert ledger.state('b1') == STATE_EXPIRED
+    assert ledger.state('s1') == STATE_EXPIRED
+    assert not ledger.should_execute('b1')
+    ledger.close()
+
+
+def test_buy_expires_before_sell(clock):
+    expired = []
+    scheduler = OrderScheduler(clock=clock, on_expired=lambda signal, overdue: expired.append(signal.entrust_id))
+    scheduler.put(make_signal('b1', SIDE_BUY))
+    scheduler.put(make_signal('s1', SIDE_SELL))
+    clock.now += 301
+    assert drain_ids(scheduler) == ['s1']
+    assert expired == ['b1']
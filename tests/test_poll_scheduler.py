@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+
+from poll_scheduler import AdaptivePollScheduler
+
+# 2025-02-27 是周四
+DAY = datetime.date(2025, 2, 27)
+
+
+def at(hour, minute, second=0):
+    return datetime.datetime.combine(DAY, datetime.time(hour, minute, second))
+
+
+class RecordingTask:
+    """记录每次调用时的force参数"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, force=False):
+        self.calls.append(force)
+        return False
+
+
+def poll_at(now):
+    task = RecordingTask()
+    scheduler = AdaptivePollScheduler(task, now_func=lambda: now)
+    scheduler.poll_once()
+    return scheduler, task
+
+
+@pytest.mark.parametrize('now', [at(9, 1, 5), at(9, 25, 0), at(9, 27, 0), at(9, 29, 59)])
+def test_pre_open_windows_force_fetch(now):
+    _, task = poll_at(now)
+    assert task.calls == [True]
+
+
+@pytest.mark.parametrize('now', [at(9, 30, 0), at(11, 25, 30), at(14, 50, 5)])
+def test_session_windows_do_not_force_fetch(now):
+    _, task = poll_at(now)
+    assert task.calls == [False]
+
+
+def test_0901_anchor_polls_every_second():
+    scheduler, _ = poll_at(at(9, 1, 5))
+    assert scheduler.active_window(at(9, 1, 5)).interval == 1
+    assert scheduler.next_poll_time(at(9, 1, 5)) == at(9, 1, 6)
+
+
+def test_no_polling_between_early_anchor_and_pre_open():
+    scheduler, _ = poll_at(at(9, 1, 5))
+    assert scheduler.active_window(at(9, 10)) is None
+    assert scheduler.next_poll_time(at(9, 10)) == at(9, 25)
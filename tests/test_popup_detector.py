@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from popup_detector import (PopupDetector, load_popup_detector, read_image, POPUP_NONE, POPUP_CONFIRM,
+                            POPUP_SUCCESS, POPUP_REJECT_FUNDS, POPUP_REJECT_OTHER, DEFAULT_THRESHOLD)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'popups')
+TEMPLATES = os.path.join(FIXTURES, 'templates')
+
+
+def screenshot(name):
+    return os.path.join(FIXTURES, 'screenshots', f'{name}.png')
+
+
+@pytest.fixture(scope='module')
+def detector():
+    return PopupDetector(TEMPLATES, budget=float('inf'))
+
+
+def test_loads_all_templates(detector):
+    assert sorted(outcome for outcome, _, _ in detector.templates) == \
+        sorted([POPUP_CONFIRM, POPUP_SUCCESS, POPUP_REJECT_FUNDS, POPUP_REJECT_OTHER])
+
+
+@pytest.mark.parametrize('outcome', [POPUP_CONFIRM, POPUP_SUCCESS, POPUP_REJECT_FUNDS, POPUP_REJECT_OTHER])
+def test_classifies_popup_screenshots(detector, outcome):
+    result = detector.classify_file(screenshot(outcome))
+    assert result.outcome == outcome
+    assert result.template == f'{outcome}.png'
+    assert result.score >= DEFAULT_THRESHOLD
+    assert result.complete
+
+
+def test_no_popup_is_none(detector):
+    result = detector.classify_file(screenshot('none'))
+    assert result.outcome == POPUP_NONE
+    assert result.score < DEFAULT_THRESHOLD
+
+
+def test_best_score_below_threshold_is_none(detector):
+    # 确认弹窗的大部分提示文字被遮住时最佳匹配仍是确认模板，但相关系数低于阈值，不能当作确认弹窗回车
+    image = read_image(screenshot(POPUP_CONFIRM)).copy()
+    image[124:184, 210:410] = 250
+    result = detector.classify(image)
+    assert result.template == f'{POPUP_CONFIRM}.png'
+    assert 0 < result.score < DEFAULT_THRESHOLD
+    assert result.outcome == POPUP_NONE
+
+
+def test_threshold_controls_match(detector):
+    strict = PopupDetector(TEMPLATES, threshold=1.01, budget=float('inf'))
+    result = strict.classify_file(screenshot(POPUP_SUCCESS))
+    assert result.outcome == POPUP_NONE
+    assert result.template == f'{POPUP_SUCCESS}.png'
+
+
+def test_accepts_bgr_screenshot(detector):
+    image = cv2.cvtColor(read_image(screenshot(POPUP_REJECT_FUNDS)), cv2.COLOR_GRAY2BGR)
+    assert detector.classify(image).outcome == POPUP_REJECT_FUNDS
+
+
+def test_budget_exhausted_reports_incomplete():
+    hurried = PopupDetector(TEMPLATES, budget=0.0)
+    result = hurried.classify_file(screenshot(POPUP_REJECT_OTHER))
+    assert not result.complete
+    assert result.outcome == POPUP_NONE
+
+
+def test_load_without_templates_returns_none(tmp_path):
+    assert load_popup_detector(str(tmp_path)) is None
+    assert load_popup_detector(TEMPLATES) is not None
@@ -0,0 +1,88 @@
+import json
+import datetime
+
+import pytest
+
+from risk_check import RiskChecker, DEFAULT_LIMITS, load_risk_limits
+from signal_model import Signal, SIDE_BUY, SIDE_SELL
+
+
+def make_signal(entrust_id='1', side=SIDE_BUY, price=10.0, amount=100, days_ago=0):
+    trade_time = datetime.datetime.now() - datetime.timedelta(days=days_ago)
+    return Signal(entrust_id, trade_time, side, '600000', price, amount, 0)
+
+
+@pytest.fixture
+def checker():
+    return RiskChecker(max_order_value=10000, max_daily_buys=2, max_daily_sells=1)
+
+
+def test_valid_signals_pass(checker):
+    assert checker.check(make_signal('1')) == (True, None)
+    assert checker.check(make_signal('2', SIDE_SELL, amount=50)) == (True, None)
+    assert checker.rejected == 0
+
+
+@pytest.mark.parametrize('signal, reason', [
+    (make_signal(days_ago=1), '不是当天的交易信号'),
+    (make_signal(amount=0), '数量0无效'),
+    (make_signal(side=SIDE_SELL, amount=-100), '数量-100无效'),
+    (make_signal(amount=150), '买入数量150不是100股的整数倍'),
+    (make_signal(price=0), '买入价格0无效'),
+    (make_signal(price=101, amount=100), '委托金额10100.00超过上限10000'),
+])
+def test_rejection_reasons(checker, signal, reason):
+    assert checker.check(signal) == (False, reason)
+    assert checker.rejected == 1
+
+
+def test_duplicate_entrust_id_is_rejected(checker):
+    assert checker.check(make_signal('1'))[0]
+    assert checker.check(make_signal('1')) == (False, '委托编号重复')
+
+
+def test_daily_buy_cap_counts_submitted_orders_only(checker):
+    # 通过检查但未提交的订单不占用笔数
+    for entrust_id in ('1', '2', '3'):
+        assert checker.check(make_signal(entrust_id))[0]
+    checker.record_submitted(make_signal('1'))
+    assert checker.check(make_signal('4'))[0]
+    checker.record_submitted(make_signal('2'))
+    assert checker.check(make_signal('5')) == (False, '当日买入委托笔数已达上限2')
+    # 卖出单独计数，不受买入上限限制
+    assert checker.check(make_signal('6', SIDE_SELL))[0]
+
+
+def test_daily_sell_cap_blocks_sells(checker):
+    checker.record_submitted(make_signal('1', SIDE_SELL))
+    assert checker.check(make_signal('2', SIDE_SELL)) == (False, '当日卖出委托笔数已达上限1')
+    assert checker.sells_blocked == 1
+    assert checker.check(make_signal('3'))[0]
+
+
+def test_counts_reset_on_new_day(checker):
+    checker.record_submitted(make_signal('1', SIDE_SELL))
+    checker._date = datetime.date.today() - datetime.timedelta(days=1)
+    assert checker.check(make_signal('2', SIDE_SELL))[0]
+
+
+def test_limits_default_when_config_missing(tmp_path):
+    assert load_risk_limits(str(tmp_path / 'missing.json')) == DEFAULT_LIMITS
+
+
+def test_limits_override_from_config(tmp_path):
+    path = tmp_path / 'risk_limits.json'
+    path.write_text(json.dumps({'max_order_value': 50000, 'max_daily_buys': 'many', 'unknown': 1}),
+                    encoding='utf-8')
+    limits = load_risk_limits(str(path))
+    assert limits == dict(DEFAULT_LIMITS, max_order_value=50000)
+
+    checker = RiskChecker.load(str(path))
+    assert checker.max_order_value == 50000
+    assert checker.max_daily_buys == DEFAULT_LIMITS['max_daily_buys']
+
+
+def test_limits_default_when_config_corrupt(tmp_path):
+    path = tmp_path / 'risk_limits.json'
+    path.write_text('{"max_order_value": ', encoding='utf-8')
+    assert load_risk_limits(str(path)) == DEFAULT_LIMITS
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from popup_detector import read_image
+from screen_state import (ScreenStateRecognizer, fingerprint, self_check, load_screen_recognizer, STATES,
+                          SCREEN_UNKNOWN, MAX_DISTANCE)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'screens')
+FRAMES = os.path.join(FIXTURES, 'frames')
+
+
+def capture(name):
+    return read_image(os.path.join(FIXTURES, 'captures', f'{name}.png'))
+
+
+@pytest.fixture(scope='module')
+def recognizer():
+    return ScreenStateRecognizer.from_frames(FRAMES)
+
+
+def test_builds_fingerprints_for_every_state(recognizer):
+    assert sorted({state for state, _ in recognizer.labels}) == sorted(STATES)
+    assert len(recognizer.labels) == 2 * len(STATES)
+
+
+@pytest.mark.parametrize('state', STATES)
+def test_recognizes_each_capture(recognizer, state):
+    result = recognizer.recognize(capture(state))
+    assert result.state == state
+    assert result.frame.startswith(f'{state}/')
+    assert result.distance <= MAX_DISTANCE
+
+
+def test_unrelated_frame_is_unknown(recognizer):
+    result = recognizer.recognize(capture('unknown'))
+    assert result.state == SCREEN_UNKNOWN
+    assert result.distance > MAX_DISTANCE
+    # 仍然报告最近的参考画面，便于排查
+    assert result.frame
+
+
+def test_distance_above_max_is_unknown():
+    strict = ScreenStateRecognizer.from_frames(FRAMES, max_distance=0)
+    result = strict.recognize(capture(STATES[0]))
+    assert result.distance > 0
+    assert result.state == SCREEN_UNKNOWN
+
+
+def test_exclude_skips_that_frame(recognizer):
+    image = read_image(os.path.join(FRAMES, 'buy', '1.png'))
+    assert recognizer.recognize(image)[:3] == ('buy', 0, 'buy/1.png')
+    result = recognizer.recognize(image, exclude='buy/1.png')
+    assert result.state == 'buy'
+    assert result.frame == 'buy/2.png'
+
+
+def test_excluding_only_frame_is_unknown():
+    image = capture('sell')
+    single = ScreenStateRecognizer([('sell', 'sell/1.png', fingerprint(image))])
+    assert single.recognize(image).state == 'sell'
+    result = single.recognize(image, exclude='sell/1.png')
+    assert result.state == SCREEN_UNKNOWN
+    assert result.distance == -1
+
+
+def test_self_check_passes_on_fixture_frames(recognizer):
+    correct, total, problems, _ = self_check(recognizer, FRAMES)
+    assert (correct, total, problems) == (total, 2 * len(STATES), [])
+
+
+def test_save_and_load_round_trip(recognizer, tmp_path):
+    path = str(tmp_path / 'fingerprints.json')
+    recognizer.save(path)
+    loaded = load_screen_recognizer(path)
+    assert loaded.labels == recognizer.labels
+    for state in STATES:
+        assert loaded.recognize(capture(state))[:3] == recognizer.recognize(capture(state))[:3]
+    assert load_screen_recognizer(str(tmp_path / 'missing.json')) is None
+
+
+def test_empty_frame_dir_raises_clear_error(tmp_path):
+    with pytest.raises(ValueError, match='没有参考画面'):
+        ScreenStateRecognizer.from_frames(str(tmp_path))
+
+
+def test_cli_reports_missing_frames(tmp_path, monkeypatch, capsys):
+    from screen_state import main
+    for option in ('--build', '--check'):
+        monkeypatch.setattr('sys.argv', ['screen_state.py', option, '--frames', str(tmp_path),
+                                         '--fingerprints', str(tmp_path / 'fingerprints.json')])
+        assert main() == 1
+        assert '没有参考画面' in capsys.readouterr().out
+    assert not (tmp_path / 'fingerprints.json').exists()
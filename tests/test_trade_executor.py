@@ -0,0 +1,144 @@
+import datetime
+
+import pytest
+
+from execution_ledger import (ExecutionLedger, STATE_CONFIRMED, STATE_EXPIRED, STATE_FAILED, STATE_SUBMITTED,
+                              STATE_NO_POPUP)
+from latency_metrics import LatencyRecorder
+from order_scheduler import OrderScheduler
+from popup_detector import POPUP_NONE, POPUP_UNKNOWN
+from signal_model import Signal, SIDE_BUY
+from simulated_broker import SimulatedTHSBroker
+from timing_profile import TimingProfile
+from trade_executor import TradeExecutor, retry_failed_orders
+
+
+@pytest.fixture
+def broker():
+    return SimulatedTHSBroker()
+
+
+def make_executor(tmp_path, broker):
+    ledger = ExecutionLedger(str(tmp_path / 'ledger.jsonl'))
+    recorder = LatencyRecorder(metrics_file=str(tmp_path / 'latency.json'), traces_file=None, clock=broker.now)
+    return TradeExecutor(ledger=ledger, latency=recorder, broker=broker, timing=TimingProfile('test'))
+
+
+@pytest.fixture
+def executor(tmp_path, broker):
+    executor = make_executor(tmp_path, broker)
+    yield executor
+    executor.ledger.close()
+
+
+def buy_signal(entrust_id, age=0):
+    trade_time = datetime.datetime.now() - datetime.timedelta(seconds=age)
+    return Signal(entrust_id, trade_time, SIDE_BUY, '600000', 10.5, 100, 0)
+
+
+def fail_first_attempt(executor, monkeypatch):
+    """第一次执行每个订单时失败，之后正常执行"""
+    execute = executor.execute_single_trade
+    attempted = set()
+
+    def flaky(signal, in_batch=False):
+        if signal.entrust_id not in attempted:
+            attempted.add(signal.entrust_id)
+            return False
+        return execute(signal, in_batch)
+    monkeypatch.setattr(executor, 'execute_single_trade', flaky)
+
+
+def test_failed_order_is_retried_within_deadline(executor, broker, monkeypatch):
+    fail_first_attempt(executor, monkeypatch)
+    signal = buy_signal('1')
+    executor.execute_batch([signal])
+    assert executor.ledger.state('1') == STATE_FAILED
+
+    unfinished = {'1': signal}
+    scheduler = OrderScheduler(on_expired=executor.expire_order)
+    assert retry_failed_orders(executor, scheduler, unfinished) == 1
+    assert executor.ledger.state('1') == STATE_CONFIRMED
+    assert len(broker.orders) == 1
+
+    # 已提交的订单不再重试
+    assert retry_failed_orders(executor, scheduler, unfinished) == 0
+    assert unfinished == {}
+
+
+def test_failed_order_past_deadline_expires(executor, broker, monkeypatch):
+    fail_first_attempt(executor, monkeypatch)
+    signal = buy_signal('1', age=200)
+    executor.execute_batch([signal])
+    assert executor.ledger.state('1') == STATE_FAILED
+
+    unfinished = {'1': signal}
+    # 买入有效期限为300秒，重试时已超过
+    scheduler = OrderScheduler(on_expired=executor.expire_order,
+                               clock=lambda: signal.trade_time.timestamp() + 301)
+    retry_failed_orders(executor, scheduler, unfinished)
+    assert executor.ledger.state('1') == STATE_EXPIRED
+    assert broker.orders == []
+    retry_failed_orders(executor, scheduler, unfinished)
+    assert unfinished == {}
+
+
+def test_on_submitted_called_only_for_submitted_orders(executor, monkeypatch):
+    submitted = []
+    executor.on_submitted = submitted.append
+    fail_first_attempt(executor, monkeypatch)
+    executor.execute_batch([buy_signal('1')])
+    assert submitted == []
+    executor.execute_batch([buy_signal('1')])
+    assert [s.entrust_id for s in submitted] == ['1']
+
+
+class ScriptedPopupBroker(SimulatedTHSBroker):
+    """弹窗出现后，前几次识别返回指定结果（模拟弹窗仍在绘制或识别时间预算用完）"""
+    def __init__(self, first_reads):
+        super().__init__()
+        self.first_reads = list(first_reads)
+
+    def read_popup(self):
+        outcome = super().read_popup()
+        if outcome != POPUP_NONE and self.first_reads:
+            return self.first_reads.pop(0)
+        return outcome
+
+
+class SilentBroker(SimulatedTHSBroker):
+    """提交后不出现任何弹窗"""
+    def _submit(self):
+        pass
+
+
+@pytest.mark.parametrize('first_reads', [[POPUP_NONE], [POPUP_UNKNOWN, POPUP_NONE, POPUP_UNKNOWN]])
+def test_popup_reread_until_recognized(tmp_path, first_reads):
+    broker = ScriptedPopupBroker(first_reads)
+    executor = make_executor(tmp_path, broker)
+    assert executor.execute_single_trade(buy_signal('1'))
+    assert executor.ledger.state('1') == STATE_CONFIRMED
+    assert len(broker.orders) == 1
+    executor.ledger.close()
+
+
+@pytest.mark.parametrize('outcome', [POPUP_NONE, POPUP_UNKNOWN])
+def test_unrecognized_popup_leaves_order_submitted(tmp_path, outcome):
+    broker = ScriptedPopupBroker([outcome] * 1000)
+    executor = make_executor(tmp_path, broker)
+    assert executor.execute_all_trades([buy_signal('1')]) == 0
+    assert executor.ledger.state('1') == STATE_SUBMITTED
+    # 没有按回车确认无法识别的弹窗，委托未生效，也不会重新执行
+    assert broker.orders == []
+    assert not executor.ledger.should_execute('1')
+    executor.ledger.close()
+
+
+def test_missing_popup_is_recorded(tmp_path):
+    broker = SilentBroker()
+    executor = make_executor(tmp_path, broker)
+    assert executor.execute_all_trades([buy_signal('1')]) == 0
+    assert executor.ledger.state('1') == STATE_NO_POPUP
+    assert executor.ledger.is_done('1')
+    assert not executor.ledger.should_execute('1')
+    executor.ledger.close()
@@ -0,0 +1,113 @@
+import pytest
+
+from window_registry import WindowProvider, WindowRegistry, ROLE_MAIN, ROLE_TRADING
+
+
+class FakeWindow:
+    def __init__(self, title):
+        self.title = title
+        self.alive = True
+
+
+class FakeWindowProvider(WindowProvider):
+    """返回假窗口对象的窗口来源，记录全量枚举次数"""
+    def __init__(self, *windows):
+        self.windows = list(windows)
+        self.list_calls = 0
+
+    def list_windows(self):
+        self.list_calls += 1
+        return [window for window in self.windows if window.alive]
+
+    def is_alive(self, window):
+        return window.alive
+
+    def get_title(self, window):
+        return window.title
+
+
+@pytest.fixture
+def windows():
+    return FakeWindow("同花顺(v9.20) - 首页"), FakeWindow("网上股票交易系统5.0")
+
+
+@pytest.fixture
+def provider(windows):
+    return FakeWindowProvider(*windows)
+
+
+@pytest.fixture
+def registry(provider):
+    return WindowRegistry(provider)
+
+
+def counters(registry):
+    stats = registry.stats()
+    return stats['hits'], stats['misses'], stats['scans']
+
+
+def test_first_resolve_scans_then_hits(registry, provider, windows):
+    main, trading = windows
+    assert registry.get(ROLE_TRADING) is trading
+    assert counters(registry) == (0, 1, 1)
+
+    assert registry.get(ROLE_TRADING) is trading
+    assert registry.get(ROLE_TRADING) is trading
+    assert counters(registry) == (2, 1, 1)
+    assert provider.list_calls == 1
+
+
+def test_one_scan_caches_all_roles(registry, provider, windows):
+    main, trading = windows
+    registry.get(ROLE_TRADING)
+    assert registry.get(ROLE_MAIN) is main
+    assert counters(registry) == (1, 1, 1)
+    assert registry.stats()['cached'] == [ROLE_MAIN, ROLE_TRADING]
+
+
+def test_dead_handle_misses_and_rescans(registry, provider, windows):
+    main, trading = windows
+    registry.get(ROLE_TRADING)
+    trading.alive = False
+    restarted = FakeWindow("网上股票交易系统5.0")
+    provider.windows.append(restarted)
+
+    assert registry.get(ROLE_TRADING) is restarted
+    assert counters(registry) == (0, 2, 2)
+    assert provider.list_calls == 2
+    assert registry.get(ROLE_TRADING) is restarted
+    assert counters(registry) == (1, 2, 2)
+
+
+def test_title_change_misses_and_rescans(registry, provider, windows):
+    main, trading = windows
+    registry.get(ROLE_TRADING)
+    trading.title = "同花顺 - 登录"
+
+    assert registry.get(ROLE_TRADING) is None
+    assert counters(registry) == (0, 2, 2)
+    # 找不到时不缓存，下次继续枚举
+    assert registry.get(ROLE_TRADING) is None
+    assert counters(registry) == (0, 3, 3)
+
+
+def test_probe_error_counts_as_miss(registry, provider, windows):
+    main, trading = windows
+    registry.get(ROLE_TRADING)
+
+    def broken(window):
+        raise OSError("invalid window handle")
+    provider.is_alive = broken
+
+    assert registry.get(ROLE_TRADING) is trading
+    assert counters(registry) == (0, 2, 2)
+
+
+def test_invalidate_forces_rescan(registry, provider):
+    registry.get(ROLE_TRADING)
+    registry.get(ROLE_MAIN)
+    registry.invalidate(ROLE_TRADING)
+    registry.get(ROLE_MAIN)
+    assert counters(registry) == (2, 1, 1)
+    registry.get(ROLE_TRADING)
+    assert counters(registry) == (2, 2, 2)
@@ -0,0 +1,350 @@
+import os
+import sys
+import json
+import socket
+import logging
+import argparse
+import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join('data', 'timing_profiles')
+
+# 下单各步骤的默认等待设置：步骤 -> (最长等待秒数, 无法探测界面状态时的固定等待秒数)
+DEFAULT_STEPS = {
+    'window_open': (10.0, 1.0),  # 打开同花顺交易软件后交易窗口出现
+    'window_foreground': (3.0, 1.3),  # 交易窗口置于前台
+    'ticket_switched': (3.0, 1.0),  # F1/F2切换到买入/卖出委托单
+    'field_ready': (1.0, 0.3),  # 清空输入框或移动焦点后
+    'quote_loaded': (3.0, 1.0),  # 证券代码被接受、行情加载完成
+    'field_typed': (1.0, 1.0),  # 输入价格或数量后
+    'popup_present': (5.0, 2.0),  # 提交后出现弹窗
+    'popup_closed': (3.0, 1.0)  # 弹窗关闭、委托单恢复可用（兼作交易之间的间隔）
+}
+
+# 校准时在实测最长就绪时间上增加的比例和最小余量（秒）
+SAFETY_MARGIN = 0.5
+MIN_MARGIN = 0.05
+# 校准得到的固定等待时间不超过默认值的倍数，防止一次异常测量拖慢所有订单
+MAX_DELAY_FACTOR = 3
+# 校准和复查时输入的证券代码，只填写不提交
+CALIBRATION_SECURITY = '600000'
+CALIBRATION_PRICE = '1.00'
+CALIBRATION_AMOUNT = '100'
+# 在模拟界面上校准的结果保存在单独的配置中，不覆盖本机实盘使用的配置
+SIMULATED_PROFILE = 'simulated'
+# 每日复查只在开盘前进行（与主控制器的预热时间段相同），交易时段内不在委托单上输入
+RECHECK_START = datetime.time(9, 0)
+RECHECK_END = datetime.time(9, 20)
+
+
+def default_profile_name():
+    """默认的配置名称为本机名，每台机器使用各自的配置"""
+    return socket.gethostname() or 'default'
+
+
+def profile_path(name):
+    return os.path.join(PROFILE_DIR, f'{name}.json')
+
+
+class TimingProfile:
+    """
+    下单时序配置
+
+    保存每个下单步骤的最长等待时间和固定等待时间，以及输入文字时每个字符的间隔。
+    固定等待时间在界面状态无法探测时使用，由校准得到每台机器各自的最小安全值。
+    observed为None的步骤没有实测过，使用的是默认值或手动设置的值。
+
+    参数:
+        name: 配置名称
+        steps: {步骤: {'timeout': 秒, 'delay': 秒, 'observed': 实测最长就绪秒数或None}}
+        typing_interval: 输入文字时每个字符的间隔（秒），不参与校准，需要时在配置文件中手动设置
+        uncalibrated: 上次校准时当前界面无法探测、没有实测的步骤
+    """
+    def __init__(self, name, steps=None, typing_interval=0.0, margin=SAFETY_MARGIN,
+                 calibrated=None, last_checked=None, uncalibrated=None):
+        self.name = name
+        self.steps = {step: {'timeout': timeout, 'delay': delay, 'observed': None}
+                      for step, (timeout, delay) in DEFAULT_STEPS.items()}
+        for step, values in (steps or {}).items():
+            self.steps.setdefault(step, {'timeout': 0.0, 'delay': 0.0, 'observed': None}).update(values)
+        self.typing_interval = typing_interval
+        self.margin = margin
+        self.calibrated = calibrated
+        self.last_checked = last_checked
+        self.uncalibrated = list(uncalibrated or [])
+
+    def step(self, step):
+        """返回 (最长等待秒数, 固定等待秒数)"""
+        values = self.steps[step]
+        return values['timeout'], values['delay']
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'calibrated': self.calibrated,
+            'last_checked': self.last_checked,
+            'margin': self.margin,
+            'typing_interval': self.typing_interval,
+            'uncalibrated': self.uncalibrated,
+            'steps': self.steps
+        }
+
+    def save(self, path=None):
+        """保存配置（先写临时文件再替换）"""
+        path = path or profile_path(self.name)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, name=None, path=None):
+        """加载配置，文件不存在或损坏时返回默认配置"""
+        name = name or default_profile_name()
+        path = path or profile_path(name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"未找到时序配置 {path}，使用默认等待时间")
+            return cls(name)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取时序配置 {path} 出错，使用默认等待时间: {e}")
+            return cls(name)
+        logger.info(f"已加载时序配置 {name}（校准于 {data.get('calibrated')}）")
+        return cls(data.get('name', name), data.get('steps'), data.get('typing_interval', 0.0),
+                   data.get('margin', SAFETY_MARGIN), data.get('calibrated'), data.get('last_checked'),
+                   data.get('uncalibrated'))
+
+    def safe_delay(self, step, observed):
+        """根据实测最长就绪时间计算带余量的固定等待时间"""
+        cap = DEFAULT_STEPS.get(step, (0.0, observed))[1] * MAX_DELAY_FACTOR
+        return round(min(max(observed * (1 + self.margin) + MIN_MARGIN, MIN_MARGIN), max(cap, MIN_MARGIN)), 3)
+
+    def apply_observations(self, observations, raise_only=False):
+        """
+        用实测就绪时间更新各步骤的固定等待时间
+
+        参数:
+            observations: {步骤: 实测最长就绪秒数}
+            raise_only: 为True时只在实测值超过当前等待时间时调高（每日复查使用）
+
+        返回:
+            {步骤: (原等待时间, 新等待时间)}，只包含有变化的步骤
+        """
+        changes = {}
+        for step, observed in observations.items():
+            values = self.steps[step]
+            if raise_only and observed <= values['delay']:
+                continue
+            delay = self.safe_delay(step, observed)
+            values['observed'] = round(observed, 3)
+            values['timeout'] = max(DEFAULT_STEPS.get(step, (0.0, 0.0))[0], round(delay * 3, 3))
+            if delay != values['delay']:
+                changes[step] = (values['delay'], delay)
+                values['delay'] = delay
+        return changes
+
+    def is_check_due(self, now=None):
+        """当前是否在交易日开盘前的复查时间段内，且今天还没有复查过"""
+        now = now or datetime.datetime.now()
+        if now.weekday() > 4 or not (RECHECK_START <= now.time() < RECHECK_END):
+            return False
+        return self.last_checked is None or self.last_checked[:10] != now.date().isoformat()
+
+
+class TimingCalibrator:
+    """
+    下单时序校准
+
+    在委托单上运行一段脚本化的操作（切换买入/卖出委托单、填写证券代码、价格和数量），
+    通过下单界面适配器的探测方法测量每个步骤实际需要的就绪时间。真实界面上只填写不提交；
+    只有在模拟界面上（submit=True）才会提交并测量弹窗相关的步骤。
+
+    无法探测的步骤不计入实测结果，保持原有设置并记入unprobed。真实界面上GuiBrokerAdapter
+    只能探测窗口前台（window_foreground）和有界面指纹时的委托单切换（ticket_switched），
+    输入框就绪、行情加载、输入完成和弹窗关闭（field_ready、quote_loaded、field_typed、
+    popup_closed）都无法探测，不会被校准。输入字符间隔typing_interval也不校准。
+
+    参数:
+        broker: 下单界面适配器
+        security: 校准时输入的证券代码
+        submit: 是否提交委托并测量弹窗步骤
+        poll_interval: 探测间隔（秒）
+    """
+    def __init__(self, broker, security=CALIBRATION_SECURITY, submit=False, poll_interval=0.01):
+        self.broker = broker
+        self.security = security
+        self.submit = submit
+        self.poll_interval = poll_interval
+        self.observations = {}
+        self.unprobed = set()
+
+    def _measure(self, step, condition, timeout):
+        """测量条件从现在起多久满足，无法探测返回None，超时返回timeout"""
+        start = self.broker.now()
+        result = condition()
+        if result is None:
+            self.unprobed.add(step)
+            return None
+        while not result and self.broker.now() - start < timeout:
+            self.broker.sleep(self.poll_interval)
+            result = condition()
+        waited = self.broker.now() - start
+        if not result:
+            logger.warning(f"校准步骤 {step} 在{timeout}秒内未就绪")
+        self.observations[step] = max(self.observations.get(step, 0.0), waited)
+        return waited
+
+    def _field_ready(self):
+        self._measure('field_ready', self.broker.is_input_ready, DEFAULT_STEPS['field_ready'][0])
+
+    def run_round(self, mode):
+        """运行一轮脚本化操作"""
+        broker = self.broker
+        broker.activate_trading_window()
+        self._measure('window_foreground', broker.is_trading_window_foreground, DEFAULT_STEPS['window_foreground'][0])
+
+        broker.press('f1' if mode == 'buy' else 'f2')
+        self._measure('ticket_switched', lambda: broker.is_ticket_ready(mode), DEFAULT_STEPS['ticket_switched'][0])
+
+        broker.hotkey('ctrl', 'a')
+        broker.press('delete')
+        self._field_ready()
+        broker.typewrite(self.security)
+        self._measure('quote_loaded', lambda: broker.is_quote_loaded(self.security), DEFAULT_STEPS['quote_loaded'][0])
+
+        broker.press('tab')
+        self._field_ready()
+        if mode == 'buy':
+            broker.hotkey('ctrl', 'a')
+            broker.press('backspace')
+            self._field_ready()
+            broker.typewrite(CALIBRATION_PRICE)
+            self._measure('field_typed', broker.is_input_ready, DEFAULT_STEPS['field_typed'][0])
+        broker.press('tab')
+        self._field_ready()
+        broker.hotkey('ctrl', 'a')
+        broker.press('delete')
+        self._field_ready()
+        broker.typewrite(CALIBRATION_AMOUNT)
+        self._measure('field_typed', broker.is_input_ready, DEFAULT_STEPS['field_typed'][0])
+
+        if self.submit:
+            broker.press('tab')
+            self._field_ready()
+            broker.press('enter')
+            self._measure('popup_present', broker.is_popup_present, DEFAULT_STEPS['popup_present'][0])
+            broker.press('enter')
+            self._measure('popup_closed', broker.is_input_ready, DEFAULT_STEPS['popup_closed'][0])
+        else:
+            # 不提交，清空证券代码，留下空白委托单
+            broker.press('f1' if mode == 'buy' else 'f2')
+            self._measure('ticket_switched', lambda: broker.is_ticket_ready(mode), DEFAULT_STEPS['ticket_switched'][0])
+
+    def run(self, rounds=3):
+        """运行多轮买入和卖出脚本，返回 {步骤: 实测最长就绪秒数}"""
+        for _ in range(rounds):
+            for mode in ('buy', 'sell'):
+                self.run_round(mode)
+        return dict(self.observations)
+
+
+def calibrate(broker, name=None, rounds=3, margin=SAFETY_MARGIN, submit=False, save=True):
+    """
+    校准并保存时序配置
+
+    返回:
+        (配置, 无法探测而保持原设置的步骤集合)
+    """
+    profile = TimingProfile.load(name)
+    profile.margin = margin
+    calibrator = TimingCalibrator(broker, submit=submit)
+    observations = calibrator.run(rounds)
+    changes = profile.apply_observations(observations)
+    unprobed = calibrator.unprobed - set(observations)
+    # 没有实测的步骤不保留以前的实测值，配置中只有本次实测的步骤带observed
+    for step in unprobed:
+        profile.steps[step]['observed'] = None
+    profile.uncalibrated = sorted(unprobed)
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    profile.calibrated = now
+    profile.last_checked = now
+    for step, (old, new) in changes.items():
+        logger.info(f"时序配置 {profile.name} 步骤 {step}: 固定等待 {old}秒 -> {new}秒")
+    if unprobed:
+        logger.warning(f"时序配置 {profile.name} 以下步骤当前界面无法探测，未校准，保持原固定等待: "
+                       f"{', '.join(sorted(unprobed))}")
+    if save:
+        profile.save()
+    return profile, unprobed
+
+
+def recheck(broker, profile, save=True):
+    """
+    每日复查：运行一轮脚本，实测就绪时间超过当前固定等待时间的步骤调高等待时间
+
+    返回:
+        {步骤: (原等待时间, 新等待时间)}
+    """
+    calibrator = TimingCalibrator(broker)
+    observations = calibrator.run(rounds=1)
+    changes = profile.apply_observations(observations, raise_only=True)
+    for step, (old, new) in changes.items():
+        logger.warning(f"时序配置 {profile.name} 步骤 {step} 今天需要更长的等待: {old}秒 -> {new}秒")
+    profile.last_checked = datetime.datetime.now().isoformat(timespec='seconds')
+    if save:
+        profile.save()
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="下单时序配置校准")
+    parser.add_argument('--name', default=None,
+                        help=f"配置名称，默认使用本机名；--simulate时默认为{SIMULATED_PROFILE}")
+    parser.add_argument('--rounds', type=int, default=3, help="买入和卖出脚本各运行的轮数")
+    parser.add_argument('--margin', type=float, default=SAFETY_MARGIN, help="在实测就绪时间上增加的比例")
+    parser.add_argument('--simulate', action='store_true',
+                        help="在模拟下单界面上校准（会提交模拟委托并测量弹窗步骤），结果不保存到本机实盘配置")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="模拟界面响应时间的倍数")
+    parser.add_argument('--recheck', action='store_true', help="只运行一轮复查")
+    parser.add_argument('--show', action='store_true', help="只显示当前配置")
+    args = parser.parse_args()
+
+    if args.simulate:
+        if args.name == default_profile_name():
+            parser.error(f"模拟界面的校准结果不能保存到本机实盘使用的配置 {args.name}")
+        args.name = args.name or SIMULATED_PROFILE
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.show:
+        print(json.dumps(TimingProfile.load(args.name).to_dict(), indent=2, ensure_ascii=False))
+        return
+
+    if args.simulate:
+        from simulated_broker import SimulatedTHSBroker, SimulatedLatencies
+        broker = SimulatedTHSBroker(latencies=SimulatedLatencies().scaled(args.latency_scale))
+    else:
+        from broker_adapter import GuiBrokerAdapter
+        broker = GuiBrokerAdapter()
+
+    if args.recheck:
+        profile = TimingProfile.load(args.name)
+        changes = recheck(broker, profile)
+        print(f"复查完成，调整了{len(changes)}个步骤")
+        return
+
+    profile, unprobed = calibrate(broker, args.name, args.rounds, args.margin, submit=args.simulate)
+    print(f"时序配置 {profile.name} 已保存到 {profile_path(profile.name)}")
+    for step, values in profile.steps.items():
+        print(f"  {step:<18} 固定等待 {values['delay']:.3f}秒  最长等待 {values['timeout']:.1f}秒  "
+              f"实测 {values['observed'] if values['observed'] is not None else '-'}")
+    if unprobed:
+        print(f"当前界面无法探测、未校准的步骤: {', '.join(sorted(unprobed))}")
+    print(f"输入字符间隔不参与校准，当前为 {profile.typing_interval}秒")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,62 +1,82 @@
 import logging
 import time
 import os
-import json
 import sys
 import datetime
+import threading
 
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from extract_trade_signals import load_log_data, extract_trade_signals, group_trade_signals_by_date
-import pyautogui
 
 # 导入TradeWindowControl类
 from trade_window_control import TradeWindowControl
 
-# 导入open_ths_client模块
-from open_ths_client import THSClient, main as open_ths_main
+from signal_model import load_signals, save_signals, SignalFileTail
+from execution_ledger import (get_execution_ledger, signal_key, STATE_PENDING, STATE_TYPED,
+                              STATE_SUBMITTED, STATE_CONFIRMED, STATE_FAILED, STATE_EXPIRED,
+                              STATE_REJECTED, STATE_NO_POPUP, CLOSED_STATES)
+from latency_metrics import (get_latency_recorder, HOP_HTTP_RECEIVED, HOP_PARSED, HOP_DEQUEUED,
+                             HOP_WINDOW_ACTIVATED, HOP_FIELDS_TYPED, HOP_SUBMITTED, HOP_POPUP_DISMISSED)
+from wait_engine import WaitEngine
+from timing_profile import TimingProfile, recheck as recheck_timing_profile
+from order_scheduler import OrderScheduler
+from popup_detector import POPUP_NONE, POPUP_UNKNOWN, REJECT_OUTCOMES
+from logging_setup import setup_logging
 
-# 配置日志
-log_file = 'logs/trade_executor.log'
-os.makedirs('logs', exist_ok=True)
+# 配置日志：记录由后台线程写入 logs/<进程名>/trade_executor.log
+setup_logging()
 
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# 常驻模式下执行失败的订单重新排队的间隔（秒）
+FAILED_RETRY_INTERVAL = 5
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+class TradeExecutor:
+    """
+    交易执行器
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+    通过BrokerAdapter操作下单界面，默认使用GuiBrokerAdapter驱动本机同花顺；
+    传入simulated_broker.SimulatedTHSBroker可以在没有桌面的机器上运行和测量完整的执行流程。
 
-class TradeExecutor:
-    def __init__(self):
-        self.trade_control = TradeWindowControl()
+    参数:
+        ledger: 订单执行台账，None表示使用共享台账
+        latency: 延迟记录器，None表示使用共享记录器
+        broker: 下单界面适配器，None表示使用GuiBrokerAdapter
+        timing: 下单时序配置，None表示加载本机的配置
+        on_submitted: 按下提交键后调用，参数为交易信号（如RiskChecker.record_submitted）
+    """
+    def __init__(self, ledger=None, latency=None, broker=None, timing=None, on_submitted=None):
+        if broker is None:
+            from broker_adapter import GuiBrokerAdapter
+            broker = GuiBrokerAdapter()
+        self.broker = broker
+        self.timing = timing or TimingProfile.load()
+        self.waits = WaitEngine(broker)
+        self.trade_control = TradeWindowControl(broker, self.waits, self.timing)
+        # 下单和时序复查都要操作界面，不能同时进行
+        self._gui_lock = threading.Lock()
+        self.ledger = ledger or get_execution_ledger()
+        self.latency = latency or get_latency_recorder()
+        self.on_submitted = on_submitted
+        # 窗口激活和委托单切换的累计次数，以及批量执行中省去的次数
+        self.batch_stats = {'batches': 0, 'orders': 0, 'activations': 0, 'activations_saved': 0,
+                            'mode_switches': 0, 'mode_switches_saved': 0}
         
     def ensure_trading_software_open(self):
         """确保同花顺交易软件已打开"""
         try:
             # 检查交易窗口是否已经打开
-            for window in pyautogui.getAllWindows():
-                if "网上股票交易" in window.title or "交易系统" in window.title:
-                    logging.info(f"同花顺交易软件已打开: {window.title}")
-                    return True
+            if self.broker.is_trading_window_open():
+                return True
             
-            # 如果没有找到交易窗口，直接调用open_ths_client.py的main函数
+            # 如果没有找到交易窗口，打开同花顺交易软件
             logging.info("未找到交易窗口，尝试打开同花顺交易软件")
-            open_ths_main()
+            self.broker.open_trading_window()
             
-            # 检查交易窗口是否已打开
-            time.sleep(1)  # 等待交易窗口打开
-            for window in pyautogui.getAllWindows():
-                if "网上股票交易" in window.title or "交易系统" in window.title:
-                    logging.info(f"成功打开同花顺交易软件: {window.title}")
-                    return True
+            # 等待交易窗口打开
+            if self._wait('window_open', self.broker.is_trading_window_open):
+                logging.info("成功打开同花顺交易软件")
+                return True
             
             logging.error("无法打开同花顺交易软件")
             return False
@@ -65,8 +85,17 @@ class TradeExecutor:
             logging.error(f"确保交易软件打开时出错: {e}")
             return False
     
-    def execute_single_trade(self, trade_signal):
-        """执行单个交易信号"""
+    def execute_single_trade(self, trade_signal, in_batch=False):
+        """
+        执行单个交易信号，每一步按条件等待界面就绪，无法探测的条件使用固定等待时间
+
+        参数:
+            trade_signal: 交易信号
+            in_batch: 批量执行中上一笔已成功时为True，窗口仍在前台、委托单已是目标模式时
+                不再激活窗口和切换委托单
+        """
+        key = signal_key(trade_signal)
+        self.waits.take_last_waits()
         try:
             # 确保同花顺交易软件已打开
             if not self.ensure_trading_software_open():
@@ -74,225 +103,380 @@ class TradeExecutor:
                 return False
                 
             # 确保交易窗口在最前面
-            self.activate_trading_window()
+            if not self._ensure_foreground(in_batch):
+                logging.error("交易窗口未能置于前台")
+                return False
+            self.latency.stamp(key, HOP_WINDOW_ACTIVATED)
             
-            # 切换交易模式
-            mode = 'buy' if trade_signal['交易类型'] == '买入' else 'sell'
+            # 使用F1/F2键切换到买入或卖出界面并等待切换完成
+            mode = trade_signal.side
+            if not self._ensure_ticket(mode, in_batch):
+                logging.error(f"未能切换到{trade_signal.side_label}界面")
+                return False
             
-            # 直接使用功能键切换到买入或卖出界面
-            if mode == 'buy':
-                # 使用F1键直接切换到买入界面
-                pyautogui.press('f1')
-                logging.info("使用F1键切换到买入界面")
-            else:
-                # 使用F2键直接切换到卖出界面
-                pyautogui.press('f2')
-                logging.info("使用F2键切换到卖出界面")
-            # 等待界面切换完成
-            time.sleep(1)
+            # 清空并输入股票代码，等待代码被接受、行情加载完成
+            stock_code = trade_signal.security
+            self._clear_field()
+            self._type(stock_code)
+            logging.info(f"输入股票代码: {stock_code}")
+            if not self._wait('quote_loaded', lambda: self.broker.is_quote_loaded(stock_code)):
+                logging.error(f"股票代码 {stock_code} 未被接受或行情未加载")
+                return False
             
             if mode == 'buy':
-                # 买入操作 - 使用键盘导航
-                # 清空并输入股票代码
-                pyautogui.hotkey('ctrl', 'a')
-                pyautogui.press('delete')
-                time.sleep(0.3)
-                
-                # 处理股票代码，确保格式正确
-                stock_code = trade_signal['股票代码']
-                if '.' in stock_code:
-                    stock_code = stock_code.split('.')[0]
-                pyautogui.typewrite(stock_code)
-                logging.info(f"输入股票代码: {stock_code}")
-                time.sleep(1)
-                
                 # 按Tab键移动到价格输入框
-                pyautogui.press('tab')
-                time.sleep(0.3)
+                self._next_field()
                 
                 # 清空并输入价格
-                pyautogui.hotkey('ctrl', 'a')
+                self.broker.hotkey('ctrl', 'a')
                 for _ in range(5):  # 多次删除确保清空
-                    pyautogui.press('backspace')
-                time.sleep(0.3)
+                    self.broker.press('backspace')
+                self._wait('field_ready', self.broker.is_input_ready)
                 
-                try:
-                    price_value = float(trade_signal['价格'])
-                    price_str = f"{price_value:.2f}"
-                    pyautogui.typewrite(price_str)
-                    logging.info(f"输入价格: {price_str}")
-                except Exception as e:
-                    logging.error(f"价格输入出错: {e}")
-                    return False
+                price_str = f"{float(trade_signal.price):.2f}"
+                self._type(price_str)
+                logging.info(f"输入价格: {price_str}")
+                self._wait('field_typed', self.broker.is_input_ready)
                 
-                time.sleep(1)
                 # 按Tab键一次移动到数量输入框
-                pyautogui.press('tab')
-                time.sleep(0.3)
-                
-                # 清空并输入数量
-                pyautogui.hotkey('ctrl', 'a')
-                pyautogui.press('delete')
-                time.sleep(0.3)
-                try:
-                    amount = int(float(trade_signal['数量']))
-                    amount_str = str(amount)
-                    pyautogui.typewrite(amount_str)
-                    logging.info(f"输入数量: {amount_str}")
-                except Exception as e:
-                    logging.error(f"数量输入出错: {e}")
-                    return False
-                
-                time.sleep(1)
-                
-                # 按Tab键两次移动到买入按钮
-                pyautogui.press('tab')
-                time.sleep(0.3)
-                
-                # 按回车执行买入操作
-                pyautogui.press('enter')
-                logging.info("按下回车键执行买入操作")
-                time.sleep(1)
+                self._next_field()
             else:
-                # 卖出模式 - 使用键盘导航
-                # 清空并输入股票代码
-                pyautogui.hotkey('ctrl', 'a')
-                pyautogui.press('delete')
-                time.sleep(0.3)
-                
-                # 处理股票代码，确保格式正确
-                stock_code = trade_signal['股票代码']
-                if '.' in stock_code:
-                    stock_code = stock_code.split('.')[0]
-                pyautogui.typewrite(stock_code)
-                logging.info(f"输入股票代码: {stock_code}")
-                time.sleep(1)
-                
-                # 按Tab键移动到数量输入框
-                pyautogui.press('tab')
-                time.sleep(0.3)
-                pyautogui.press('tab')
-                time.sleep(0.3)
-                
-                # 清空并输入数量
-                pyautogui.hotkey('ctrl', 'a')
-                pyautogui.press('delete')
-                time.sleep(0.3)
-                
+                # 卖出使用行情价，按Tab键两次跳过价格输入框
+                self._next_field()
+                self._next_field()
+            
+            # 清空并输入数量
+            self._clear_field()
+            amount_str = str(int(trade_signal.amount))
+            self._type(amount_str)
+            logging.info(f"输入数量: {amount_str}")
+            self._wait('field_typed', self.broker.is_input_ready)
+            
+            # 代码、价格和数量已填写
+            self.latency.stamp(key, HOP_FIELDS_TYPED)
+            self.ledger.mark(key, STATE_TYPED)
+            
+            # 按Tab键移动到买入/卖出按钮
+            self._next_field()
+            
+            # 按回车执行买入/卖出操作，提交前先同步记录台账避免崩溃后重复下单
+            self.ledger.mark(key, STATE_SUBMITTED)
+            self.broker.press('enter')
+            self.latency.stamp(key, HOP_SUBMITTED)
+            logging.info(f"按下回车键执行{trade_signal.side_label}操作")
+            if self.on_submitted is not None:
                 try:
-                    amount = int(float(trade_signal['数量']))
-                    amount_str = str(amount)
-                    pyautogui.typewrite(amount_str)
-                    logging.info(f"输入数量: {amount_str}")
+                    self.on_submitted(trade_signal)
                 except Exception as e:
-                    logging.error(f"数量输入出错: {e}")
-                    return False
-                
-                time.sleep(1)
-                
-                # 按Tab键一次移动到卖出按钮
-                pyautogui.press('tab')
-                time.sleep(0.3)
-                
-                # 按回车执行卖出操作
-                pyautogui.press('enter')
-                logging.info("按下回车键执行卖出操作")
-                time.sleep(1)
+                    logging.error(f"记录已提交订单 {key} 时出错: {e}")
             
-            # 处理可能出现的弹窗
-            time.sleep(1)
-            pyautogui.press('enter')  # 尝试关闭可能出现的弹窗
+            # 处理提交后的弹窗；确定没有弹窗时不再按回车，以免重复提交
+            if not self._wait('popup_present', self.broker.is_popup_present):
+                outcome = self.broker.read_popup()
+                if outcome == POPUP_NONE:
+                    self.ledger.mark(key, STATE_NO_POPUP)
+                    logging.error("提交后未出现弹窗，委托可能未生效，请人工确认委托状态")
+                    return False
+                if outcome == POPUP_UNKNOWN:
+                    logging.error("提交后的弹窗无法识别，委托结果未知，请人工确认委托状态")
+                    return False
+                # 等待结束后才出现的弹窗照常处理
+            # 无法确定委托结果时台账保持为已提交
+            if not self._handle_popups(trade_signal):
+                return False
+            self.latency.stamp(key, HOP_POPUP_DISMISSED)
+            self.ledger.mark(key, STATE_CONFIRMED)
             
-            logging.info(f"执行交易: {trade_signal['交易类型']} {stock_code} "
-                        f"价格:{trade_signal.get('价格', '市价')} 数量:{trade_signal['数量']}")
+            waits = self.waits.take_last_waits()
+            logging.info(f"执行交易: {trade_signal.side_label} {stock_code} "
+                        f"价格:{trade_signal.price} 数量:{trade_signal.amount}，等待共{sum(waits.values()):.2f}秒 "
+                        + ", ".join(f"{step}={seconds:.2f}" for step, seconds in waits.items()))
             
             return True
             
         except Exception as e:
             logging.error(f"执行交易时出错: {e}")
             return False
+
+    def _ensure_foreground(self, in_batch):
+        """激活交易窗口；批量执行中只校验焦点，窗口仍在前台时不再激活"""
+        if in_batch and self.broker.is_trading_window_foreground():
+            self.batch_stats['activations_saved'] += 1
+            return True
+        self.batch_stats['activations'] += 1
+        self.activate_trading_window()
+        return self._wait('window_foreground', self.broker.is_trading_window_foreground)
+
+    def _ensure_ticket(self, mode, in_batch):
+        """切换委托单；批量执行中委托单已是目标模式（界面识别没有否定）时不再切换"""
+        if in_batch and self.trade_control.current_mode == mode \
+                and self.trade_control.verify_trade_mode(mode) is not False:
+            self.batch_stats['mode_switches_saved'] += 1
+            return True
+        self.batch_stats['mode_switches'] += 1
+        return self.trade_control.switch_trade_mode(mode, force=True)
+
+    def _wait(self, step, condition):
+        """按时序配置中该步骤的超时和固定等待时间等待条件满足"""
+        timeout, fallback_delay = self.timing.step(step)
+        return self.waits.wait_until(step, condition, timeout, fallback_delay)
+
+    def _type(self, text):
+        """按时序配置的字符间隔输入文字"""
+        self.broker.typewrite(text, self.timing.typing_interval)
+
+    def _clear_field(self):
+        """清空当前输入框"""
+        self.broker.hotkey('ctrl', 'a')
+        self.broker.press('delete')
+        self._wait('field_ready', self.broker.is_input_ready)
+
+    def _next_field(self):
+        """按Tab键移动到下一个输入框"""
+        self.broker.press('tab')
+        self._wait('field_ready', self.broker.is_input_ready)
             
-    def get_trading_window(self):
-        """获取交易窗口对象"""
-        for window in pyautogui.getAllWindows():
-            if "网上股票交易" in window.title or "交易系统" in window.title:
-                return window
-        return None
+    def _read_popup_until(self, step, accept):
+        """在步骤的等待时间内反复识别弹窗，直到accept(识别结果)为True，返回最后一次识别结果"""
+        last = []
+
+        def probe():
+            last[:] = [self.broker.read_popup()]
+            return accept(last[0])
+        self._wait(step, probe)
+        return last[0]
+
+    def _handle_popups(self, trade_signal, max_popups=3):
+        """
+        处理提交后依次出现的弹窗：确认弹窗和成功弹窗按回车，拒绝弹窗关闭后记入台账
+
+        无法识别弹窗内容时（没有弹窗模板），按回车关闭可能的确认弹窗。
+        已检测到弹窗却识别为没有弹窗或识别未完成（弹窗仍在绘制、时间预算用完）时，
+        在等待时间内重新识别，仍无法确定时不按回车。
+
+        返回:
+            True: 委托被接受（或没有模板无法判断）
+            False: 委托被拒绝、弹窗未能关闭，或无法识别弹窗、委托结果未知
+        """
+        undetermined = (POPUP_NONE, POPUP_UNKNOWN)
+        outcome = self._read_popup_until('popup_present', lambda o: o not in undetermined)
+        if outcome is None:
+            self.broker.press('enter')
+            self._wait('popup_closed', self.broker.is_input_ready)
+            return True
+
+        for _ in range(max_popups):
+            if outcome in undetermined:
+                logging.error(f"提交后的弹窗无法识别（{outcome}），委托结果未知，请人工确认委托状态")
+                return False
+            logging.info(f"提交后的弹窗: {outcome}")
+            self.broker.press('enter')
+            if outcome in REJECT_OUTCOMES:
+                self._wait('popup_closed', self.broker.is_input_ready)
+                self.ledger.mark(signal_key(trade_signal), STATE_REJECTED, reason=outcome)
+                logging.error(f"{trade_signal.side_label} {trade_signal.security} 委托被拒绝: {outcome}")
+                return False
+            # 等待弹窗关闭或被下一个弹窗（成功、拒绝）替换
+            previous = outcome
+            outcome = self._read_popup_until('popup_closed', lambda o: o not in (previous, POPUP_UNKNOWN))
+            if outcome == POPUP_NONE:
+                self._wait('popup_closed', self.broker.is_input_ready)
+                return True
+        logging.error(f"提交后的弹窗未能关闭: {outcome}，请人工确认委托状态")
+        return False
+
     def activate_trading_window(self):
         """激活交易窗口"""
+        return self.broker.activate_trading_window()
+
+    def gui_lock(self):
+        """返回界面锁；持有期间不会下单或复查时序（如重启同花顺客户端时）"""
+        return self._gui_lock
+
+    def recheck_timing_if_due(self):
+        """
+        交易日开盘前（timing_profile.RECHECK_START ~ RECHECK_END）空闲时复查一次下单时序配置
+
+        持有界面锁运行一轮只填写不提交的脚本，实测就绪时间超过当前固定等待时间的步骤调高等待时间。
+        不在复查时间段内、正在下单或交易窗口未打开时跳过，交易时段内不会在委托单上输入。
+
+        返回:
+            是否进行了复查
+        """
+        if not self.timing.is_check_due() or not self.broker.is_trading_window_open():
+            return False
+        if not self._gui_lock.acquire(blocking=False):
+            return False
         try:
-            # 查找交易窗口
-            found = False
-            for window in pyautogui.getAllWindows():
-                if "网上股票交易" in window.title or "交易系统" in window.title:
-                    window.activate()
-                    logging.info(f"已激活交易窗口: {window.title}")
-                    found = True
-                    time.sleep(1)
-                    
-                    # 点击窗口中心以确保激活
-                    pyautogui.click(window.left + window.width // 2, 
-                                   window.top + window.height // 2)
-                    time.sleep(0.3)
-                    break
-            
-            if not found:
-                logging.warning("未找到交易窗口，尝试使用Alt+Tab切换")
-                pyautogui.keyDown('alt')
-                pyautogui.press('tab')
-                pyautogui.keyUp('alt')
-                time.sleep(1)
-            
+            logging.info(f"正在复查下单时序配置 {self.timing.name}")
+            changes = recheck_timing_profile(self.broker, self.timing)
+            logging.info(f"下单时序配置复查完成，调整了{len(changes)}个步骤")
             return True
         except Exception as e:
-            logging.error(f"激活交易窗口时出错: {e}")
+            logging.error(f"复查下单时序配置时出错: {e}")
             return False
+        finally:
+            self._gui_lock.release()
     
-    def execute_all_trades(self, trade_signals):
-        """执行所有交易信号"""
+    def execute_all_trades(self, trade_signals, batch=False):
+        """
+        按顺序执行交易信号，台账中已提交过的订单直接跳过；每个订单执行完后记录各环节延迟
+
+        参数:
+            trade_signals: 交易信号的可迭代对象，可以是OrderScheduler.drain()逐笔产生的订单
+            batch: 为True时上一笔成功后保持窗口和委托单模式，见execute_batch
+        """
         success_count = 0
-        total_count = len(trade_signals)
+        skipped_count = 0
+        total_count = 0
+        warm = False  # 上一笔是否成功，界面状态可以沿用
         
-        for signal in trade_signals:
-            if self.execute_single_trade(signal):
-                success_count += 1
-            time.sleep(1)  # 交易之间的间隔
+        with self._gui_lock:
+            for signal in trade_signals:
+                total_count += 1
+                key = signal_key(signal)
+                if not self.ledger.should_execute(key):
+                    logging.info(f"订单 {key} 已提交过或已过期，跳过")
+                    self.latency.discard(key)
+                    skipped_count += 1
+                    continue
+            
+                self.latency.stamp(key, HOP_DEQUEUED)
+                self.ledger.mark(key, STATE_PENDING, code=signal.security, side=signal.side,
+                                 price=signal.price, amount=signal.amount)
+                self.batch_stats['orders'] += 1
+                if self.execute_single_trade(signal, in_batch=warm):
+                    success_count += 1
+                    self.latency.finish(key)
+                    warm = batch
+                else:
+                    self.latency.discard(key)
+                    if self.ledger.should_execute(key):
+                        self.ledger.mark(key, STATE_FAILED)
+                    # 失败后界面状态未知，下一笔重新激活窗口和切换委托单
+                    self.trade_control.current_mode = None
+                    warm = False
         
-        logging.info(f"交易执行完成，成功: {success_count}/{total_count}")
+        logging.info(f"交易执行完成，成功: {success_count}/{total_count}，跳过已提交: {skipped_count}")
+        return success_count
+
+    def execute_batch(self, trade_signals, order=True):
+        """
+        批量执行一组待执行的交易信号
+
+        先卖出后买入（卖出释放的资金用于买入），同方向的订单连续执行；整批只在开始时激活窗口，
+        窗口保持在前台、委托单模式保持不变，订单之间只校验焦点。记录本批省去的窗口激活和
+        委托单切换次数。
+
+        参数:
+            trade_signals: 交易信号列表，或OrderScheduler.drain()逐笔产生的订单
+            order: 为True时按先卖后买排序；订单来自调度器时为False，由调度器决定顺序
+
+        返回:
+            成功执行的订单数
+        """
+        if order:
+            trade_signals = sorted(trade_signals, key=lambda s: s.is_buy)
+        before = dict(self.batch_stats)
+        success_count = self.execute_all_trades(trade_signals, batch=True)
+        self.batch_stats['batches'] += 1
+        delta = {name: self.batch_stats[name] - before[name] for name in before}
+        logging.info(f"批量执行{delta['orders']}笔: 窗口激活{delta['activations']}次（省去{delta['activations_saved']}次），"
+                     f"委托单切换{delta['mode_switches']}次（省去{delta['mode_switches_saved']}次）")
         return success_count
 
+    def expire_order(self, signal, overdue):
+        """订单超过有效期限未执行，记入台账，不再下单"""
+        key = signal_key(signal)
+        self.latency.discard(key)
+        if self.ledger.should_execute(key):
+            self.ledger.mark(key, STATE_EXPIRED, code=signal.security, side=signal.side,
+                             overdue=round(overdue, 1))
+
+def watch_signals(poll_interval=0.2):
+    """
+    常驻模式：监视交易信号文件，新信号追加后立即执行
+    
+    执行器和台账在进程内保持，不再每次重新启动解释器。启动时文件中已有的
+    当天信号也会交给执行器，台账中已提交过的订单会被跳过。执行失败的订单每隔
+    FAILED_RETRY_INTERVAL秒重新排队，直到提交成功或超过有效期限（见order_scheduler.MAX_ORDER_AGE）
+    被记为过期。
+    """
+    executor = TradeExecutor()
+    executor.latency.start_http_server()
+    scheduler = OrderScheduler(on_expired=executor.expire_order)
+    tail = SignalFileTail()
+    unfinished = {}  # 委托编号 -> 台账中尚未结束的当天信号
+    last_retry = time.monotonic()
+    logging.info("交易执行器已常驻运行，正在监视交易信号文件...")
+    while True:
+        try:
+            if tail.changed():
+                today = datetime.date.today()
+                records = [(s, hops) for s, hops in tail.read_new_records() if s.trade_time.date() == today]
+                if records:
+                    logging.info(f"检测到{len(records)}个新交易信号")
+                    for signal, hops in records:
+                        # 获取和解析进程写入的环节时间戳，端到端延迟从收到HTTP响应开始计算
+                        executor.latency.start_trace(signal, hops.get(HOP_HTTP_RECEIVED), hops.get(HOP_PARSED))
+                        unfinished[signal_key(signal)] = signal
+                        scheduler.put(signal)
+                    executor.execute_batch(scheduler.drain(), order=False)
+                    logging.info(f"下单各步骤等待统计: {executor.waits.report()}")
+            elif unfinished and time.monotonic() - last_retry >= FAILED_RETRY_INTERVAL:
+                last_retry = time.monotonic()
+                retry_failed_orders(executor, scheduler, unfinished)
+            else:
+                # 开盘前空闲时复查下单时序配置
+                executor.recheck_timing_if_due()
+        except Exception as e:
+            logging.error(f"处理交易信号文件时出错: {e}")
+        time.sleep(poll_interval)
+
+def retry_failed_orders(executor, scheduler, unfinished):
+    """
+    将台账中执行失败的订单重新排队执行
+
+    已提交、已过期或被拒绝的订单从unfinished中移除；失败的订单重新交给调度器，
+    超过有效期限的由调度器记为过期，不再下单。
+
+    返回:
+        重新排队的订单数
+    """
+    failed = []
+    for key, signal in list(unfinished.items()):
+        state = executor.ledger.state(key)
+        if state in CLOSED_STATES:
+            del unfinished[key]
+        elif state == STATE_FAILED:
+            failed.append(signal)
+    if not failed:
+        return 0
+    logging.info(f"重新执行{len(failed)}个失败的订单: {', '.join(signal_key(s) for s in failed)}")
+    for signal in failed:
+        executor.latency.start_trace(signal)
+        scheduler.put(signal)
+    executor.execute_batch(scheduler.drain(), order=False)
+    return len(failed)
+
 def main():
+    if '--watch' in sys.argv[1:]:
+        watch_signals()
+        return
+    
     try:
         # 首先尝试查找已提取的交易信号文件
         current_dir = os.path.dirname(os.path.abspath(__file__))
         data_dir = os.path.join(current_dir, "data")
-        extracted_signals_file = os.path.join(data_dir, "trade_signals.json")
+        extracted_signals_file = os.path.join(data_dir, "trade_signals.jsonl")
         
         trade_signals = []
         
-        # 如果已提取的交易信号文件存在，直接加载
+        # 如果已提取的交易信号文件存在，直接加载当天的交易信号
         if os.path.exists(extracted_signals_file):
             logging.info(f"从已提取的交易信号文件加载: {extracted_signals_file}")
             try:
-                with open(extracted_signals_file, 'r', encoding='utf-8') as f:
-                    all_signals = json.load(f)
-                
-                # 获取当前日期
-                today = datetime.datetime.now().date()
-                
-                # 只保留当天的交易信号
-                trade_signals = []
-                for signal in all_signals:
-                    # 将字符串格式的交易时间转换为datetime对象
-                    if isinstance(signal['交易时间'], str):
-                        signal_time = datetime.datetime.strptime(signal['交易时间'], '%Y-%m-%d %H:%M:%S')
-                    else:
-                        signal_time = signal['交易时间']
-                    
-                    # 只保留当天的交易信号
-                    if signal_time.date() == today:
-                        trade_signals.append(signal)
-                
+                trade_signals = load_signals(extracted_signals_file, date=datetime.date.today())
                 logging.info(f"成功加载 {len(trade_signals)} 个当天的交易信号")
             except Exception as e:
                 logging.error(f"加载已提取的交易信号文件出错: {e}")
@@ -319,8 +503,7 @@ def main():
             
             # 保存提取的交易信号，方便下次使用
             try:
-                with open(extracted_signals_file, 'w', encoding='utf-8') as f:
-                    json.dump(trade_signals, f, ensure_ascii=False, indent=2, default=str)
+                save_signals(extracted_signals_file, trade_signals)
                 logging.info(f"已将提取的交易信号保存到: {extracted_signals_file}")
             except Exception as e:
                 logging.error(f"保存提取的交易信号时出错: {e}")
@@ -335,7 +518,7 @@ def main():
         
         # 执行交易
         executor = TradeExecutor()
-        executor.execute_all_trades(trade_signals)
+        executor.execute_batch(trade_signals)
     
     except Exception as e:
         logging.error(f"执行过程中出错: {e}")
@@ -1,35 +1,36 @@
-import pyautogui
-import time
 import logging
-import os
 
-# 配置日志
-log_file = 'logs/trade_window.log'
-os.makedirs('logs', exist_ok=True)
+from wait_engine import WaitEngine
+from timing_profile import TimingProfile
+from screen_state import SCREEN_LOGIN, SCREEN_LOCKED, SCREEN_ERROR
+from logging_setup import setup_logging
 
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# 配置日志：记录由后台线程写入 logs/<进程名>/trade_window.log
+setup_logging()
 
 class TradeWindowControl:
-    def __init__(self):
+    def __init__(self, broker=None, waits=None, timing=None):
+        """
+        参数:
+            broker: 下单界面适配器，None表示使用GuiBrokerAdapter
+            waits: 等待引擎，None表示新建
+            timing: 下单时序配置，None表示加载本机的配置
+        """
+        if broker is None:
+            from broker_adapter import GuiBrokerAdapter
+            broker = GuiBrokerAdapter()
+        self.broker = broker
+        self.waits = waits or WaitEngine(broker)
+        self.timing = timing or TimingProfile.load()
         self.current_mode = None  # 当前模式：'buy' 或 'sell'
         
-    def switch_trade_mode(self, mode):
+    def switch_trade_mode(self, mode, force=False):
         """
         切换交易模式（买入/卖出）
         
         参数:
             mode: 'buy' 或 'sell'
+            force: 为True时即使记录的模式已是mode也重新切换
         """
         try:
             if mode not in ['buy', 'sell']:
@@ -37,31 +38,46 @@ class TradeWindowControl:
                 return False
                 
             # 如果已经在目标模式，无需切换
-            if self.current_mode == mode:
+            if self.current_mode == mode and not force:
                 logging.info(f"已经在{mode}模式，无需切换")
                 return True
             
             # 根据模式选择快捷键
             if mode == 'buy':
                 logging.info("切换到买入模式")
-                pyautogui.press('f1')  # 买入快捷键
+                self.broker.press('f1')  # 买入快捷键
                 self.current_mode = 'buy'
             else:
                 logging.info("切换到卖出模式")
-                pyautogui.press('f2')  # 卖出快捷键
+                self.broker.press('f2')  # 卖出快捷键
                 self.current_mode = 'sell'
             
-            # 等待切换完成
-            time.sleep(0.3)
-            return True
+            # 等待切换完成，与交易执行器使用同一时序配置
+            timeout, fallback_delay = self.timing.step('ticket_switched')
+            return self.waits.wait_until('ticket_switched', lambda: self.broker.is_ticket_ready(mode),
+                                         timeout, fallback_delay)
             
         except Exception as e:
             logging.error(f"切换交易模式时出错: {e}")
             return False
     
-    def verify_trade_mode(self):
+    def verify_trade_mode(self, mode=None):
         """
-        验证当前交易模式（可以通过界面特征识别当前是买入还是卖出模式）
+        通过界面识别验证当前委托单是否为指定的交易模式
+
+        参数:
+            mode: 'buy' 或 'sell'，None表示记录的当前模式
+        返回:
+            True/False；界面无法识别（没有界面指纹）时返回None
         """
-        # 这里可以添加界面识别逻辑
-        pass
\ No newline at end of file
+        mode = mode or self.current_mode
+        state = self.broker.read_screen_state()
+        if state is None:
+            return None
+        if state in (SCREEN_LOGIN, SCREEN_LOCKED, SCREEN_ERROR):
+            logging.error(f"交易窗口处于{state}界面，需要人工处理")
+        elif state != mode:
+            logging.warning(f"委托单不是{mode}模式，识别为{state}")
+        if state != mode:
+            self.current_mode = None
+        return state == mode
\ No newline at end of file
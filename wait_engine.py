@@ -0,0 +1,107 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 条件轮询间隔（秒）
+POLL_INTERVAL = 0.02
+
+
+class WaitStepStats:
+    """单个等待步骤的统计"""
+    def __init__(self):
+        self.count = 0  # 等待次数
+        self.total_wait = 0.0  # 累计等待时间（秒）
+        self.max_wait = 0.0  # 单次最长等待时间（秒）
+        self.timeouts = 0  # 超时次数
+        self.fallbacks = 0  # 无法探测、使用固定等待的次数
+
+    def record(self, waited):
+        self.count += 1
+        self.total_wait += waited
+        if waited > self.max_wait:
+            self.max_wait = waited
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avg_wait_ms': round(self.total_wait / self.count * 1000, 1) if self.count else 0.0,
+            'max_wait_ms': round(self.max_wait * 1000, 1),
+            'total_wait_s': round(self.total_wait, 3),
+            'timeouts': self.timeouts,
+            'fallbacks': self.fallbacks
+        }
+
+
+class WaitEngine:
+    """
+    按条件等待下单界面就绪
+
+    反复探测界面条件（窗口在前台、委托单已切换、行情已加载、弹窗出现/消失等），
+    条件满足立即返回，超时返回False。探测函数返回None表示当前环境无法探测该条件，
+    此时退回原来的固定等待时间。每个步骤的等待时间分别统计。
+
+    参数:
+        broker: 下单界面适配器，提供sleep和now
+        poll_interval: 条件轮询间隔（秒）
+    """
+    def __init__(self, broker, poll_interval=POLL_INTERVAL):
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._last_waits = {}
+
+    def wait_until(self, step, condition, timeout, fallback_delay):
+        """
+        等待条件满足
+
+        参数:
+            step: 步骤名称，用于统计
+            condition: 探测函数，返回True/False，无法探测时返回None
+            timeout: 最长等待时间（秒）
+            fallback_delay: 无法探测时的固定等待时间（秒）
+
+        返回:
+            条件是否满足（使用固定等待时视为满足）
+        """
+        start = self.broker.now()
+        result = condition()
+        if result is None:
+            self.broker.sleep(fallback_delay)
+            self._record(step, self.broker.now() - start, fallback=True)
+            return True
+
+        while not result:
+            if self.broker.now() - start >= timeout:
+                self._record(step, self.broker.now() - start, timed_out=True)
+                logger.warning(f"等待步骤 {step} 超时（{timeout}秒）")
+                return False
+            self.broker.sleep(self.poll_interval)
+            result = condition()
+
+        self._record(step, self.broker.now() - start)
+        return True
+
+    def _record(self, step, waited, fallback=False, timed_out=False):
+        with self._lock:
+            stats = self.stats.get(step)
+            if stats is None:
+                stats = self.stats[step] = WaitStepStats()
+            stats.record(waited)
+            if fallback:
+                stats.fallbacks += 1
+            if timed_out:
+                stats.timeouts += 1
+            self._last_waits[step] = self._last_waits.get(step, 0.0) + waited
+
+    def take_last_waits(self):
+        """返回并清空自上次调用以来各步骤的等待时间（秒），用于记录单笔订单的等待明细"""
+        with self._lock:
+            waits, self._last_waits = self._last_waits, {}
+            return waits
+
+    def report(self):
+        """返回各步骤的等待统计"""
+        with self._lock:
+            return {step: stats.snapshot() for step, stats in self.stats.items()}
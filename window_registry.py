@@ -0,0 +1,147 @@
+import sys
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ROLE_MAIN = 'main'  # 同花顺主窗口
+ROLE_TRADING = 'trading'  # 网上股票交易窗口
+
+# 交易窗口标题中的关键字
+TRADING_WINDOW_TITLES = ("网上股票交易", "交易系统")
+
+
+def is_trading_window_title(title):
+    """判断窗口标题是否为同花顺交易窗口"""
+    return any(keyword in title for keyword in TRADING_WINDOW_TITLES)
+
+
+def is_main_window_title(title):
+    """判断窗口标题是否为同花顺主窗口"""
+    return "同花顺" in title and "网上股票交易" not in title
+
+
+DEFAULT_ROLES = {
+    ROLE_MAIN: is_main_window_title,
+    ROLE_TRADING: is_trading_window_title
+}
+
+
+class WindowProvider:
+    """
+    窗口来源接口
+
+    窗口注册表只通过这里的方法枚举和校验窗口，测试时可以换成返回假窗口对象的实现。
+    """
+    def list_windows(self):
+        """枚举所有顶层窗口（代价较高）"""
+        raise NotImplementedError
+
+    def is_alive(self, window):
+        """窗口是否仍然存在（代价应很低）"""
+        raise NotImplementedError
+
+    def get_title(self, window):
+        """读取窗口当前标题（代价应很低）"""
+        raise NotImplementedError
+
+
+class PyAutoGuiWindowProvider(WindowProvider):
+    """通过pyautogui（pygetwindow）枚举窗口，Windows上用窗口句柄直接校验"""
+    def __init__(self):
+        import pyautogui
+        self._gui = pyautogui
+        self._user32 = None
+        if sys.platform == 'win32':
+            import ctypes
+            self._user32 = ctypes.windll.user32
+
+    def list_windows(self):
+        return self._gui.getAllWindows()
+
+    def is_alive(self, window):
+        hwnd = getattr(window, '_hWnd', None)
+        if self._user32 is not None and hwnd is not None:
+            return bool(self._user32.IsWindow(hwnd))
+        return True
+
+    def get_title(self, window):
+        return window.title
+
+
+class WindowRegistry:
+    """
+    窗口注册表
+
+    按角色（主窗口、交易窗口）缓存窗口对象。每次使用前只做廉价的校验：窗口仍然存在、
+    标题没有变化；校验失败或尚未缓存时才枚举全部窗口，一次枚举同时更新所有角色。
+    统计命中和未命中次数。
+
+    参数:
+        provider: 窗口来源，None表示使用PyAutoGuiWindowProvider
+        roles: {角色: 标题匹配函数}，默认为主窗口和交易窗口
+    """
+    def __init__(self, provider=None, roles=None):
+        self.provider = provider or PyAutoGuiWindowProvider()
+        self.roles = dict(roles or DEFAULT_ROLES)
+        self._cache = {}  # 角色 -> (窗口对象, 缓存时的标题)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.scans = 0
+
+    def get(self, role):
+        """返回角色对应的窗口，找不到返回None"""
+        with self._lock:
+            cached = self._cache.get(role)
+            if cached is not None:
+                window, title = cached
+                try:
+                    if self.provider.is_alive(window) and self.provider.get_title(window) == title:
+                        self.hits += 1
+                        return window
+                except Exception:
+                    pass
+                del self._cache[role]
+            self.misses += 1
+            self._scan()
+            cached = self._cache.get(role)
+            return cached[0] if cached is not None else None
+
+    def _scan(self):
+        """枚举全部窗口，更新所有角色的缓存"""
+        self.scans += 1
+        found = {}
+        for window in self.provider.list_windows():
+            title = self.provider.get_title(window)
+            for role, matches in self.roles.items():
+                if role not in found and matches(title):
+                    found[role] = (window, title)
+        self._cache = found
+
+    def invalidate(self, role=None):
+        """清除某个角色（None表示全部）的缓存"""
+        with self._lock:
+            if role is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(role, None)
+
+    def stats(self):
+        """返回命中、未命中和全量枚举次数"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'scans': self.scans,
+                    'cached': sorted(self._cache)}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_window_registry():
+    """获取进程内共享的窗口注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = WindowRegistry()
+        return _registry